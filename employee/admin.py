@@ -1,15 +1,19 @@
 from django.contrib import admin
+from django.db import models
 from django.utils.html import format_html
 from .models import Employee, Skill, Desk, EmployeeSkill, EmployeeImage, Reservation
+from .uploads import HeaderImageFormField
+from .search import search_employees
 
 class EmployeeImageInline(admin.TabularInline):
     model = EmployeeImage
     extra = 1
+    formfield_overrides = {models.ImageField: {'form_class': HeaderImageFormField}}
     readonly_fields = ['preview_image']
     
     def preview_image(self, obj):
         if obj.image:
-            return format_html('<img src="{}" width="100" height="100" style="object-fit: cover;" />', obj.image.url)
+            return format_html('<img src="{}" width="100" height="100" style="object-fit: cover;" />', obj.thumbnail_url(100))
         return "Нет изображения"
     preview_image.short_description = 'Предпросмотр'
 
@@ -21,13 +25,16 @@ class EmployeeSkillInline(admin.TabularInline):
 class EmployeeAdmin(admin.ModelAdmin):
     list_display = ['last_name', 'first_name', 'position', 'desk_number', 'hire_date', 'gender', 'main_photo_preview']
     list_filter = ['position', 'gender', 'skills']
-    search_fields = ['last_name', 'first_name', 'email']
+    # Поле поиска показывается при непустом search_fields; сам поиск - по индексу (get_search_results)
+    search_fields = ['last_name', 'first_name', 'skill_names']
     inlines = [EmployeeSkillInline, EmployeeImageInline]
     
+    def get_search_results(self, request, queryset, search_term):
+        return search_employees(queryset, search_term), False
+    
     def main_photo_preview(self, obj):
-        main_photo = obj.get_main_photo()
-        if main_photo and main_photo.image:
-            return format_html('<img src="{}" width="50" height="50" style="object-fit: cover;" />', main_photo.image.url)
+        if obj.main_photo:
+            return format_html('<img src="{}" width="50" height="50" style="object-fit: cover;" />', obj.thumbnail_url(50))
         return "📷"
     main_photo_preview.short_description = 'Фото'
 
@@ -50,14 +57,15 @@ class EmployeeSkillAdmin(admin.ModelAdmin):
 
 @admin.register(EmployeeImage)
 class EmployeeImageAdmin(admin.ModelAdmin):
-    list_display = ['employee', 'preview_image', 'uploaded_at']
+    formfield_overrides = {models.ImageField: {'form_class': HeaderImageFormField}}
+    list_display = ['employee', 'preview_image', 'has_thumbnails', 'uploaded_at']
     list_filter = ['uploaded_at']
     search_fields = ['employee__first_name', 'employee__last_name']
     readonly_fields = ['preview_image']
     
     def preview_image(self, obj):
         if obj.image:
-            return format_html('<img src="{}" width="200" height="200" style="object-fit: cover;" />', obj.image.url)
+            return format_html('<img src="{}" width="200" height="200" style="object-fit: cover;" />', obj.thumbnail_url(300))
         return "Нет изображения"
     preview_image.short_description = 'Предпросмотр'
 
@@ -0,0 +1,154 @@
+from collections import Counter
+from django.apps import apps as global_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from .models import Employee, HeadcountStat, SkillLevelStat
+
+# Поля сотрудника, от которых зависят счётчики
+EMPLOYEE_FIELDS = ('position', 'gender', 'hire_date')
+POSITION_LABELS = dict(Employee.POSITION_CHOICES)
+
+def cohort(hire_date):
+    """Месяц приёма - первое число месяца (до сохранения hire_date бывает datetime из timezone.now)"""
+    return Employee._meta.get_field('hire_date').to_python(hire_date).replace(day=1)
+
+def _position(employee_id):
+    return Employee.objects.filter(pk=employee_id).values_list('position', flat=True).first()
+
+def apply_deltas(model, deltas):
+    """
+    Прибавляет deltas {ключ model.KEY_FIELDS: изменение} к счётчикам model:
+    UPDATE count = count + delta, для нового ключа - INSERT; обнулившиеся строки удаляются.
+    Уменьшение несуществующего счётчика пропускается (таблица ещё не построена).
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    with transaction.atomic():
+        for key, delta in deltas.items():
+            lookup = dict(zip(model.KEY_FIELDS, key))
+            if model.objects.filter(**lookup).update(count=F('count') + delta) or delta < 0:
+                continue
+            try:
+                with transaction.atomic():
+                    model.objects.create(**lookup, count=delta)
+            except IntegrityError:
+                # Строку успел создать параллельный запрос
+                model.objects.filter(**lookup).update(count=F('count') + delta)
+        if any(delta < 0 for delta in deltas.values()):
+            model.objects.filter(count__lte=0).delete()
+
+def employee_saved(instance, previous=None):
+    """Сотрудник создан или изменён; previous - прежние EMPLOYEE_FIELDS (None - новый сотрудник)"""
+    headcount = Counter()
+    headcount[instance.position, instance.gender, cohort(instance.hire_date)] += 1
+    if previous is not None:
+        headcount[previous['position'], previous['gender'], cohort(previous['hire_date'])] -= 1
+    apply_deltas(HeadcountStat, headcount)
+
+    if previous is not None and previous['position'] != instance.position:
+        # Навыки сотрудника переходят в счётчики новой должности
+        skills = Counter()
+        for skill_id, level in instance.employeeskill_set.values_list('skill_id', 'level'):
+            skills[skill_id, level, previous['position']] -= 1
+            skills[skill_id, level, instance.position] += 1
+        apply_deltas(SkillLevelStat, skills)
+
+def employee_deleted(instance):
+    # Счётчики навыков уменьшают сигналы каскадно удалённых EmployeeSkill
+    apply_deltas(HeadcountStat, {(instance.position, instance.gender, cohort(instance.hire_date)): -1})
+
+def skill_saved(instance, previous=None):
+    """Навык сотрудника добавлен или изменён; previous - прежние employee_id, skill_id, level"""
+    skills = Counter()
+    skills[instance.skill_id, instance.level, _position(instance.employee_id)] += 1
+    if previous is not None:
+        skills[previous['skill_id'], previous['level'], _position(previous['employee_id'])] -= 1
+    apply_deltas(SkillLevelStat, skills)
+
+def skill_deleted(instance):
+    # При удалении сотрудника его строка ещё в БД: каскад удаляет навыки раньше
+    position = _position(instance.employee_id)
+    if position is not None:
+        apply_deltas(SkillLevelStat, {(instance.skill_id, instance.level, position): -1})
+
+def employees_added(employees, skills):
+    """Массовое добавление (bulk_create не отправляет сигналов); skills - [(skill_id, level, position)]"""
+    apply_deltas(HeadcountStat, Counter(
+        (employee.position, employee.gender, cohort(employee.hire_date)) for employee in employees
+    ))
+    apply_deltas(SkillLevelStat, Counter(skills))
+
+def rebuild_analytics(apps=global_apps):
+    """
+    Полный пересчёт счётчиков двумя групповыми запросами (команда refresh_analytics,
+    миграция; apps - реестр моделей, в миграции исторический).
+    """
+    Employee = apps.get_model('employee', 'Employee')
+    EmployeeSkill = apps.get_model('employee', 'EmployeeSkill')
+    HeadcountStat = apps.get_model('employee', 'HeadcountStat')
+    SkillLevelStat = apps.get_model('employee', 'SkillLevelStat')
+    with transaction.atomic():
+        HeadcountStat.objects.all().delete()
+        HeadcountStat.objects.bulk_create([
+            HeadcountStat(**row) for row in Employee.objects.annotate(cohort=TruncMonth('hire_date'))
+            .values('position', 'gender', 'cohort').annotate(count=Count('id')).order_by()
+        ])
+        SkillLevelStat.objects.all().delete()
+        SkillLevelStat.objects.bulk_create([
+            SkillLevelStat(**row) for row in EmployeeSkill.objects.annotate(position=F('employee__position'))
+            .values('skill_id', 'level', 'position').annotate(count=Count('id')).order_by()
+        ])
+
+def skill_matrix(min_level=None):
+    """
+    Навык x уровень x должность; при min_level - навык x должность для уровней не ниже
+    ("сколько сотрудников знают X на 3 и выше").
+    """
+    rows = SkillLevelStat.objects.filter(count__gt=0)
+    fields = ['skill_id', 'skill__name', 'level', 'position']
+    if min_level:
+        rows = rows.filter(level__gte=min_level)
+        fields.remove('level')
+    return [
+        {
+            'skill': row['skill_id'],
+            'skill_name': row['skill__name'],
+            **({'level': row['level']} if 'level' in row else {}),
+            'position': row['position'],
+            'position_display': POSITION_LABELS.get(row['position'], row['position']),
+            'count': row['total'],
+        }
+        for row in rows.values(*fields).annotate(total=Sum('count')).order_by('skill__name', *fields)
+    ]
+
+def headcount_report(period='month'):
+    """(всего, по должности и полу, гистограмма приёма по месяцам или годам) из одного запроса"""
+    groups = Counter()
+    cohorts = Counter()
+    for position, gender, month, count in HeadcountStat.objects.filter(count__gt=0).values_list(
+        'position', 'gender', 'cohort', 'count',
+    ):
+        groups[position, gender] += count
+        cohorts[month.strftime('%Y' if period == 'year' else '%Y-%m')] += count
+    headcount = [
+        {
+            'position': position,
+            'position_display': POSITION_LABELS.get(position, position),
+            'gender': gender,
+            'count': count,
+        }
+        for (position, gender), count in sorted(groups.items())
+    ]
+    histogram = [{'cohort': key, 'count': count} for key, count in sorted(cohorts.items())]
+    return sum(groups.values()), headcount, histogram
+
+def analytics_report(min_level=None, period='month'):
+    total, headcount, histogram = headcount_report(period)
+    return {
+        'total': total,
+        'headcount': headcount,
+        'hire_cohorts': histogram,
+        'skills': skill_matrix(min_level),
+    }
@@ -5,5 +5,5 @@ class EmployeeConfig(AppConfig):
     name = 'employee'
     
     def ready(self):
-        # Пока ничего не делаем, чтобы избежать запросов к БД при инициализации
-        pass
\ No newline at end of file
+        # Только подключаем сигналы, без запросов к БД при инициализации
+        from . import signals  # noqa: F401
\ No newline at end of file
@@ -0,0 +1,79 @@
+from datetime import timedelta
+from django.core.cache import cache
+from .models import Desk, Reservation
+from .caching import occupancy_versions, desks_version, bump_occupancy
+
+# Занятость стола за дату хранится битовой маской: бит desk_id установлен, если стол забронирован.
+# Версия в ключе (caching.bump_occupancy) увеличивается после фиксации изменений брони
+OCCUPANCY_KEY = 'desk-occupancy:v2:{day}:{version}'
+DESKS_KEY = 'desk-occupancy:v2:desks:{version}'
+OCCUPANCY_TIMEOUT = 60 * 60
+
+def _bits(mask):
+    """Номера установленных битов по возрастанию"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+def date_range(start, end):
+    return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+def available_desks():
+    """ID столов с is_available=True (кэшируется до изменения Desk)"""
+    key = DESKS_KEY.format(version=desks_version())
+    desk_ids = cache.get(key)
+    if desk_ids is None:
+        desk_ids = list(Desk.objects.filter(is_available=True).order_by('id').values_list('id', flat=True))
+        cache.set(key, desk_ids, OCCUPANCY_TIMEOUT)
+    return desk_ids
+
+def occupancy(start, end):
+    """
+    Маски занятости по датам [start, end].
+    Недостающие в кэше даты загружаются одним запросом по индексу (date, desk).
+    Версии дат читаются до запроса к БД: если бронь зафиксирована, пока маска
+    считалась, маска записывается под уже устаревшей версией и не будет прочитана.
+    """
+    days = date_range(start, end)
+    versions = occupancy_versions(days)
+    keys = {day: OCCUPANCY_KEY.format(day=day, version=versions[day]) for day in days}
+    cached = cache.get_many(list(keys.values()))
+    masks = {day: cached[key] for day, key in keys.items() if key in cached}
+    missing = [day for day in days if day not in masks]
+    if missing:
+        loaded = dict.fromkeys(missing, 0)
+        rows = Reservation.objects.filter(date__range=(missing[0], missing[-1])).values_list('date', 'desk_id')
+        for day, desk_id in rows:
+            if day in loaded:
+                loaded[day] |= 1 << desk_id
+        cache.set_many({keys[day]: mask for day, mask in loaded.items()}, OCCUPANCY_TIMEOUT)
+        masks.update(loaded)
+    return [(day, masks[day]) for day in days]
+
+def availability_calendar(start, end):
+    """Свободные столы по дням: список доступных столов и для каждой даты занятые из них"""
+    desk_ids = available_desks()
+    desk_mask = 0
+    for desk_id in desk_ids:
+        desk_mask |= 1 << desk_id
+    days = []
+    for day, mask in occupancy(start, end):
+        occupied = mask & desk_mask
+        days.append({
+            'date': day,
+            'free': len(desk_ids) - occupied.bit_count(),
+            'occupied': list(_bits(occupied)),
+        })
+    return {'desks': desk_ids, 'days': days}
+
+def invalidate_dates(days):
+    """
+    Сбрасывает маски дат после фиксации транзакции (сигналы броней, bulk_create):
+    откат не сбрасывает ничего, а версия увеличивается, только когда новые брони
+    уже видны другим соединениям.
+    """
+    bump_occupancy(days)
+
+def invalidate_desks(**kwargs):
+    bump_occupancy(desks=True)
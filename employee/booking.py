@@ -0,0 +1,107 @@
+import threading
+import zlib
+from collections import namedtuple
+from contextlib import ExitStack
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from .models import Desk, Reservation
+from .validators import NeighborDeskValidator, ReservationConflict
+from . import availability
+
+class BookingConflict(ValidationError):
+    """Стол или соседний стол уже занят на эту дату"""
+
+# Полосатые блокировки по дате: конфликтовать могут только брони одной даты,
+# поэтому брони разных дат (и почти всех разных столов) идут параллельно
+LOCK_STRIPES = 64
+_date_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+def _date_lock(date):
+    return _date_locks[zlib.crc32(str(date).encode()) % LOCK_STRIPES]
+
+def _date_locks_for(dates):
+    """Блокировки для набора дат, взятые в фиксированном порядке (без взаимоблокировок)"""
+    stack = ExitStack()
+    stripes = sorted({zlib.crc32(str(date).encode()) % LOCK_STRIPES for date in dates})
+    for stripe in stripes:
+        stack.enter_context(_date_locks[stripe])
+    return stack
+
+def _lock_desk_rows(desks, validator):
+    if connection.features.has_select_for_update:
+        # Строки блокируются в порядке id, чтобы встречные брони не попали во взаимоблокировку
+        numbers = {number for desk in desks for number in validator.neighbor_numbers(desk)}
+        list(
+            Desk.objects.select_for_update()
+            .filter(Q(pk__in=[desk.pk for desk in desks]) | Q(number__in=numbers))
+            .order_by('pk').values_list('pk', flat=True)
+        )
+
+def save_reservation(reservation, validator=None):
+    """
+    Проверяет соседние столы и сохраняет бронь без гонки check-then-insert.
+    Внутри процесса брони одной даты сериализуются блокировкой по дате, между
+    процессами - select_for_update по строкам стола и его соседей (PostgreSQL/MySQL;
+    SQLite сериализует запись на уровне БД, см. transaction_mode в настройках).
+    Бросает BookingConflict вместо IntegrityError.
+    """
+    validator = validator or NeighborDeskValidator()
+    desk = reservation.desk
+    with _date_lock(reservation.date), transaction.atomic():
+        _lock_desk_rows([desk], validator)
+        conflicts = validator.find_conflicts([reservation])
+        if conflicts:
+            raise BookingConflict([conflict.message for conflict in conflicts])
+        try:
+            with transaction.atomic():
+                reservation.save()
+        except IntegrityError:
+            raise BookingConflict(f'Стол {desk.number} уже забронирован на дату {reservation.date}')
+    return reservation
+
+# Итог по одному бронированию пакета: reservation сохранена, если message пустое
+BookingResult = namedtuple('BookingResult', 'reservation message')
+
+def save_reservations(reservations, atomic=False, validator=None):
+    """
+    Пакетное бронирование (повторяющиеся брони, списки стол/дата).
+    Занятость самих столов и соседей для всех дат проверяется одним запросом,
+    брони принимаются по порядку (принятые занимают столы для следующих) и
+    вставляются bulk_create. При atomic=True любой конфликт отменяет весь пакет.
+    Возвращает BookingResult для каждой брони в исходном порядке.
+    """
+    validator = validator or NeighborDeskValidator()
+    reservations = list(reservations)
+    if not reservations:
+        return []
+    with _date_locks_for({reservation.date for reservation in reservations}), transaction.atomic():
+        _lock_desk_rows({reservation.desk for reservation in reservations}, validator)
+        neighbors = validator.neighbors_by_desk(reservations)
+        numbers = {reservation.desk.number for reservation in reservations}
+        numbers.update(number for desk_numbers in neighbors.values() for number in desk_numbers)
+        taken = validator.booked_numbers(reservations, numbers)
+
+        results = []
+        for reservation in reservations:
+            booked = taken[str(reservation.date)]
+            if reservation.desk.number in booked:
+                message = f'Стол {reservation.desk.number} уже забронирован на дату {reservation.date}'
+            else:
+                neighbor = next((n for n in neighbors[reservation.desk_id] if n in booked), None)
+                message = neighbor and ReservationConflict(reservation, neighbor).message
+            if not message:
+                booked.add(reservation.desk.number)
+            results.append(BookingResult(reservation, message or None))
+
+        accepted = [result.reservation for result in results if result.message is None]
+        if atomic and len(accepted) != len(results):
+            return [
+                result if result.message else BookingResult(result.reservation, 'Пакет отменён из-за конфликтов')
+                for result in results
+            ]
+        Reservation.objects.bulk_create(accepted)
+    # bulk_create не отправляет сигналы - маски занятости дат сбрасываем явно
+    # (после фиксации, в том числе внешней транзакции)
+    availability.invalidate_dates({reservation.date for reservation in accepted})
+    return results
@@ -0,0 +1,188 @@
+import threading
+import time
+from collections import Counter
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+# Версии в ключах: изменение сотрудника увеличивает его версию, старые фрагменты
+# просто перестают читаться и вытесняются по таймауту
+EMPLOYEE_VERSION_KEY = 'page-cache:v1:employee:{}'
+COLLECTION_VERSION_KEY = 'page-cache:v1:employees'
+FRAGMENT_KEY = 'page-cache:v1:{name}:{pk}:{version}:{day}'
+PAGE_KEY = 'page-cache:v1:{name}:{version}:{day}'
+# Версия матрицы навыков подбора (staffing.py), общая для всех процессов
+SKILL_MATRIX_VERSION_KEY = 'skill-matrix:v1'
+# Версия пространственного индекса столов (spatial.py)
+DESK_INDEX_VERSION_KEY = 'desk-index:v1'
+# Версия поискового индекса в памяти (search.py, когда FTS5 недоступен)
+SEARCH_INDEX_VERSION_KEY = 'search-index:v1'
+# Маски занятости столов (availability.py): версия на каждую дату и версия списка столов
+OCCUPANCY_VERSION_KEY = 'desk-occupancy:v2:version:{}'
+DESKS_VERSION_KEY = 'desk-occupancy:v2:desks:version'
+# Роли пользователей (permissions.py): версия прав и роли пользователя при этой версии
+PERMISSIONS_VERSION_KEY = 'roles:v1:version'
+ROLE_KEY = 'roles:v1:{pk}:{flags}:{version}'
+
+# Кэши, которые видит только свой процесс: версия, увеличенная в одном воркере,
+# не дойдёт до остальных
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+def record(name, hit):
+    with _stats_lock:
+        _stats[name, 'hits' if hit else 'misses'] += 1
+
+def cache_stats():
+    """Счётчики попаданий/промахов по видам кэша (в пределах процесса)"""
+    with _stats_lock:
+        names = sorted({name for name, _ in _stats})
+        return {name: {'hits': _stats[name, 'hits'], 'misses': _stats[name, 'misses']} for name in names}
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+def shared_cache():
+    """Кэш по умолчанию общий для всех процессов (Redis, Memcached, файлы, БД)"""
+    return settings.CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+def _initial_version():
+    # Если счётчик вытеснен из кэша, новая версия не совпадёт ни с одной из прежних
+    return time.time_ns()
+
+def _versions(keys):
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        initial = _initial_version()
+        for key in missing:
+            cache.add(key, initial, None)
+        versions.update(cache.get_many(missing))
+    return versions
+
+def employee_versions(pks):
+    """{pk: версия} для сотрудников, одним обращением к кэшу"""
+    keys = {EMPLOYEE_VERSION_KEY.format(pk): pk for pk in pks}
+    return {keys[key]: version for key, version in _versions(list(keys)).items()}
+
+def collection_version():
+    return _versions([COLLECTION_VERSION_KEY])[COLLECTION_VERSION_KEY]
+
+def bump_employees(pks, collection=False):
+    """
+    Инвалидирует закэшированные карточки и страницы сотрудников pks.
+    collection=True - изменился и сам набор (добавление, удаление, порядок),
+    что сбрасывает страницы со списками сотрудников. Версии увеличиваются после
+    фиксации транзакции: иначе параллельный запрос успел бы закэшировать
+    ещё старые данные под новой версией.
+    """
+    keys = [EMPLOYEE_VERSION_KEY.format(pk) for pk in set(pks)]
+    if collection:
+        keys.append(COLLECTION_VERSION_KEY)
+    _bump_on_commit(keys)
+
+def _bump_on_commit(keys):
+    def bump():
+        for key in keys:
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, _initial_version(), None)
+    transaction.on_commit(bump)
+
+def occupancy_versions(days):
+    """{дата: версия} масок занятости, одним обращением к кэшу"""
+    keys = {OCCUPANCY_VERSION_KEY.format(day): day for day in days}
+    return {keys[key]: version for key, version in _versions(list(keys)).items()}
+
+def desks_version():
+    return _versions([DESKS_VERSION_KEY])[DESKS_VERSION_KEY]
+
+def skill_matrix_version():
+    return _versions([SKILL_MATRIX_VERSION_KEY])[SKILL_MATRIX_VERSION_KEY]
+
+def desk_index_version():
+    return _versions([DESK_INDEX_VERSION_KEY])[DESK_INDEX_VERSION_KEY]
+
+def search_index_version():
+    return _versions([SEARCH_INDEX_VERSION_KEY])[SEARCH_INDEX_VERSION_KEY]
+
+def permissions_version():
+    return _versions([PERMISSIONS_VERSION_KEY])[PERMISSIONS_VERSION_KEY]
+
+def bump_permissions():
+    """Группы или права изменились - закэшированные роли всех пользователей устарели"""
+    _bump_on_commit([PERMISSIONS_VERSION_KEY])
+
+def bump_occupancy(days=(), desks=False):
+    """
+    Брони дат days (или, при desks=True, набор доступных столов) изменились.
+    Маска, посчитанная до фиксации и записанная позже, остаётся под старой версией
+    и больше не читается.
+    """
+    keys = [OCCUPANCY_VERSION_KEY.format(day) for day in set(days)]
+    if desks:
+        keys.append(DESKS_VERSION_KEY)
+    _bump_on_commit(keys)
+
+def bump_skill_matrix():
+    """Навыки, столы или состав сотрудников изменились - матрицу подбора перестраивают все процессы"""
+    _bump_on_commit([SKILL_MATRIX_VERSION_KEY])
+
+def bump_desk_index():
+    """Столы изменились - пространственный индекс перестраивают все процессы"""
+    _bump_on_commit([DESK_INDEX_VERSION_KEY])
+
+def bump_search_index():
+    """Поисковые документы изменились - индекс в памяти перестраивают все процессы"""
+    _bump_on_commit([SEARCH_INDEX_VERSION_KEY])
+
+def _today():
+    # В карточках выводится стаж в днях - кэш не переживает смену даты
+    return timezone.localdate().isoformat()
+
+def cached_fragments(name, objects, render):
+    """
+    HTML-фрагменты render(obj) для каждого объекта: версии и фрагменты читаются
+    двумя get_many, отрисовываются и записываются одним set_many только промахи.
+    """
+    objects = list(objects)
+    versions = employee_versions([obj.pk for obj in objects])
+    day = _today()
+    keys = [FRAGMENT_KEY.format(name=name, pk=obj.pk, version=versions[obj.pk], day=day) for obj in objects]
+    cached = cache.get_many(keys)
+    fragments, missed = [], {}
+    for obj, key in zip(objects, keys):
+        hit = key in cached
+        record(name, hit)
+        if not hit:
+            cached[key] = missed[key] = render(obj)
+        fragments.append(cached[key])
+    if missed:
+        cache.set_many(missed, settings.PAGE_CACHE_TIMEOUT)
+    return fragments
+
+def get_cached_page(name, version, stat=None):
+    """
+    HTML страницы из кэша или None. Страница хранится вместе с версиями
+    показанных на ней сотрудников и устаревает, если любая из них изменилась.
+    """
+    entry = cache.get(PAGE_KEY.format(name=name, version=version, day=_today()))
+    hit = entry is not None and employee_versions(entry['employees']) == entry['employees']
+    record(stat or name, hit)
+    return entry['content'] if hit else None
+
+def set_cached_page(name, version, content, employees):
+    """employees - {pk: версия} показанных сотрудников, прочитанные до отрисовки"""
+    cache.set(
+        PAGE_KEY.format(name=name, version=version, day=_today()),
+        {'content': content, 'employees': employees},
+        settings.PAGE_CACHE_TIMEOUT,
+    )
@@ -0,0 +1,70 @@
+import hashlib
+from datetime import datetime, time
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+class ConditionalGetMixin:
+    """
+    Условный GET для list/retrieve во viewset'ах. Версия выборки - COUNT и MAX(updated_at)
+    одним агрегатным запросом (после фильтров, до пагинации и сериализации); совпал
+    If-None-Match или If-Modified-Since - ответ 304 без чтения строк.
+    """
+    # Поля-маркеры версии, в том числе связанных моделей, которые выводит сериализатор
+    etag_fields = ('updated_at',)
+    # Ответ зависит от текущей даты (стаж в днях) - версия меняется в полночь
+    etag_daily = False
+
+    def get_version(self, queryset):
+        aggregates = {'count': Count('pk')}
+        aggregates.update({field: Max(field) for field in self.etag_fields})
+        return queryset.order_by().aggregate(**aggregates)
+
+    def get_etag(self, version):
+        # В ETag входят URL (фильтры, страница, курсор) и хост: ссылки в ответе абсолютные
+        parts = [self.request.get_host(), self.request.get_full_path(), self.request.headers.get('Accept', '')]
+        parts += [version['count']] + [version[field] for field in self.etag_fields]
+        if self.etag_daily:
+            parts.append(timezone.localdate())
+        return '"%s"' % hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+
+    def get_last_modified(self, version):
+        stamps = [version[field] for field in self.etag_fields if version[field] is not None]
+        if self.etag_daily:
+            stamps.append(timezone.make_aware(datetime.combine(timezone.localdate(), time.min)))
+        return int(max(stamps).timestamp()) if stamps else None
+
+    def conditional_response(self, queryset, render, last_modified=False):
+        version = self.get_version(queryset)
+        if not version['count']:
+            # Пустая выборка или нет объекта - обычный ответ (пустой список или 404)
+            return render()
+        etag = self.get_etag(version)
+        # Удаление строки не сдвигает MAX(updated_at), поэтому для списков
+        # Last-Modified не выставляется - только ETag, где учтён COUNT
+        modified = self.get_last_modified(version) if last_modified else None
+        response = get_conditional_response(self.request, etag=etag, last_modified=modified)
+        if response is None:
+            response = render()
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if modified is not None:
+                response['Last-Modified'] = http_date(modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        render = lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        return self.conditional_response(self.filter_queryset(self.get_queryset()), render)
+
+    def retrieve(self, request, *args, **kwargs):
+        render = lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (TypeError, ValueError, ValidationError):
+            return render()
+        return self.conditional_response(queryset, render, last_modified=True)
@@ -0,0 +1,164 @@
+import csv
+import tempfile
+from itertools import islice
+from django.core.serializers.json import DjangoJSONEncoder
+from .filters import EmployeeFilter
+from .models import Employee, EmployeeSkill, Reservation
+from .serializers import EmployeeListSerializer, EmployeeListFastSerializer
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+# Строк на один запрос к БД (.iterator) и на один кусок ответа
+CHUNK_SIZE = 2000
+
+class ExportError(Exception):
+    pass
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+class Export:
+    """
+    Выгрузка одной таблицы: columns - колонки CSV/XLSX, rows() - словари по одному,
+    из .iterator() кусками chunk_size, так что память не зависит от числа строк.
+    """
+    name = None
+    columns = ()
+
+    def __init__(self, employees, context=None, chunk_size=CHUNK_SIZE):
+        self.employees = employees
+        self.context = context or {}
+        self.chunk_size = chunk_size
+
+    def queryset(self):
+        raise NotImplementedError
+
+    def rows(self):
+        return self.queryset().iterator(chunk_size=self.chunk_size)
+
+class EmployeeExport(Export):
+    name = 'employees'
+    columns = (
+        'id', 'first_name', 'last_name', 'position', 'position_display', 'desk_number', 'hire_date',
+        'gender', 'skills', 'main_photo', 'image_count', 'work_experience_days',
+    )
+
+    def queryset(self):
+        return self.employees.order_by('id').values(*EmployeeListFastSerializer.VALUE_FIELDS)
+
+    def rows(self):
+        # Строка NDJSON совпадает с элементом списка /api/employees/
+        serializer = EmployeeListSerializer(many=True, context=self.context)
+        for chunk in _chunks(super().rows(), self.chunk_size):
+            yield from serializer.to_representation(chunk)
+
+class EmployeeSkillExport(Export):
+    name = 'skills'
+    columns = ('id', 'employee', 'employee_name', 'skill', 'skill_name', 'level', 'level_display')
+    LEVEL_LABELS = dict(EmployeeSkill.LEVEL_CHOICES)
+
+    def queryset(self):
+        return EmployeeSkill.objects.filter(employee__in=self.employees.values('pk')).order_by('id').values_list(
+            'id', 'employee_id', 'employee__first_name', 'employee__last_name', 'skill_id', 'skill__name', 'level',
+        )
+
+    def rows(self):
+        for pk, employee, first_name, last_name, skill, skill_name, level in super().rows():
+            yield {
+                'id': pk,
+                'employee': employee,
+                'employee_name': f'{first_name} {last_name}',
+                'skill': skill,
+                'skill_name': skill_name,
+                'level': level,
+                'level_display': self.LEVEL_LABELS.get(level, level),
+            }
+
+class ReservationExport(Export):
+    """Бронирования не привязаны к сотрудникам - фильтры сотрудников к ним не применяются"""
+    name = 'reservations'
+    columns = ('id', 'user', 'username', 'desk', 'desk_number', 'date', 'created_at')
+
+    def queryset(self):
+        return Reservation.objects.order_by('date', 'id').values_list(
+            'id', 'user_id', 'user__username', 'desk_id', 'desk__number', 'date', 'created_at',
+        )
+
+    def rows(self):
+        for values in super().rows():
+            yield dict(zip(self.columns, values))
+
+EXPORTS = {export.name: export for export in (EmployeeExport, EmployeeSkillExport, ReservationExport)}
+
+def filtered_employees(params):
+    """Сотрудники по параметрам EmployeeFilter (как в /api/employees/)"""
+    filterset = EmployeeFilter(params, queryset=Employee.objects.all())
+    if not filterset.is_valid():
+        raise ExportError({field: [str(error) for error in errors] for field, errors in filterset.errors.items()})
+    return filterset.qs
+
+def _cell(value):
+    if isinstance(value, list):
+        return '; '.join(str(item) for item in value)
+    return value
+
+class Echo:
+    """Файлоподобный объект для csv.writer: write() возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+def write_ndjson(export):
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for chunk in _chunks(export.rows(), export.chunk_size):
+        yield ''.join(encoder.encode(row) + '\n' for row in chunk).encode()
+
+def write_csv(export):
+    writer = csv.writer(Echo())
+    # BOM: Excel иначе открывает кириллицу в CSV как cp1251
+    yield ('\ufeff' + writer.writerow(export.columns)).encode()
+    for chunk in _chunks(export.rows(), export.chunk_size):
+        yield ''.join(
+            writer.writerow([_cell(row[column]) for column in export.columns]) for row in chunk
+        ).encode()
+
+def write_xlsx(export):
+    """
+    XLSX - zip-архив, который дописывается только целиком: строки пишутся
+    в write-only книгу openpyxl (листы уходят во временные файлы), готовый файл
+    отдаётся кусками. Память постоянна, но первый байт - после последней строки.
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(export.name)
+    sheet.append(export.columns)
+    for row in export.rows():
+        sheet.append([_cell(row[column]) for column in export.columns])
+    with tempfile.TemporaryFile() as target:
+        workbook.save(target)
+        target.seek(0)
+        while chunk := target.read(64 * 1024):
+            yield chunk
+
+# формат: (функция записи, Content-Type)
+FORMATS = {
+    'ndjson': (write_ndjson, 'application/x-ndjson'),
+    'csv': (write_csv, 'text/csv; charset=utf-8'),
+    'xlsx': (write_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+def export_stream(dataset, fmt, params, context=None, chunk_size=CHUNK_SIZE):
+    """(генератор байтов, Content-Type) выгрузки dataset в формате fmt; ExportError - неверные параметры"""
+    if dataset not in EXPORTS:
+        raise ExportError(f'Неизвестная выгрузка "{dataset}", доступны: {", ".join(EXPORTS)}')
+    if fmt not in FORMATS:
+        raise ExportError(f'Неизвестный формат "{fmt}", доступны: {", ".join(FORMATS)}')
+    if fmt == 'xlsx' and openpyxl is None:
+        raise ExportError('Выгрузка в XLSX недоступна: не установлен openpyxl')
+    export = EXPORTS[dataset](filtered_employees(params), context, chunk_size)
+    writer, content_type = FORMATS[fmt]
+    return writer(export), content_type
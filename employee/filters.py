@@ -1,34 +1,97 @@
+from datetime import timedelta
 import django_filters
-from .models import Employee
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.functional import cached_property
+from .models import Employee, Skill, EmployeeSkill
+from .search import search_employees, normalize
+
+class ChoiceInFilter(django_filters.BaseInFilter, django_filters.ChoiceFilter):
+    """Несколько значений через запятую: position=backend,frontend"""
+
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    pass
+
+class CharInFilter(django_filters.BaseInFilter, django_filters.CharFilter):
+    pass
+
+def resolve_skills(names):
+    """
+    id навыков для каждого названия из names (справочник навыков небольшой -
+    один запрос): точное совпадение без учёта регистра, если его нет - по вхождению
+    подстроки, как прежний icontains (script - JavaScript и TypeScript).
+    """
+    skills = list(Skill.objects.values_list('id', 'name'))
+    resolved = []
+    for name in names:
+        name = normalize(name.strip())
+        exact = [pk for pk, skill in skills if normalize(skill) == name]
+        resolved.append(exact or [pk for pk, skill in skills if name in normalize(skill)])
+    return resolved
 
 class EmployeeFilter(django_filters.FilterSet):
-    skills = django_filters.CharFilter(field_name='skills__name', lookup_expr='icontains')
+    # Поиск по индексу (search.py): префиксы, опечатки, раскладка - без LIKE '%x%' и JOIN
+    search = django_filters.CharFilter(method='filter_search')
+    # skills=python,django - есть все перечисленные навыки (не ниже min_skill_level)
+    skills = CharInFilter(method='filter_skills')
+    min_skill_level = django_filters.TypedChoiceFilter(
+        choices=EmployeeSkill.LEVEL_CHOICES, coerce=int, method='filter_min_skill_level',
+    )
     min_experience_days = django_filters.NumberFilter(method='filter_min_experience')
     max_experience_days = django_filters.NumberFilter(method='filter_max_experience')
-    position = django_filters.ChoiceFilter(choices=Employee.POSITION_CHOICES)
-    gender = django_filters.ChoiceFilter(choices=Employee.GENDER_CHOICES)  # Теперь будет работать
-    desk_number = django_filters.NumberFilter()
-    
+    position = ChoiceInFilter(choices=Employee.POSITION_CHOICES)
+    gender = ChoiceInFilter(choices=Employee.GENDER_CHOICES)
+    desk_number = NumberInFilter()
+
     class Meta:
         model = Employee
-        fields = ['skills', 'position', 'gender', 'desk_number']
-    
+        fields = ['search', 'skills', 'position', 'gender', 'desk_number']
+
+    @cached_property
+    def today(self):
+        return timezone.now().date()
+
+    def filter_search(self, queryset, name, value):
+        """Имя, фамилия, должность и навыки"""
+        return search_employees(queryset, value)
+
+    def skill_exists(self, skill_ids=None):
+        """
+        EXISTS по навыкам сотрудника вместо JOIN: строки не дублируются и distinct()
+        не нужен; подзапрос идёт по индексу employeeskill (employee, skill, level).
+        """
+        skills = EmployeeSkill.objects.filter(employee=OuterRef('pk'))
+        if skill_ids is not None:
+            skills = skills.filter(skill__in=skill_ids)
+        level = self.form.cleaned_data.get('min_skill_level')
+        if level:
+            skills = skills.filter(level__gte=level)
+        return Exists(skills)
+
+    def filter_skills(self, queryset, name, value):
+        names = [item for item in value if item.strip()]
+        if not names:
+            return queryset
+        for skill_ids in resolve_skills(names):
+            if not skill_ids:
+                return queryset.none()
+            queryset = queryset.filter(self.skill_exists(skill_ids))
+        return queryset
+
+    def filter_min_skill_level(self, queryset, name, value):
+        # Вместе со skills уровень проверяется в их подзапросах
+        if not value or any(item.strip() for item in self.form.cleaned_data.get('skills') or ()):
+            return queryset
+        return queryset.filter(self.skill_exists())
+
     def filter_min_experience(self, queryset, name, value):
         """
         Фильтр по минимальному стажу (в днях)
         """
-        from django.utils import timezone
-        from datetime import timedelta
-        
-        min_hire_date = timezone.now().date() - timedelta(days=int(value))
-        return queryset.filter(hire_date__lte=min_hire_date)
-    
+        return queryset.filter(hire_date__lte=self.today - timedelta(days=int(value)))
+
     def filter_max_experience(self, queryset, name, value):
         """
         Фильтр по максимальному стажу (в днях)
         """
-        from django.utils import timezone
-        from datetime import timedelta
-        
-        max_hire_date = timezone.now().date() - timedelta(days=int(value))
-        return queryset.filter(hire_date__gte=max_hire_date)
\ No newline at end of file
+        return queryset.filter(hire_date__gte=self.today - timedelta(days=int(value)))
@@ -0,0 +1,231 @@
+import posixpath
+from datetime import date, datetime
+from collections import defaultdict, namedtuple
+from contextlib import nullcontext
+from itertools import islice
+import tablib
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from .models import Employee, Skill, EmployeeSkill
+from .seating import SeatingConflict, find_seating_conflicts
+from .caching import bump_employees, bump_skill_matrix
+from .search import document, index_documents
+from .analytics import employees_added
+
+# Сотрудников на один bulk_create и одну транзакцию (при atomic=False)
+CHUNK_SIZE = 5000
+
+# Колонки файла; остальные (например, id и position_display из выгрузки) игнорируются
+COLUMNS = ('first_name', 'last_name', 'position', 'desk_number', 'hire_date', 'gender', 'skills')
+REQUIRED_COLUMNS = ('first_name', 'last_name', 'position', 'desk_number')
+DEFAULT_SKILL_LEVEL = 1
+
+# Поля, которые не приходят из файла и не проверяются построчно
+SKIP_FIELDS = ('id', 'updated_at') + Employee.SUMMARY_FIELDS
+
+# Итог импорта: число созданных сотрудников и навыков, ошибки по строкам
+# ({'row': номер строки файла, 'errors': {поле: [сообщения]}})
+ImportResult = namedtuple('ImportResult', 'created skills_created errors')
+
+class EmployeeImportError(Exception):
+    """Файл не удаётся прочитать целиком (формат, заголовок)"""
+
+def load_dataset(file, name):
+    """tablib.Dataset из загруженного файла; формат - по расширению (.csv или .xlsx)"""
+    fmt = posixpath.splitext(name or '')[1].lower().lstrip('.')
+    if fmt not in ('csv', 'xlsx'):
+        raise EmployeeImportError('Поддерживаются файлы .csv и .xlsx')
+    content = file.read()
+    if fmt == 'csv':
+        try:
+            # utf-8-sig: CSV из Excel и из выгрузки начинается с BOM
+            content = content.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise EmployeeImportError('CSV должен быть в кодировке UTF-8')
+    try:
+        return tablib.Dataset().load(content, format=fmt)
+    except ImportError:
+        raise EmployeeImportError('Импорт XLSX недоступен: не установлен openpyxl')
+    except Exception as e:
+        raise EmployeeImportError(f'Не удалось прочитать файл: {e}')
+
+def _choice_lookup(choices):
+    """Значение поля по значению или подписи без учёта регистра"""
+    lookup = {}
+    for value, label in choices:
+        lookup[value.casefold()] = value
+        lookup[str(label).casefold()] = value
+    return lookup
+
+POSITIONS = _choice_lookup(Employee.POSITION_CHOICES)
+GENDERS = _choice_lookup(Employee.GENDER_CHOICES)
+LEVELS = {value for value, _ in EmployeeSkill.LEVEL_CHOICES}
+
+def _text(value):
+    # XLSX отдаёт числа и даты типизированными
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+def parse_skills(value):
+    """'Python:3; Django' -> [('Python', 3), ('Django', 1)]; повторы - последний уровень"""
+    skills = {}
+    for item in _text(value).split(';'):
+        name, separator, level = item.rpartition(':')
+        if not separator:
+            name, level = level, ''
+        name = name.strip()
+        if not name:
+            continue
+        if level.strip():
+            try:
+                level = int(level)
+            except ValueError:
+                level = None
+            if level not in LEVELS:
+                raise ValidationError(f'Уровень навыка "{name}" должен быть от 1 до 4')
+        else:
+            level = DEFAULT_SKILL_LEVEL
+        skills[name.casefold()] = (name, level)
+    return list(skills.values())
+
+def build_employee(row):
+    """(Employee, [(навык, уровень)]) из строки файла; ValidationError.message_dict - ошибки полей"""
+    errors = {}
+    data = {}
+    for column in COLUMNS[:-1]:
+        value = _text(row.get(column))
+        if value:
+            data[column] = value
+        elif column in REQUIRED_COLUMNS:
+            errors[column] = ['Обязательное поле']
+    for column, lookup in (('position', POSITIONS), ('gender', GENDERS)):
+        if column in data:
+            data[column] = lookup.get(data[column].casefold(), data[column])
+    try:
+        skills = parse_skills(row.get('skills'))
+    except ValidationError as e:
+        errors['skills'] = e.messages
+        skills = []
+
+    employee = Employee(**data)
+    try:
+        # Без full_clean(): правило рассадки проверяется для всего пакета сразу
+        employee.clean_fields(exclude=SKIP_FIELDS + tuple(errors))
+    except ValidationError as e:
+        errors.update(e.message_dict)
+    if errors:
+        raise ValidationError(errors)
+    return employee, skills
+
+def _chunks(items, size):
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+def import_employees(dataset, atomic=False, create_skills=False, chunk_size=CHUNK_SIZE):
+    """
+    Массовый импорт сотрудников с навыками из tablib.Dataset.
+    Весь пакет проверяется в памяти: поля, навыки по названию (один запрос),
+    правило тестировщик/разработчик для всех строк сразу (один запрос за соседями).
+    Корректные строки записываются bulk_create кусками по chunk_size, каждый
+    в своей транзакции; при atomic=True любая ошибка отменяет весь импорт.
+    """
+    headers = [_text(header).lower() for header in dataset.headers or ()]
+    missing = [column for column in REQUIRED_COLUMNS if column not in headers]
+    if missing:
+        raise EmployeeImportError(f'В файле нет колонок: {", ".join(missing)}')
+
+    errors = {}
+    parsed = []
+    for index, values in enumerate(dataset, start=2):
+        try:
+            employee, skills = build_employee(dict(zip(headers, values)))
+        except ValidationError as e:
+            errors[index] = e.message_dict
+            continue
+        parsed.append((index, employee, skills))
+
+    # Навыки по названию без учёта регистра; при совпадении названий - первый созданный
+    known = {}
+    for pk, name in Skill.objects.order_by('-id').values_list('id', 'name'):
+        known[name.casefold()] = (pk, name)
+    if not create_skills:
+        for index, employee, skills in parsed:
+            unknown = [name for name, _ in skills if name.casefold() not in known]
+            if unknown:
+                errors[index] = {'skills': [f'Неизвестные навыки: {", ".join(unknown)}']}
+        parsed = [item for item in parsed if item[0] not in errors]
+
+    rows = {id(employee): index for index, employee, _ in parsed}
+    # Конфликты двух строк файла - у более поздней, с указанием более ранней
+    clashes = defaultdict(list)
+    for conflict in find_seating_conflicts([(employee, employee.desk_number) for _, employee, _ in parsed]):
+        row, other = rows[id(conflict.employee)], rows.get(id(conflict.neighbor))
+        if other is None:
+            # Сосед уже сидит за своим столом в БД
+            errors.setdefault(row, {}).setdefault('desk_number', []).append(conflict.message)
+        elif other < row:
+            clashes[row].append((other, conflict))
+        else:
+            clashes[other].append((row, SeatingConflict(
+                conflict.neighbor, conflict.neighbor_desk_number, conflict.employee, conflict.desk_number,
+            )))
+    # Строки принимаются по порядку файла: мешает только уже принятая строка,
+    # отклонённая стол не занимает (цепочка A-B-C: B отклонена, C принимается)
+    accepted = set()
+    for index, _, _ in parsed:
+        for other, conflict in clashes[index] if index not in errors else ():
+            if other in accepted:
+                errors.setdefault(index, {}).setdefault('desk_number', []).append(conflict.message)
+        if index not in errors:
+            accepted.add(index)
+    parsed = [item for item in parsed if item[0] in accepted]
+
+    new_skills = {}
+    for _, _, skills in parsed:
+        for name, _ in skills:
+            if name.casefold() not in known:
+                new_skills.setdefault(name.casefold(), Skill(name=name))
+
+    report = [{'row': index, 'errors': errors[index]} for index in sorted(errors)]
+    if atomic and errors:
+        return ImportResult(0, 0, report)
+
+    created = 0
+    with transaction.atomic() if atomic else nullcontext():
+        if new_skills:
+            Skill.objects.bulk_create(new_skills.values())
+        known.update({key: (skill.pk, skill.name) for key, skill in new_skills.items()})
+
+        for chunk in _chunks(parsed, chunk_size):
+            with transaction.atomic():
+                for _, employee, skills in chunk:
+                    # Сводку для списков заполняем сразу - refresh_employee_summaries не нужен
+                    employee.skill_names = [known[name.casefold()][1] for name, _ in skills]
+                Employee.objects.bulk_create([employee for _, employee, _ in chunk])
+                employee_skills = EmployeeSkill.objects.bulk_create([
+                    EmployeeSkill(employee_id=employee.pk, skill_id=known[name.casefold()][0], level=level)
+                    for _, employee, skills in chunk for name, level in skills
+                ])
+                positions = {employee.pk: employee.position for _, employee, _ in chunk}
+                employees_added(
+                    [employee for _, employee, _ in chunk],
+                    [(item.skill_id, item.level, positions[item.employee_id]) for item in employee_skills],
+                )
+                index_documents({
+                    employee.pk: document(employee.first_name, employee.last_name, employee.position, employee.skill_names)
+                    for _, employee, _ in chunk
+                })
+            created += len(chunk)
+    if created:
+        # Новые сотрудники меняют только списки - версий отдельных сотрудников у них ещё нет
+        bump_employees([], collection=True)
+        bump_skill_matrix()
+    return ImportResult(created, len(new_skills), report)
@@ -0,0 +1,93 @@
+import random
+import time
+from unittest.mock import patch
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from employee.models import Employee, Skill, EmployeeSkill
+from employee.search import search_employees, rebuild_search_index, invalidate_local_index
+
+FIRST_NAMES = ['Александр', 'Алексей', 'Анна', 'Борис', 'Вера', 'Дмитрий', 'Екатерина', 'Елена', 'Иван',
+               'Игорь', 'Мария', 'Михаил', 'Наталья', 'Никита', 'Ольга', 'Павел', 'Семён', 'Сергей', 'Юлия']
+LAST_NAME_STEMS = ['Петров', 'Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов', 'Лебедев', 'Козлов',
+                   'Новиков', 'Морозов', 'Волков', 'Соловьёв', 'Васильев', 'Зайцев', 'Павлов', 'Семёнов',
+                   'Голубев', 'Виноградов', 'Богданов', 'Воробьёв', 'Фёдоров', 'Михайлов', 'Беляев', 'Тарасов']
+SKILLS = ['Python', 'Django', 'PostgreSQL', 'JavaScript', 'TypeScript', 'React', 'Vue', 'Docker', 'Kubernetes',
+          'Go', 'Java', 'Kotlin', 'Swift', 'Figma', 'Selenium', 'Pytest', 'SQL', 'Linux', 'Git', 'Redis']
+# (запрос, как его искали раньше: LIKE по имени/фамилии или по навыку)
+QUERIES = [('Петров', 'name'), ('петр', 'name'), ('Виноградво', 'name'), ('gtnhjd', 'name'),
+           ('Kubernetes', 'skills'), ('kube', 'skills')]
+
+class Command(BaseCommand):
+    help = 'Замер поиска сотрудников: LIKE с JOIN против FTS5 и индекса в памяти (во временной БД)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        # Рабочая БД не трогается: данные создаются в тестовой базе, которая удаляется после замера
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.populate(options['employees'])
+            self.measure(options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def populate(self, count):
+        rng = random.Random(0)
+        skills = Skill.objects.bulk_create([Skill(name=name) for name in SKILLS])
+        started = time.perf_counter()
+        for offset in range(0, count, 5000):
+            employees = []
+            chosen = []
+            for _ in range(min(5000, count - offset)):
+                first_name = rng.choice(FIRST_NAMES)
+                last_name = rng.choice(LAST_NAME_STEMS) + ('а' if first_name[-1] in 'аяи' else '')
+                employee_skills = rng.sample(skills, 3)
+                employees.append(Employee(
+                    first_name=first_name, last_name=last_name,
+                    position=rng.choice(['backend', 'frontend', 'tester', 'manager', 'designer']),
+                    desk_number=rng.randrange(count), skill_names=[skill.name for skill in employee_skills],
+                ))
+                chosen.append(employee_skills)
+            Employee.objects.bulk_create(employees)
+            EmployeeSkill.objects.bulk_create([
+                EmployeeSkill(employee=employee, skill=skill, level=2)
+                for employee, employee_skills in zip(employees, chosen) for skill in employee_skills
+            ])
+        rebuild_search_index()
+        self.stdout.write(f'{count} сотрудников и индекс: {time.perf_counter() - started:.1f} с')
+
+    def timed(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - started)
+        return min(timings) * 1000, result
+
+    def measure(self, repeat):
+        def like(query, column):
+            if column == 'skills':
+                condition = Q(skills__name__icontains=query)
+            else:
+                condition = Q(first_name__icontains=query) | Q(last_name__icontains=query)
+            return Employee.objects.filter(condition).distinct().count()
+
+        def indexed(query, column):
+            columns = ('skills',) if column == 'skills' else ('name',)
+            return search_employees(Employee.objects.all(), query, columns=columns).count()
+
+        invalidate_local_index()
+        self.stdout.write(f'{"Запрос":>14} {"LIKE, мс":>10} {"FTS5, мс":>10} {"Память, мс":>11} {"Найдено LIKE/FTS5":>19}')
+        for query, column in QUERIES:
+            like_ms, like_count = self.timed(lambda: like(query, column), repeat)
+            fts_ms, fts_count = self.timed(lambda: indexed(query, column), repeat)
+            with patch('employee.search.fts5_available', return_value=False):
+                indexed(query, column)  # построение индекса в памяти не входит в замер
+                local_ms, _ = self.timed(lambda: indexed(query, column), repeat)
+            self.stdout.write(
+                f'{query:>14} {like_ms:>10.1f} {fts_ms:>10.1f} {local_ms:>11.1f} {f"{like_count}/{fts_count}":>19}'
+            )
+        invalidate_local_index()
@@ -0,0 +1,77 @@
+import random
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import ListSerializer
+from rest_framework.test import APIRequestFactory
+from employee.models import Employee
+from employee.serializers import EmployeeListSerializer, EmployeeListFastSerializer
+
+def build_employees(count):
+    """Сотрудники в памяти (без БД): замеряется только сериализация"""
+    positions = [value for value, _ in Employee.POSITION_CHOICES]
+    skills = ['Python', 'Django', 'SQL', 'React', 'Docker', 'Figma']
+    rng = random.Random(0)
+    employees = []
+    for pk in range(1, count + 1):
+        photo = f'employees/{pk % 256:02x}/{pk:064x}.jpg' if pk % 4 else ''
+        employees.append(Employee(
+            pk=pk,
+            first_name=f'Имя{pk}',
+            last_name='Фамилия',
+            position=rng.choice(positions),
+            desk_number=pk,
+            hire_date=date(2015, 1, 1) + timedelta(days=rng.randrange(3650)),
+            gender=rng.choice(['male', 'female']),
+            skill_names=rng.sample(skills, rng.randrange(len(skills))),
+            main_photo=photo,
+            main_photo_thumbnails=bool(photo) and pk % 3 != 0,
+            image_count=int(bool(photo)) + pk % 3,
+        ))
+    return employees
+
+def best_time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+class Command(BaseCommand):
+    help = 'Сравнение обычного и быстрого пути EmployeeListSerializer(many=True) по времени и выводу'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', nargs='+', type=int, default=[100, 1000, 10000])
+        parser.add_argument('--repeat', type=int, default=5, help='Повторы, берётся лучшее время')
+
+    def handle(self, *args, **options):
+        renderer = JSONRenderer()
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            context = {'request': APIRequestFactory().get('/api/employees/')}
+            self.stdout.write(f'{"Строк":>8} {"DRF, мс":>10} {"Быстрый, мс":>12} {"Из values(), мс":>16} {"Ускорение":>10}')
+            for count in options['rows']:
+                employees = build_employees(count)
+                rows = list(EmployeeListFastSerializer(child=EmployeeListSerializer()).rows(employees))
+
+                slow, expected = best_time(
+                    lambda: ListSerializer(child=EmployeeListSerializer(), instance=employees, context=context).data,
+                    options['repeat'],
+                )
+                fast, actual = best_time(
+                    lambda: EmployeeListSerializer(employees, many=True, context=context).data,
+                    options['repeat'],
+                )
+                values, from_values = best_time(
+                    lambda: EmployeeListSerializer(rows, many=True, context=context).data,
+                    options['repeat'],
+                )
+                expected = renderer.render(expected)
+                if renderer.render(actual) != expected or renderer.render(from_values) != expected:
+                    raise CommandError(f'{count} строк: вывод быстрого пути отличается от DRF')
+                self.stdout.write(
+                    f'{count:>8} {slow * 1000:>10.1f} {fast * 1000:>12.1f} {values * 1000:>16.1f} '
+                    f'{slow / values:>9.1f}x'
+                )
@@ -0,0 +1,32 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from employee.spatial import DeskSpatialIndex
+
+class Command(BaseCommand):
+    help = 'Замер поиска столов по пространственному индексу (синтетические данные в памяти, без БД)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desks', type=int, default=20000)
+        parser.add_argument('--side', type=int, default=2000)
+        parser.add_argument('--cell-size', type=float, default=10)
+        parser.add_argument('--repeat', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(1)
+        side = options['side']
+        desks = [(i, str(i), rng.randint(0, side), rng.randint(0, side)) for i in range(options['desks'])]
+        started = time.perf_counter()
+        index = DeskSpatialIndex(desks, cell_size=options['cell_size'])
+        self.stdout.write(f'Индекс {len(index)} столов за {(time.perf_counter() - started) * 1000:.0f} мс')
+        points = [(rng.uniform(0, side), rng.uniform(0, side)) for _ in range(options['repeat'])]
+        queries = [
+            ('в радиусе 10', lambda x, y: index.within(x, y, 10)),
+            ('5 ближайших', lambda x, y: index.nearest(x, y, 5)),
+        ]
+        for label, query in queries:
+            started = time.perf_counter()
+            for x, y in points:
+                query(x, y)
+            elapsed = (time.perf_counter() - started) / len(points)
+            self.stdout.write(f'  {label:>14}: {elapsed * 1e6:7.1f} мкс на запрос')
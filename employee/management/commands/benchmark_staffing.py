@@ -0,0 +1,54 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from employee.staffing import SkillMatrix, numpy
+
+POSITIONS = ['backend', 'frontend', 'tester', 'manager', 'designer']
+
+class Command(BaseCommand):
+    help = 'Замер подбора сотрудников по матрице навыков (синтетические данные в памяти, без БД)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=50000)
+        parser.add_argument('--skills', type=int, default=200)
+        parser.add_argument('--per-employee', type=int, default=6)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        count = options['employees']
+        side = int(count ** 0.5) + 1
+        desks = [(number, number % side, number // side) for number in range(count)]
+        employees = [(pk, rng.choice(POSITIONS), rng.randrange(count)) for pk in range(1, count + 1)]
+        # Популярность навыков неравномерна: первые встречаются намного чаще
+        weights = [1 / (rank + 1) for rank in range(options['skills'])]
+        skills = [
+            (pk, skill_id, rng.randint(1, 4))
+            for pk, _, _ in employees
+            for skill_id in set(rng.choices(range(options['skills']), weights, k=options['per_employee']))
+        ]
+        queries = [
+            ('2 частых навыка', {0: 3, 1: 2}, {}),
+            ('4 навыка', {0: 3, 3: 2, 10: 2, 40: 1}, {}),
+            ('2 навыка + близость', {0: 3, 1: 2}, {'near': (side / 2, side / 2), 'proximity_weight': 0.3}),
+            ('редкий навык', {150: 4}, {}),
+            ('все уровни, 2 должности', {0: 4, 2: 3, 5: 2}, {'require_all': True, 'positions': ['backend', 'tester']}),
+        ]
+
+        backends = [('Python', False)] + ([('NumPy', True)] if numpy is not None else [])
+        for name, use_numpy in backends:
+            started = time.perf_counter()
+            matrix = SkillMatrix(employees, skills, desks, use_numpy=use_numpy)
+            self.stdout.write(
+                f'{name}: матрица {len(matrix)} x {len(matrix.columns)} ({len(skills)} навыков у сотрудников) '
+                f'за {(time.perf_counter() - started) * 1000:.0f} мс'
+            )
+            for label, requirements, kwargs in queries:
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    matrix.match(requirements, k=10, **kwargs)
+                    timings.append(time.perf_counter() - started)
+                self.stdout.write(f'  {label:>22}: {min(timings) * 1000:7.2f} мс')
+        if numpy is None:
+            self.stdout.write('NumPy не установлен - замерен только запасной вариант на чистом Python')
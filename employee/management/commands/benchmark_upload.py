@@ -0,0 +1,93 @@
+import math
+import multiprocessing
+import os
+import resource
+import tempfile
+from django import forms
+from django.conf import global_settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import load_handler
+from django.core.management.base import BaseCommand, CommandError
+from django.http.multipartparser import MultiPartParser
+from django.test import override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from PIL import Image
+from employee.uploads import ChunkedImageUploadHandler, inspect_image
+
+def _default_upload(body_path, meta):
+    """Стандартные обработчики Django и forms.ImageField (Image.open + verify)"""
+    handlers = [load_handler(path, None) for path in global_settings.FILE_UPLOAD_HANDLERS]
+    with open(body_path, 'rb') as stream:
+        _, files = MultiPartParser(meta, stream, handlers).parse()
+    image = forms.ImageField().clean(files['image'])
+    default_storage.delete(default_storage.save('employees/benchmark.jpg', image))
+    image.close()
+
+def _streaming_upload(body_path, meta):
+    """Потоковая загрузка на диск и проверка по заголовку"""
+    with open(body_path, 'rb') as stream:
+        _, files = MultiPartParser(meta, stream, [ChunkedImageUploadHandler(None)]).parse()
+    inspect_image(files['image'])
+    default_storage.delete(default_storage.save('employees/benchmark.jpg', files['image']))
+    files['image'].close()
+
+def _peak_rss_growth(target, *args):
+    """Прирост пикового RSS (КБ) при выполнении target в отдельном процессе"""
+    context = multiprocessing.get_context('fork')
+    receiver, sender = context.Pipe(duplex=False)
+
+    def run():
+        try:
+            before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            target(*args)
+            sender.send(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before)
+        except Exception as error:
+            sender.send(error)
+
+    process = context.Process(target=run)
+    process.start()
+    growth = receiver.recv()
+    process.join()
+    if isinstance(growth, Exception):
+        raise CommandError(f'{target.__name__}: {growth}')
+    return growth
+
+class Command(BaseCommand):
+    help = 'Замер пикового RSS на одну загрузку фото: стандартный путь Django и потоковый'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', nargs='+', type=float, default=[1, 4, 16, 32],
+            help='Размеры тестовых JPEG в МБ',
+        )
+
+    def build_request(self, directory, size_mb):
+        """Шумовой JPEG нужного размера, упакованный в multipart-тело на диске"""
+        # Шум в JPEG с quality=95 занимает около 2.2 байта на пиксель
+        side = int(math.sqrt(size_mb * 2 ** 20 / 2.2))
+        image = Image.frombytes('RGB', (side, side), os.urandom(side * side * 3))
+        image_path = os.path.join(directory, 'source.jpg')
+        image.save(image_path, 'JPEG', quality=95)
+        del image
+
+        with open(image_path, 'rb') as source:
+            body = encode_multipart(BOUNDARY, {'image': source})
+        body_path = os.path.join(directory, 'body.bin')
+        with open(body_path, 'wb') as target:
+            target.write(body)
+        meta = {'CONTENT_TYPE': MULTIPART_CONTENT, 'CONTENT_LENGTH': str(len(body))}
+        return body_path, meta, os.path.getsize(image_path), side
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"Файл":>10} {"Пиксели":>12} {"Django, МБ":>12} {"Потоковый, МБ":>15}')
+        # Ограничения на размер загрузки не мешают замерять большие файлы
+        limits = override_settings(IMAGE_UPLOAD_MAX_SIZE=2 ** 40, IMAGE_UPLOAD_MAX_PIXELS=2 ** 40)
+        with tempfile.TemporaryDirectory() as directory, override_settings(MEDIA_ROOT=directory), limits:
+            for size_mb in options['sizes']:
+                body_path, meta, file_size, side = self.build_request(directory, size_mb)
+                default = _peak_rss_growth(_default_upload, body_path, meta)
+                streaming = _peak_rss_growth(_streaming_upload, body_path, meta)
+                self.stdout.write(
+                    f'{file_size / 2 ** 20:>8.1f}МБ {f"{side}x{side}":>12} '
+                    f'{default / 1024:>12.1f} {streaming / 1024:>15.1f}'
+                )
@@ -0,0 +1,42 @@
+import posixpath
+from django.core.management.base import BaseCommand
+from employee.models import EmployeeImage
+from employee.storage import CONTENT_ADDRESSED_NAME
+from employee.summary import refresh_employee_summaries
+from employee.thumbnails import generate_thumbnails, delete_thumbnails
+
+class Command(BaseCommand):
+    help = 'Перенос фото, загруженных до content-addressed хранилища, под имена из хэша (с дедупликацией)'
+
+    def handle(self, *args, **options):
+        moved, removed, employees = 0, 0, set()
+        for image in EmployeeImage.objects.order_by('id').only('id', 'employee_id', 'image'):
+            name = image.image.name
+            storage = image.image.storage
+            if not name or CONTENT_ADDRESSED_NAME.search(name):
+                continue
+            if not storage.exists(name):
+                self.stdout.write(self.style.WARNING(f'{name}: файл не найден'))
+                continue
+
+            with storage.open(name) as source:
+                target = image.image.field.generate_filename(image, posixpath.basename(name))
+                new_name = storage.save(target, source)
+            try:
+                generate_thumbnails(new_name)
+                ready = True
+            except (OSError, ValueError):
+                ready = False
+            if not EmployeeImage.objects.filter(pk=image.pk, image=name).update(image=new_name, has_thumbnails=ready):
+                continue
+            moved += 1
+            employees.add(image.employee_id)
+
+            # Старый файл удаляется, когда на него больше не ссылается ни одна запись
+            storage.delete(name)
+            if not storage.exists(name):
+                delete_thumbnails(name)
+                removed += 1
+        refresh_employee_summaries(employees)
+
+        self.stdout.write(self.style.SUCCESS(f'Перенесено фото: {moved}, удалено старых файлов: {removed}'))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+from employee.exports import export_stream, ExportError, EXPORTS, FORMATS, CHUNK_SIZE
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка сотрудников, навыков или бронирований в NDJSON, CSV или XLSX'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(EXPORTS))
+        parser.add_argument('--format', dest='fmt', choices=list(FORMATS), default='ndjson')
+        parser.add_argument('--output', '-o', help='Файл для записи (по умолчанию - stdout, кроме XLSX)')
+        parser.add_argument(
+            '--filter', action='append', default=[], metavar='ПАРАМЕТР=ЗНАЧЕНИЕ',
+            help='Фильтр сотрудников как в /api/employees/, например --filter position=tester',
+        )
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        params = QueryDict(mutable=True)
+        for item in options['filter']:
+            key, separator, value = item.partition('=')
+            if not separator:
+                raise CommandError(f'Фильтр "{item}" должен иметь вид ПАРАМЕТР=ЗНАЧЕНИЕ')
+            params.appendlist(key, value)
+        if options['fmt'] == 'xlsx' and not options['output']:
+            raise CommandError('Для XLSX укажите файл в --output')
+
+        try:
+            stream, _ = export_stream(options['dataset'], options['fmt'], params, chunk_size=options['chunk_size'])
+        except ExportError as e:
+            raise CommandError(e.args[0])
+
+        if options['output']:
+            written = 0
+            with open(options['output'], 'wb') as target:
+                for chunk in stream:
+                    target.write(chunk)
+                    written += len(chunk)
+            self.stderr.write(self.style.SUCCESS(f'{options["output"]}: {written} байт'))
+        else:
+            for chunk in stream:
+                self.stdout.write(chunk.decode(), ending='')
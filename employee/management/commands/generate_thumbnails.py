@@ -0,0 +1,48 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from employee.models import EmployeeImage
+from employee.summary import refresh_employee_summaries
+from employee.thumbnails import generate_thumbnails
+
+class Command(BaseCommand):
+    help = 'Построение миниатюр для уже загруженных фото сотрудников'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Число параллельных потоков (по умолчанию - число CPU)',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Перестроить миниатюры даже для фото, где они уже есть',
+        )
+
+    def handle(self, *args, **options):
+        force = options['force']
+        queryset = EmployeeImage.objects.order_by('id')
+        if not force:
+            queryset = queryset.filter(has_thumbnails=False)
+        images = list(queryset.exclude(image='').values_list('id', 'employee_id', 'image'))
+
+        def build(image):
+            pk, employee_id, name = image
+            try:
+                generate_thumbnails(name, force=force)
+            except (OSError, ValueError) as error:
+                return image, error
+            return image, None
+
+        # Потоки только декодируют и кодируют файлы; БД обновляется из основного потока
+        done, employees = 0, set()
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+            for (pk, employee_id, name), error in executor.map(build, images):
+                if error is not None:
+                    self.stdout.write(self.style.WARNING(f'{name}: {error}'))
+                    continue
+                if EmployeeImage.objects.filter(pk=pk, image=name).update(has_thumbnails=True):
+                    done += 1
+                    employees.add(employee_id)
+        refresh_employee_summaries(employees)
+
+        self.stdout.write(self.style.SUCCESS(f'Миниатюры построены: {done} из {len(images)}'))
@@ -0,0 +1,35 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from employee.imports import load_dataset, import_employees, EmployeeImportError, CHUNK_SIZE
+
+class Command(BaseCommand):
+    help = 'Массовый импорт сотрудников с навыками из CSV или XLSX'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл .csv или .xlsx')
+        parser.add_argument('--atomic', action='store_true', help='При любой ошибке не импортировать ничего')
+        parser.add_argument('--create-skills', action='store_true', help='Создавать навыки, которых нет в справочнике')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as source:
+                dataset = load_dataset(source, options['path'])
+            result = import_employees(
+                dataset,
+                atomic=options['atomic'],
+                create_skills=options['create_skills'],
+                chunk_size=options['chunk_size'],
+            )
+        except (OSError, EmployeeImportError) as e:
+            raise CommandError(e)
+
+        for error in result.errors:
+            for field, messages in error['errors'].items():
+                for message in messages:
+                    self.stderr.write(f'Строка {error["row"]}, {field}: {message}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано сотрудников: {result.created}, навыков: {result.skills_created}, '
+            f'строк с ошибками: {len(result.errors)} ({time.perf_counter() - started:.1f} с)'
+        ))
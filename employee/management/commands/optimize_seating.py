@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from employee.seating import optimize_seating, apply_seating_solution, SeatingConflictError
+
+class Command(BaseCommand):
+    help = 'Автоматическая рассадка сотрудников с учётом правила тестировщик/разработчик'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--employees', nargs='*', type=int, default=[],
+            help='ID сотрудников, которых нужно пересадить',
+        )
+        parser.add_argument(
+            '--time-budget', type=float, default=10.0,
+            help='Ограничение времени работы оптимизатора в секундах',
+        )
+        parser.add_argument(
+            '--apply', action='store_true',
+            help='Применить пересадки (по умолчанию только показать изменения)',
+        )
+        parser.add_argument(
+            '--allow-unplaced', action='store_true',
+            help='Применить пересадки, даже если часть сотрудников не удалось рассадить',
+        )
+
+    def handle(self, *args, **options):
+        solution = optimize_seating(options['employees'], time_budget=options['time_budget'])
+        
+        for move in solution.moves:
+            self.stdout.write(f'Сотрудник {move.employee}: стол {move.from_desk} → {move.to_desk}')
+        if solution.unplaced:
+            self.stdout.write(
+                self.style.WARNING(f'Не удалось рассадить: {", ".join(map(str, solution.unplaced))}')
+            )
+        if solution.timed_out:
+            self.stdout.write(self.style.WARNING('Исчерпан бюджет времени'))
+        
+        if options['apply']:
+            unplaced = ', '.join(map(str, solution.unplaced))
+            if solution.unplaced and not options['allow_unplaced']:
+                # Нерассаженные остаются за прежними столами, которые могли отдать другим
+                raise CommandError(
+                    f'Не удалось рассадить: {unplaced}. Пересадки не применены; '
+                    f'чтобы применить остальные, укажите --allow-unplaced'
+                )
+            try:
+                apply_seating_solution(solution)
+            except SeatingConflictError as e:
+                lines = [conflict.message for conflict in e.conflicts]
+                if unplaced:
+                    lines.append(f'Не удалось рассадить: {unplaced}')
+                raise CommandError('Пересадки не применены:\n' + '\n'.join(lines))
+            self.stdout.write(self.style.SUCCESS(f'Пересажено сотрудников: {len(solution.moves)}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Предлагаемых пересадок: {len(solution.moves)} (без изменений в БД)'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from employee.search import rebuild_search_index, fts5_available
+
+class Command(BaseCommand):
+    help = 'Полная переиндексация поиска сотрудников'
+
+    def handle(self, *args, **options):
+        rebuild_search_index()
+        backend = 'FTS5' if fts5_available() else 'индекс в памяти (сброшен)'
+        self.stdout.write(self.style.SUCCESS(f'Поисковый индекс перестроен: {backend}'))
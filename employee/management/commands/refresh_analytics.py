@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from employee.analytics import rebuild_analytics
+from employee.models import HeadcountStat, SkillLevelStat
+
+class Command(BaseCommand):
+    help = 'Полный пересчёт счётчиков аналитики (после загрузки данных в обход сигналов)'
+
+    def handle(self, *args, **options):
+        rebuild_analytics()
+        self.stdout.write(self.style.SUCCESS(
+            f'Счётчики пересчитаны: численность - {HeadcountStat.objects.count()} строк, '
+            f'навыки - {SkillLevelStat.objects.count()} строк'
+        ))
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:31
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def fill_summaries(apps, schema_editor):
+    Employee = apps.get_model('employee', 'Employee')
+    EmployeeSkill = apps.get_model('employee', 'EmployeeSkill')
+    EmployeeImage = apps.get_model('employee', 'EmployeeImage')
+
+    skills = defaultdict(list)
+    for employee_id, name in EmployeeSkill.objects.order_by('id').values_list('employee_id', 'skill__name'):
+        skills[employee_id].append(name)
+    images = defaultdict(list)
+    for employee_id, image in EmployeeImage.objects.order_by('uploaded_at', 'id').values_list('employee_id', 'image'):
+        images[employee_id].append(image)
+
+    employees = list(Employee.objects.only('id'))
+    for employee in employees:
+        employee.skill_names = skills[employee.pk]
+        employee.main_photo = images[employee.pk][0] if images[employee.pk] else ''
+        employee.image_count = len(images[employee.pk])
+    Employee.objects.bulk_update(employees, ['skill_names', 'main_photo', 'image_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0006_reservation_date_desk_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='image_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество фото'),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='main_photo',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Основное фото'),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='skill_names',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Названия навыков'),
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0007_employee_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='main_photo_thumbnails',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Миниатюры основного фото готовы'),
+        ),
+        migrations.AddField(
+            model_name='employeeimage',
+            name='has_thumbnails',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Миниатюры готовы'),
+        ),
+    ]
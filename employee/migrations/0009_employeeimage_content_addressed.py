@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:41
+
+import employee.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0008_employeeimage_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='employeeimage',
+            name='image',
+            field=models.ImageField(db_index=True, storage=employee.storage.employee_image_storage, upload_to='employees/', verbose_name='Изображение'),
+        ),
+    ]
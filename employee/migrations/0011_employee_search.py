@@ -0,0 +1,85 @@
+import re
+from django.db import migrations
+
+# Схема и документ индекса на момент миграции (не импортируются из employee.search,
+# чтобы их последующие изменения не меняли эту миграцию)
+COLUMNS = ('name', 'position', 'skills')
+SEARCH_TABLE = 'employee_search'
+VOCAB_TABLE = 'employee_search_vocab'
+CREATE_SEARCH_SQL = (
+    f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+    f"{', '.join(COLUMNS)}, tokenize='unicode61 remove_diacritics 0', prefix='2 3')",
+    f"CREATE VIRTUAL TABLE {VOCAB_TABLE} USING fts5vocab({SEARCH_TABLE}, 'col')",
+)
+DROP_SEARCH_SQL = (
+    f'DROP TABLE IF EXISTS {VOCAB_TABLE}',
+    f'DROP TABLE IF EXISTS {SEARCH_TABLE}',
+)
+WORD_RE = re.compile(r'\w+')
+POSITION_LABELS = {
+    'backend': 'Бекенд-разработчик',
+    'frontend': 'Фронтенд-разработчик',
+    'tester': 'Тестировщик',
+    'manager': 'Менеджер',
+    'designer': 'Дизайнер',
+}
+
+
+def tokenize(text):
+    return WORD_RE.findall(text.casefold().replace('ё', 'е'))
+
+
+def document(first_name, last_name, position, skill_names):
+    label = POSITION_LABELS.get(position, position)
+    return (
+        ' '.join(tokenize(f'{first_name} {last_name}')),
+        ' '.join(tokenize(f'{label} {position}')),
+        ' '.join(tokenize(' '.join(skill_names))),
+    )
+
+
+def fts5_supported(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any(option == 'ENABLE_FTS5' for option, in cursor.fetchall())
+
+
+def create_search_index(apps, schema_editor):
+    # Без FTS5 (другая СУБД или сборка SQLite) поиск работает по индексу в памяти
+    connection = schema_editor.connection
+    if not fts5_supported(connection):
+        return
+    Employee = apps.get_model('employee', 'Employee')
+    with connection.cursor() as cursor:
+        for sql in CREATE_SEARCH_SQL:
+            cursor.execute(sql)
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, {", ".join(COLUMNS)}) VALUES (%s, %s, %s, %s)',
+            [
+                (pk, *document(first_name, last_name, position, skill_names))
+                for pk, first_name, last_name, position, skill_names in Employee.objects.values_list(
+                    'pk', 'first_name', 'last_name', 'position', 'skill_names',
+                ).iterator()
+            ],
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for sql in DROP_SEARCH_SQL:
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0010_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
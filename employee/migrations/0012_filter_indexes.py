@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0011_employee_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['position', 'hire_date', 'id'], name='employee_position_hire_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['gender', 'hire_date', 'id'], name='employee_gender_hire_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['desk_number', 'position'], name='employee_desk_position_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeeskill',
+            index=models.Index(fields=['employee', 'skill', 'level'], name='employeeskill_emp_skill_idx'),
+        ),
+    ]
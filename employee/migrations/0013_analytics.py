@@ -0,0 +1,59 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F
+from django.db.models.functions import TruncMonth
+
+
+def build_analytics(apps, schema_editor):
+    # Счётчики для уже существующих сотрудников; дальше их ведут сигналы
+    Employee = apps.get_model('employee', 'Employee')
+    EmployeeSkill = apps.get_model('employee', 'EmployeeSkill')
+    HeadcountStat = apps.get_model('employee', 'HeadcountStat')
+    SkillLevelStat = apps.get_model('employee', 'SkillLevelStat')
+    HeadcountStat.objects.bulk_create([
+        HeadcountStat(**row) for row in Employee.objects.annotate(cohort=TruncMonth('hire_date'))
+        .values('position', 'gender', 'cohort').annotate(count=Count('id')).order_by()
+    ])
+    SkillLevelStat.objects.bulk_create([
+        SkillLevelStat(**row) for row in EmployeeSkill.objects.annotate(position=F('employee__position'))
+        .values('skill_id', 'level', 'position').annotate(count=Count('id')).order_by()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0012_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HeadcountStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.CharField(choices=[('backend', 'Бекенд-разработчик'), ('frontend', 'Фронтенд-разработчик'), ('tester', 'Тестировщик'), ('manager', 'Менеджер'), ('designer', 'Дизайнер')], max_length=20, verbose_name='Должность')),
+                ('gender', models.CharField(choices=[('male', 'Мужской'), ('female', 'Женский')], max_length=10, verbose_name='Пол')),
+                ('cohort', models.DateField(verbose_name='Месяц приёма')),
+                ('count', models.IntegerField(default=0, verbose_name='Сотрудников')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('position', 'gender', 'cohort'), name='headcountstat_key')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SkillLevelStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.IntegerField(choices=[(1, 'Начальный'), (2, 'Средний'), (3, 'Продвинутый'), (4, 'Эксперт')], verbose_name='Уровень освоения')),
+                ('position', models.CharField(choices=[('backend', 'Бекенд-разработчик'), ('frontend', 'Фронтенд-разработчик'), ('tester', 'Тестировщик'), ('manager', 'Менеджер'), ('designer', 'Дизайнер')], max_length=20, verbose_name='Должность')),
+                ('count', models.IntegerField(default=0, verbose_name='Сотрудников')),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='employee.skill')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('skill', 'level', 'position'), name='skilllevelstat_key')],
+            },
+        ),
+        migrations.RunPython(build_analytics, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,10 @@
 from django.db import models
 from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
 from django.utils import timezone
 from django.contrib.auth import get_user_model
+from .storage import employee_image_storage
+from .thumbnails import thumbnail_url
 
 User = get_user_model()
 
@@ -11,6 +14,8 @@ class Desk(models.Model):
     coordinates_x = models.IntegerField(default=0)
     coordinates_y = models.IntegerField(default=0)
     is_available = models.BooleanField(default=True)
+    # Маркер версии для условного GET в API (см. conditional.py)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     def __str__(self):
         return f"Desk {self.number}"
@@ -42,6 +47,27 @@ class Employee(models.Model):
     hire_date = models.DateField(default=timezone.now, verbose_name='Дата приёма на работу')
     gender = models.CharField(max_length=10, choices=GENDER_CHOICES, verbose_name='Пол', default='male')
     skills = models.ManyToManyField('Skill', through='EmployeeSkill', verbose_name='Навыки')
+    # Маркер версии для условного GET; пакетные записи (сводка, рассадка) обновляют его явно
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name='Изменён')
+    
+    # Сводка для списков, ведётся сигналами EmployeeSkill/EmployeeImage (см. summary.py)
+    skill_names = models.JSONField(default=list, blank=True, editable=False, verbose_name='Названия навыков')
+    main_photo = models.CharField(max_length=255, blank=True, editable=False, verbose_name='Основное фото')
+    image_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество фото')
+    main_photo_thumbnails = models.BooleanField(default=False, editable=False, verbose_name='Миниатюры основного фото готовы')
+    
+    SUMMARY_FIELDS = ('skill_names', 'main_photo', 'image_count', 'main_photo_thumbnails')
+    
+    class Meta:
+        indexes = [
+            # Ключ keyset-пагинации списка сотрудников
+            models.Index(fields=['hire_date', 'id'], name='employee_hire_date_id_idx'),
+            # Фильтры EmployeeFilter: равенство по полю и тот же порядок, что у списка - без сортировки
+            models.Index(fields=['position', 'hire_date', 'id'], name='employee_position_hire_idx'),
+            models.Index(fields=['gender', 'hire_date', 'id'], name='employee_gender_hire_idx'),
+            # Фильтр по столу и поиск соседей при рассадке (desk_number IN/BETWEEN + position)
+            models.Index(fields=['desk_number', 'position'], name='employee_desk_position_idx'),
+        ]
     
     def clean(self):
         super().clean()
@@ -50,26 +76,21 @@ class Employee(models.Model):
     def validate_developer_tester_separation(self):
         """Валидатор, который не допускает нахождение тестировщиков и разработчиков за соседними столами"""
         if self.position in ['backend', 'frontend', 'tester']:
-            # Проверяем соседние столы
-            adjacent_desks = [self.desk_number - 1, self.desk_number + 1]
-            
-            # Получаем сотрудников на соседних столах
-            adjacent_employees = Employee.objects.filter(
-                desk_number__in=adjacent_desks
-            ).exclude(pk=self.pk if self.pk else None)
+            from .seating import find_seating_conflicts
             
-            for employee in adjacent_employees:
-                if (self.position == 'tester' and employee.position in ['backend', 'frontend']) or \
-                   (self.position in ['backend', 'frontend'] and employee.position == 'tester'):
-                    raise ValidationError(
-                        f'Тестировщики и разработчики не могут работать за соседними столами. '
-                        f'Стол {self.desk_number} соседствует со столом {employee.desk_number}, '
-                        f'где работает {employee.get_position_display()} {employee.first_name} {employee.last_name}'
-                    )
+            conflicts = find_seating_conflicts([(self, self.desk_number)])
+            if conflicts:
+                raise ValidationError([conflict.message for conflict in conflicts])
     
     def save(self, *args, **kwargs):
         # Выполняем полную валидацию при сохранении
         self.full_clean()
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # Сводку пишут только сигналы - не затираем её устаревшими значениями экземпляра
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.SUMMARY_FIELDS
+            ]
         super().save(*args, **kwargs)
     
     def get_work_experience_days(self):
@@ -80,6 +101,15 @@ class Employee(models.Model):
         """Возвращает первое изображение из галереи"""
         return self.images.first()
     
+    @property
+    def main_photo_url(self):
+        """URL первого изображения из сводки, без запроса к галерее"""
+        return default_storage.url(self.main_photo) if self.main_photo else ''
+    
+    def thumbnail_url(self, size, fmt='jpeg'):
+        """URL миниатюры основного фото (исходник, пока миниатюры не построены)"""
+        return thumbnail_url(self.main_photo, size, fmt, ready=self.main_photo_thumbnails)
+    
     def get_gallery_photos(self):
         """Возвращает все изображения кроме первого"""
         return self.images.all()[1:]
@@ -99,17 +129,35 @@ class EmployeeSkill(models.Model):
     skill = models.ForeignKey(Skill, on_delete=models.CASCADE)
     level = models.IntegerField(choices=LEVEL_CHOICES, verbose_name='Уровень освоения')
     
+    class Meta:
+        indexes = [
+            # EXISTS-подзапросы фильтра навыков (filters.py) целиком читаются из индекса
+            models.Index(fields=['employee', 'skill', 'level'], name='employeeskill_emp_skill_idx'),
+        ]
+    
     def __str__(self):
         return f'{self.employee} - {self.skill} ({self.get_level_display()})'
 
 class EmployeeImage(models.Model):
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='images')
-    image = models.ImageField(upload_to='employees/', verbose_name='Изображение')
+    # Одинаковые фото хранятся один раз под именем из хэша содержимого (см. storage.py)
+    image = models.ImageField(upload_to='employees/', storage=employee_image_storage, db_index=True, verbose_name='Изображение')
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Миниатюры строит пул воркеров после загрузки (см. thumbnails.py)
+    has_thumbnails = models.BooleanField(default=False, editable=False, verbose_name='Миниатюры готовы')
     
     class Meta:
         ordering = ['uploaded_at']
     
+    def save(self, *args, **kwargs):
+        if self.image and not self.image._committed:
+            # Загружен новый файл - прежние миниатюры к нему не относятся
+            self.has_thumbnails = False
+        super().save(*args, **kwargs)
+    
+    def thumbnail_url(self, size, fmt='jpeg'):
+        return thumbnail_url(self.image.name, size, fmt, ready=self.has_thumbnails)
+    
     def __str__(self):
         return f'Изображение {self.employee}'
 
@@ -118,9 +166,45 @@ class Reservation(models.Model):
     desk = models.ForeignKey(Desk, on_delete=models.CASCADE)
     date = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     class Meta:
         unique_together = ['desk', 'date']
+        indexes = [
+            # Проверка соседних бронирований: все брони на дату по набору столов
+            models.Index(fields=['date', 'desk'], name='reservation_date_desk_idx'),
+        ]
         
     def __str__(self):
-        return f"{self.user.username} - {self.desk.number} - {self.date}"
\ No newline at end of file
+        return f"{self.user.username} - {self.desk.number} - {self.date}"
+
+# Материализованная аналитика (см. analytics.py): счётчики ведутся сигналами,
+# поэтому ответ /api/analytics/ не зависит от числа сотрудников
+
+class HeadcountStat(models.Model):
+    """Число сотрудников по должности, полу и месяцу приёма (cohort - первое число месяца)"""
+    position = models.CharField(max_length=20, choices=Employee.POSITION_CHOICES, verbose_name='Должность')
+    gender = models.CharField(max_length=10, choices=Employee.GENDER_CHOICES, verbose_name='Пол')
+    cohort = models.DateField(verbose_name='Месяц приёма')
+    count = models.IntegerField(default=0, verbose_name='Сотрудников')
+    
+    KEY_FIELDS = ('position', 'gender', 'cohort')
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['position', 'gender', 'cohort'], name='headcountstat_key'),
+        ]
+
+class SkillLevelStat(models.Model):
+    """Число навыков skill уровня level у сотрудников должности position"""
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='+')
+    level = models.IntegerField(choices=EmployeeSkill.LEVEL_CHOICES, verbose_name='Уровень освоения')
+    position = models.CharField(max_length=20, choices=Employee.POSITION_CHOICES, verbose_name='Должность')
+    count = models.IntegerField(default=0, verbose_name='Сотрудников')
+    
+    KEY_FIELDS = ('skill_id', 'level', 'position')
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['skill', 'level', 'position'], name='skilllevelstat_key'),
+        ]
@@ -0,0 +1,175 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+class EmployeePagination(PageNumberPagination):
+    """Постраничная выдача с настраиваемым размером страницы (?page_size=)"""
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+class InvalidCursor(Exception):
+    pass
+
+def encode_cursor(values, reverse=False):
+    """Упаковывает значения ключа последней строки в непрозрачный токен"""
+    payload = json.dumps({'v': values, 'r': reverse}, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        return list(payload['v']), bool(payload['r'])
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor(token)
+
+class KeysetPage:
+    """Страница keyset-пагинации: без COUNT(*), только ссылки вперёд/назад"""
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+class KeysetPaginator:
+    """
+    Keyset (seek) пагинация по упорядоченному набору полей, например ('-hire_date', '-id').
+    Вместо OFFSET страница начинается с условия "строго после ключа последней строки",
+    поэтому любая страница стоит столько же, сколько первая, при наличии индекса по этим полям.
+    Последнее поле должно быть уникальным (обычно id).
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-hire_date', '-id')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = list(ordering)
+
+    def _fields(self, reverse):
+        fields = []
+        for item in self.ordering:
+            name = item.lstrip('-')
+            descending = item.startswith('-') != reverse
+            fields.append((name, descending))
+        return fields
+
+    def _after(self, fields, values):
+        """Условие "строго после ключа values" в порядке fields"""
+        (name, descending), value = fields[0], values[0]
+        lookup = 'lt' if descending else 'gt'
+        condition = Q(**{f'{name}__{lookup}': value})
+        if len(fields) > 1:
+            condition |= Q(**{name: value}) & self._after(fields[1:], values[1:])
+        return condition
+
+    def _filter_after(self, queryset, fields, values):
+        name, descending = fields[0]
+        # Отдельное ограничение по ведущему полю позволяет БД начать с поиска по индексу
+        bound = Q(**{f"{name}__{'lte' if descending else 'gte'}": values[0]})
+        return queryset.filter(bound & self._after(fields, values))
+
+    def _key(self, obj):
+        # Строки бывают и словарями из .values()
+        if isinstance(obj, dict):
+            return [obj[name] for name, _ in self._fields(False)]
+        return [getattr(obj, name) for name, _ in self._fields(False)]
+
+    def get_page(self, cursor=None):
+        """Возвращает KeysetPage; cursor - токен из next_cursor/previous_cursor"""
+        values, reverse = decode_cursor(cursor) if cursor else (None, False)
+        if values is not None and len(values) != len(self.ordering):
+            raise InvalidCursor(cursor)
+        fields = self._fields(reverse)
+        queryset = self.queryset.order_by(*[('-' if desc else '') + name for name, desc in fields])
+        try:
+            if values is not None:
+                queryset = self._filter_after(queryset, fields, values)
+            rows = list(queryset[:self.per_page + 1])
+        except (ValidationError, ValueError, TypeError):
+            # Значения в токене не приводятся к типам полей
+            raise InvalidCursor(cursor)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            has_next, has_previous = values is not None, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+        next_cursor = encode_cursor(self._key(rows[-1])) if rows and has_next else None
+        previous_cursor = encode_cursor(self._key(rows[0]), reverse=True) if rows and has_previous else None
+        return KeysetPage(rows, next_cursor, previous_cursor)
+
+class KeysetPagination(BasePagination):
+    """
+    DRF-пагинация на основе KeysetPaginator.
+    Порядок берётся из атрибута view.keyset_ordering (по умолчанию по id).
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = getattr(view, 'keyset_ordering', ('id',))
+        paginator = KeysetPaginator(queryset, self.get_page_size(request), ordering)
+        try:
+            self.page = paginator.get_page(request.query_params.get(self.cursor_query_param))
+        except InvalidCursor:
+            raise NotFound('Неверный курсор')
+        return list(self.page)
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_link(self.page.next_cursor),
+            'previous': self.get_link(self.page.previous_cursor),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -1,19 +1,72 @@
+from django.conf import settings
+from django.core.cache import cache
 from rest_framework import permissions
+from .caching import ROLE_KEY, permissions_version, shared_cache
+
+VIEWER = 'viewer'
+KEEPER = 'keeper'
+ADMIN = 'admin'
+
+KEEPER_GROUP = 'Смотритель'
+MOVE_PERMISSION = 'employee.can_move_employees'
+
+def resolve_roles(user):
+    """Роли пользователя по БД: смотритель - право на перемещение или группа KEEPER_GROUP"""
+    if not user or not user.is_authenticated:
+        return frozenset()
+    if user.is_staff:
+        return frozenset({VIEWER, KEEPER, ADMIN})
+    if user.has_perm(MOVE_PERMISSION) or user.groups.filter(name=KEEPER_GROUP).exists():
+        return frozenset({VIEWER, KEEPER})
+    return frozenset({VIEWER})
+
+def user_roles(request):
+    """
+    Роли пользователя запроса: сначала из самого запроса (повторные проверки),
+    затем из кэша по id пользователя и версии прав (bump_permissions), и только
+    при промахе - из БД. Анонимам и персоналу хватает полей пользователя.
+
+    Между запросами роли кэшируются, только если кэш общий для всех процессов:
+    с кэшем в памяти процесса отзыв прав в одном воркере не дошёл бы до остальных
+    до истечения ROLE_CACHE_TIMEOUT, поэтому тогда роли читаются из БД в каждом запросе.
+    """
+    roles = getattr(request, '_roles', None)
+    if roles is not None:
+        return roles
+    user = request.user
+    if not user or not user.is_authenticated or user.is_staff or not shared_cache():
+        roles = resolve_roles(user)
+    else:
+        # is_active и is_superuser меняют результат has_perm - они часть ключа
+        key = ROLE_KEY.format(
+            pk=user.pk, flags=f'{user.is_active:d}{user.is_superuser:d}', version=permissions_version(),
+        )
+        roles = cache.get(key)
+        if roles is None:
+            roles = resolve_roles(user)
+            cache.set(key, roles, settings.ROLE_CACHE_TIMEOUT)
+    request._roles = roles
+    return roles
+
+def has_role(request, role):
+    """Зритель и администратор определяются полями пользователя без запросов, смотритель - через user_roles"""
+    user = request.user
+    if not user or not user.is_authenticated:
+        return False
+    if role == VIEWER or user.is_staff:
+        return True
+    return role == KEEPER and KEEPER in user_roles(request)
 
 class IsViewer(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated
+        return has_role(request, VIEWER)
     
     def has_object_permission(self, request, view, obj):
         return request.method in permissions.SAFE_METHODS
 
 class IsKeeper(permissions.BasePermission):
     def has_permission(self, request, view):
-        if not request.user or not request.user.is_authenticated:
-            return False
-        return (request.user.is_staff or 
-                request.user.has_perm('employees.can_move_employees') or
-                request.user.groups.filter(name='Смотритель').exists())
+        return has_role(request, KEEPER)
     
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
@@ -22,7 +75,7 @@ class IsKeeper(permissions.BasePermission):
 
 class IsAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and request.user.is_staff
+        return has_role(request, ADMIN)
     
     def has_object_permission(self, request, view, obj):
-        return True
\ No newline at end of file
+        return True
@@ -0,0 +1,293 @@
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from .caching import search_index_version, bump_search_index
+
+# Колонки поискового документа сотрудника
+COLUMNS = ('name', 'position', 'skills')
+
+SEARCH_TABLE = 'employee_search'
+VOCAB_TABLE = 'employee_search_vocab'
+# rowid - id сотрудника; текст уже нормализован (normalize), токенайзер только делит на слова.
+# prefix - индексы префиксов из 2 и 3 букв для запросов "на лету"
+CREATE_SEARCH_SQL = (
+    f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+    f"{', '.join(COLUMNS)}, tokenize='unicode61 remove_diacritics 0', prefix='2 3')",
+    f"CREATE VIRTUAL TABLE {VOCAB_TABLE} USING fts5vocab({SEARCH_TABLE}, 'col')",
+)
+DROP_SEARCH_SQL = (
+    f'DROP TABLE IF EXISTS {VOCAB_TABLE}',
+    f'DROP TABLE IF EXISTS {SEARCH_TABLE}',
+)
+
+WORD_RE = re.compile(r'\w+')
+
+# Запрос, набранный в английской раскладке: ghtkjd -> Петров
+LAYOUT = str.maketrans('qwertyuiop[]asdfghjkl;\'zxcvbnm,.', 'йцукенгшщзхъфывапролджэячсмитьбю')
+LATIN_RE = re.compile(r'[a-z]+')
+
+def normalize(text):
+    """Регистр и ё/е не различаются"""
+    return text.casefold().replace('ё', 'е')
+
+def tokenize(text):
+    return WORD_RE.findall(normalize(text))
+
+def document(first_name, last_name, position, skill_names):
+    """Текст колонок COLUMNS для сотрудника: имя, должность (значение и подпись), навыки"""
+    from .models import Employee
+    label = dict(Employee.POSITION_CHOICES).get(position, position)
+    return (
+        ' '.join(tokenize(f'{first_name} {last_name}')),
+        ' '.join(tokenize(f'{label} {position}')),
+        ' '.join(tokenize(' '.join(skill_names))),
+    )
+
+def max_typos(term):
+    """Допустимое число опечаток по длине слова"""
+    if len(term) < 4:
+        return 0
+    return 1 if len(term) < 8 else 2
+
+def edit_distance(a, b, limit):
+    """
+    Расстояние Дамерау-Левенштейна (вставка, удаление, замена, перестановка
+    соседних букв); как только оно заведомо больше limit, возвращается limit + 1.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i, left in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, right in enumerate(b, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (left != right),
+            )
+            if i > 1 and j > 1 and left == b[j - 2] and a[i - 2] == right:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+def fuzzy_match(token, term, limit):
+    """Слово term подходит к token с опечатками: целиком или как продолжение (префикс)"""
+    return edit_distance(token, term, limit) <= limit or (
+        len(term) > len(token) and edit_distance(token, term[:len(token)], limit) <= limit
+    )
+
+class Fts5SearchIndex:
+    """Индекс в виртуальной таблице SQLite FTS5; словарь для опечаток - fts5vocab"""
+
+    def replace(self, documents):
+        """documents - {id сотрудника: (name, position, skills)}"""
+        with connection.cursor() as cursor:
+            self._delete(cursor, list(documents))
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, {", ".join(COLUMNS)}) VALUES (%s, %s, %s, %s)',
+                [(pk, *columns) for pk, columns in documents.items()],
+            )
+
+    def delete(self, pks):
+        with connection.cursor() as cursor:
+            self._delete(cursor, pks)
+
+    def _delete(self, cursor, pks):
+        cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(pk,) for pk in pks])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+    def _columns_sql(self, columns):
+        return ', '.join(['%s'] * len(columns))
+
+    def has_prefix(self, prefix, columns):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT 1 FROM {VOCAB_TABLE} WHERE term >= %s AND term < %s '
+                f'AND col IN ({self._columns_sql(columns)}) LIMIT 1',
+                [prefix, prefix + '\uffff', *columns],
+            )
+            return cursor.fetchone() is not None
+
+    def terms(self, min_length, columns):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT DISTINCT term FROM {VOCAB_TABLE} '
+                f'WHERE length(term) >= %s AND col IN ({self._columns_sql(columns)})',
+                [min_length, *columns],
+            )
+            return [term for term, in cursor.fetchall()]
+
+    def filter(self, queryset, groups, columns):
+        """groups - [[(слово, префикс?), ...], ...]: И между группами, ИЛИ внутри группы"""
+        expression = ' AND '.join(
+            '(' + ' OR '.join(f'"{term}"' + ('*' if prefix else '') for term, prefix in group) + ')'
+            for group in groups
+        )
+        match = '{%s} : (%s)' % (' '.join(columns), expression)
+        return queryset.filter(pk__in=RawSQL(f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [match]))
+
+class LocalSearchIndex:
+    """
+    Запасной индекс в памяти процесса (БД без FTS5): словарь (колонка, слово) -> id
+    и отсортированный список слов для префиксов. Строится одним запросом при первом
+    обращении и сбрасывается при изменении сотрудников, как индекс столов в spatial.py.
+    """
+
+    def __init__(self, documents):
+        self.postings = defaultdict(set)
+        for pk, columns in documents.items():
+            for column, text in zip(COLUMNS, columns):
+                for term in text.split():
+                    self.postings[column, term].add(pk)
+        self.sorted_terms = {column: sorted({term for col, term in self.postings if col == column}) for column in COLUMNS}
+
+    @classmethod
+    def from_db(cls):
+        return cls(load_documents())
+
+    def _with_prefix(self, prefix, column):
+        terms = self.sorted_terms[column]
+        index = bisect_left(terms, prefix)
+        while index < len(terms) and terms[index].startswith(prefix):
+            yield terms[index]
+            index += 1
+
+    def has_prefix(self, prefix, columns):
+        return any(next(self._with_prefix(prefix, column), None) is not None for column in columns)
+
+    def terms(self, min_length, columns):
+        return list({term for column in columns for term in self.sorted_terms[column] if len(term) >= min_length})
+
+    def filter(self, queryset, groups, columns):
+        pks = None
+        for group in groups:
+            matched = set()
+            for term, prefix in group:
+                for column in columns:
+                    for found in (self._with_prefix(term, column) if prefix else [term]):
+                        matched |= self.postings.get((column, found), set())
+            pks = matched if pks is None else pks & matched
+        return queryset.filter(pk__in=sorted(pks or ()))
+
+_local_index = None
+_local_index_version = None
+_local_index_lock = threading.Lock()
+_fts5_tables = {}
+
+def fts5_available():
+    """Таблицу FTS5 создаёт миграция, если SQLite собран с FTS5; иначе - запасной индекс"""
+    key = (connection.vendor, connection.settings_dict['NAME'])
+    if key not in _fts5_tables:
+        _fts5_tables[key] = connection.vendor == 'sqlite' and SEARCH_TABLE in connection.introspection.table_names()
+    return _fts5_tables[key]
+
+def get_search_index():
+    """
+    Без FTS5 индекс в памяти живёт, пока не изменится версия в общем кэше
+    (bump_search_index) - так его перестраивают все процессы, а не только тот,
+    где изменили сотрудника.
+    """
+    global _local_index, _local_index_version
+    if fts5_available():
+        return Fts5SearchIndex()
+    version = search_index_version()
+    with _local_index_lock:
+        if _local_index is None or _local_index_version != version:
+            _local_index = LocalSearchIndex.from_db()
+            _local_index_version = version
+        return _local_index
+
+def invalidate_local_index():
+    """Сбрасывает индекс этого процесса сразу, остальные - после фиксации транзакции"""
+    global _local_index
+    with _local_index_lock:
+        _local_index = None
+    bump_search_index()
+
+def load_documents(pks=None):
+    from .models import Employee
+    queryset = Employee.objects.all()
+    if pks is not None:
+        queryset = queryset.filter(pk__in=pks)
+    return {
+        pk: document(first_name, last_name, position, skill_names)
+        for pk, first_name, last_name, position, skill_names in queryset.values_list(
+            'pk', 'first_name', 'last_name', 'position', 'skill_names',
+        ).iterator(chunk_size=5000)
+    }
+
+def index_documents(documents):
+    """Записывает готовые документы {id: document(...)} (массовый импорт - без чтения из БД)"""
+    if not documents:
+        return
+    if fts5_available():
+        Fts5SearchIndex().replace(documents)
+    else:
+        invalidate_local_index()
+
+def index_employees(pks):
+    """Переиндексирует сотрудников pks (после изменения имени, должности или сводки навыков)"""
+    pks = set(pks)
+    if pks:
+        index_documents(load_documents(pks) if fts5_available() else {pk: None for pk in pks})
+
+def unindex_employees(pks):
+    if fts5_available():
+        Fts5SearchIndex().delete(pks)
+    else:
+        invalidate_local_index()
+
+def rebuild_search_index():
+    """Полная переиндексация (команда rebuild_search_index)"""
+    if fts5_available():
+        index = Fts5SearchIndex()
+        index.clear()
+        index.replace(load_documents())
+    else:
+        invalidate_local_index()
+
+def expand_token(index, token, columns):
+    """
+    Варианты слова запроса: префикс как есть и в русской раскладке; если в словаре
+    таких префиксов нет - слова словаря на расстоянии до max_typos опечаток.
+    None - слову ничего не соответствует.
+    """
+    variants = [token]
+    if LATIN_RE.fullmatch(token):
+        variants.append(token.translate(LAYOUT))
+    group = [(variant, True) for variant in variants if index.has_prefix(variant, columns)]
+    if group:
+        return group
+    for variant in variants:
+        limit = max_typos(variant)
+        if limit:
+            group.extend(
+                (term, False) for term in index.terms(len(variant) - limit, columns)
+                if fuzzy_match(variant, term, limit)
+            )
+    return group or None
+
+def search_employees(queryset, query, columns=COLUMNS):
+    """
+    Сотрудники queryset, подходящие под поисковую строку query: каждое слово запроса
+    должно найтись (по префиксу, с опечатками или в другой раскладке) в одной из колонок.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset
+    index = get_search_index()
+    groups = []
+    for token in tokens:
+        group = expand_token(index, token, columns)
+        if group is None:
+            return queryset.none()
+        groups.append(group)
+    return index.filter(queryset, groups, columns)
@@ -0,0 +1,277 @@
+import time
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Employee, Desk
+from .spatial import adjacent_desk_numbers
+from .caching import bump_employees, bump_skill_matrix
+
+DEVELOPER_POSITIONS = ('backend', 'frontend')
+TESTER_POSITIONS = ('tester',)
+SEPARATED_POSITIONS = DEVELOPER_POSITIONS + TESTER_POSITIONS
+
+POSITION_LABELS = dict(Employee.POSITION_CHOICES)
+
+# При большом числе столов вместо IN (...) выбираем диапазон номеров одним запросом
+MAX_IN_LOOKUP = 500
+
+def seating_group(position):
+    """Группа правила разделения: 'developer', 'tester' или None"""
+    if position in DEVELOPER_POSITIONS:
+        return 'developer'
+    if position in TESTER_POSITIONS:
+        return 'tester'
+    return None
+
+class SeatingConflict(namedtuple('SeatingConflict', 'employee desk_number neighbor neighbor_desk_number')):
+    """Нарушение правила: employee за столом desk_number соседствует с neighbor"""
+
+    @property
+    def message(self):
+        return (
+            f'Тестировщики и разработчики не могут работать за соседними столами. '
+            f'Стол {self.desk_number} соседствует со столом {self.neighbor_desk_number}, '
+            f'где работает {POSITION_LABELS.get(self.neighbor.position, self.neighbor.position)} '
+            f'{self.neighbor.first_name} {self.neighbor.last_name}'
+        )
+
+def find_seating_conflicts(assignments):
+    """
+    Проверяет план рассадки целиком и возвращает список всех нарушений.
+    assignments - пары (employee, desk_number); сотрудники плана считаются
+    пересаженными, остальные остаются за своими столами.
+    Один запрос за соседями плюс проход по отсортированным номерам столов.
+    """
+    plan = [(employee, int(desk_number)) for employee, desk_number in assignments]
+    targets = {desk for employee, desk in plan if seating_group(employee.position)}
+    if not targets:
+        return []
+
+    adjacency = {desk: adjacent_desk_numbers(desk) for desk in targets}
+    neighborhood = {n for neighbors in adjacency.values() for n in neighbors}
+    queryset = Employee.objects.filter(position__in=SEPARATED_POSITIONS).only(
+        'id', 'first_name', 'last_name', 'position', 'desk_number'
+    )
+    if len(neighborhood) > MAX_IN_LOOKUP:
+        queryset = queryset.filter(desk_number__range=(min(neighborhood), max(neighborhood)))
+    else:
+        queryset = queryset.filter(desk_number__in=neighborhood)
+
+    # Итоговое состояние: сотрудники плана за новыми столами, прочие - за текущими
+    planned_pks = {employee.pk for employee, _ in plan if employee.pk is not None}
+    by_desk = defaultdict(list)
+    for employee, desk in plan:
+        group = seating_group(employee.position)
+        if group:
+            by_desk[desk].append((group, employee, True))
+    for employee in queryset:
+        if employee.pk not in planned_pks and employee.desk_number in neighborhood:
+            by_desk[employee.desk_number].append((seating_group(employee.position), employee, False))
+
+    # Проход по столам плана в порядке номеров; каждая пара столов проверяется один раз
+    conflicts = []
+    seen = set()
+    for desk in sorted(targets):
+        for neighbor_desk in adjacency[desk]:
+            pair = (min(desk, neighbor_desk), max(desk, neighbor_desk))
+            if neighbor_desk not in by_desk or pair in seen:
+                continue
+            seen.add(pair)
+            for left_group, left, left_planned in by_desk[desk]:
+                for right_group, other, right_planned in by_desk[neighbor_desk]:
+                    if left_group == right_group or not (left_planned or right_planned):
+                        continue
+                    if left_planned:
+                        conflicts.append(SeatingConflict(left, desk, other, neighbor_desk))
+                    else:
+                        conflicts.append(SeatingConflict(other, neighbor_desk, left, desk))
+    return conflicts
+
+class SeatingConflictError(ValidationError):
+    """ValidationError со списком нарушений в атрибуте conflicts"""
+
+    def __init__(self, conflicts):
+        super().__init__([conflict.message for conflict in conflicts])
+        self.conflicts = conflicts
+
+def validate_seating_plan(assignments):
+    """Бросает SeatingConflictError со всеми нарушениями плана рассадки"""
+    conflicts = find_seating_conflicts(assignments)
+    if conflicts:
+        raise SeatingConflictError(conflicts)
+
+def bulk_update_desks(plan):
+    """
+    Записывает новые номера столов одним подготовленным UPDATE через executemany.
+    QuerySet.bulk_update строит CASE WHEN на каждую строку, что на тысячах
+    строк заметно дороже самой записи.
+    """
+    table = connection.ops.quote_name(Employee._meta.db_table)
+    column = connection.ops.quote_name(Employee._meta.get_field('desk_number').column)
+    updated_column = connection.ops.quote_name(Employee._meta.get_field('updated_at').column)
+    pk_column = connection.ops.quote_name(Employee._meta.pk.column)
+    # auto_now срабатывает только в save() - маркер версии для условного GET пишем сами
+    updated_at = Employee._meta.get_field('updated_at').get_db_prep_value(timezone.now(), connection)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'UPDATE {table} SET {column} = %s, {updated_column} = %s WHERE {pk_column} = %s',
+            [(desk_number, updated_at, employee.pk) for employee, desk_number in plan],
+        )
+
+def apply_seating_plan(assignments):
+    """
+    Пересаживает сотрудников пачкой: проверка итогового состояния целиком
+    и запись одним пакетным UPDATE в одной транзакции (без full_clean() на каждую строку).
+    """
+    plan = [(employee, int(desk_number)) for employee, desk_number in assignments]
+    with transaction.atomic():
+        validate_seating_plan(plan)
+        bulk_update_desks(plan)
+        bump_employees([employee.pk for employee, _ in plan])
+        bump_skill_matrix()
+    for employee, desk_number in plan:
+        employee.desk_number = desk_number
+    return [employee for employee, _ in plan]
+
+SeatingMove = namedtuple('SeatingMove', 'employee from_desk to_desk')
+
+# Результат оптимизатора: пересадки, нерассаженные сотрудники и признак исчерпания бюджета
+SeatingSolution = namedtuple('SeatingSolution', 'moves unplaced timed_out')
+
+def _opposite(group, other):
+    return group is not None and other is not None and group != other
+
+def optimize_seating(reseat=(), time_budget=2.0):
+    """
+    Жадная рассадка с соблюдением правила тестировщик/разработчик.
+    Остаются на местах все корректно рассаженные сотрудники; пересаживаются
+    только переданные в reseat, сидящие за несуществующим/недоступным или уже
+    занятым столом и минимальное (жадно) число участников конфликтов.
+    Каждый пересаживаемый получает ближайший к текущему свободный стол, где
+    у него нет конфликтующих соседей. По истечении time_budget секунд
+    оставшиеся попадают в unplaced, как и участники конфликтов, найденных
+    итоговой проверкой плана (find_seating_conflicts).
+    """
+    deadline = time.monotonic() + time_budget
+    reseat = set(reseat)
+
+    desks = {
+        int(number) for number in Desk.objects.filter(is_available=True).values_list('number', flat=True)
+        if number.isdigit()
+    }
+    employees = list(Employee.objects.order_by('id').values_list('id', 'position', 'desk_number'))
+    groups = {pk: seating_group(position) for pk, position, _ in employees}
+    current = {pk: desk_number for pk, _, desk_number in employees}
+
+    occupant = {}
+    movers = []
+    for pk, _, desk_number in employees:
+        if pk in reseat or desk_number not in desks or desk_number in occupant:
+            movers.append(pk)
+        else:
+            occupant[desk_number] = pk
+
+    # Конфликты среди оставшихся: пересаживаем того, у кого больше конфликтов
+    adjacency = {desk: adjacent_desk_numbers(desk) for desk in desks}
+    pairs = {
+        (min(desk, neighbor), max(desk, neighbor)) for desk in occupant for neighbor in adjacency[desk]
+        if neighbor in occupant and _opposite(groups[occupant[desk]], groups[occupant[neighbor]])
+    }
+    edges = [(occupant[left], occupant[right]) for left, right in sorted(pairs)]
+    degree = defaultdict(int)
+    for left, right in edges:
+        degree[left] += 1
+        degree[right] += 1
+    moving = set(movers)
+    for left, right in edges:
+        if left in moving or right in moving:
+            continue
+        loser = left if degree[left] > degree[right] else right
+        moving.add(loser)
+        movers.append(loser)
+        del occupant[current[loser]]
+
+    # Для каждой группы - отсортированный список свободных столов, где у неё не будет
+    # конфликтующих соседей. Столы только занимаются, поэтому списки лишь сокращаются.
+    free = sorted(desks - occupant.keys())
+    candidates = {None: free}
+    for group in ('developer', 'tester'):
+        candidates[group] = [
+            desk for desk in free
+            if not any(
+                _opposite(group, groups[occupant[neighbor]])
+                for neighbor in adjacency[desk] if neighbor in occupant
+            )
+        ]
+
+    def discard(desks, desk):
+        index = bisect_left(desks, desk)
+        if index < len(desks) and desks[index] == desk:
+            del desks[index]
+
+    def fits(group, desk):
+        # Проверка по всем уже рассаженным соседям, а не только по спискам кандидатов
+        return not any(
+            _opposite(group, groups[occupant[neighbor]])
+            for neighbor in adjacency[desk] if neighbor in occupant
+        )
+
+    unplaced, timed_out = [], False
+    placed = {}
+    # Сначала сотрудники с ограничением, нейтральные должности заполняют оставшиеся места
+    for pk in sorted(movers, key=lambda pk: (groups[pk] is None, pk)):
+        if timed_out or time.monotonic() > deadline:
+            timed_out = True
+            unplaced.append(pk)
+            continue
+        group = groups[pk]
+        origin = current[pk]
+        desks_for_group = candidates[group]
+        desk = None
+        while desks_for_group:
+            # Ближайший к текущему подходящий стол
+            index = bisect_left(desks_for_group, origin)
+            if index == len(desks_for_group) or (
+                index > 0 and origin - desks_for_group[index - 1] <= desks_for_group[index] - origin
+            ):
+                index -= 1
+            if fits(group, desks_for_group[index]):
+                desk = desks_for_group[index]
+                break
+            del desks_for_group[index]
+        if desk is None:
+            unplaced.append(pk)
+            continue
+
+        occupant[desk] = pk
+        placed[pk] = desk
+        for desks_list in candidates.values():
+            discard(desks_list, desk)
+        if group is not None:
+            other = 'tester' if group == 'developer' else 'developer'
+            for neighbor in adjacency[desk]:
+                discard(candidates[other], neighbor)
+
+    # Итоговая проверка тем же движком, что и при применении: участники оставшихся
+    # конфликтов (например, с нерассаженными за прежними столами) не пересаживаются
+    objects = Employee.objects.only(
+        'id', 'first_name', 'last_name', 'position', 'desk_number'
+    ).in_bulk(list(placed))
+    while placed:
+        conflicts = find_seating_conflicts([(objects[pk], desk) for pk, desk in placed.items()])
+        if not conflicts:
+            break
+        for conflict in conflicts:
+            if placed.pop(conflict.employee.pk, None) is not None:
+                unplaced.append(conflict.employee.pk)
+    moves = [SeatingMove(pk, current[pk], desk) for pk, desk in placed.items() if desk != current[pk]]
+    return SeatingSolution(moves, sorted(unplaced), timed_out)
+
+def apply_seating_solution(solution):
+    """Применяет пересадки оптимизатора через apply_seating_plan"""
+    employees = Employee.objects.only(
+        'id', 'first_name', 'last_name', 'position', 'desk_number'
+    ).in_bulk([move.employee for move in solution.moves])
+    return apply_seating_plan([(employees[move.employee], move.to_desk) for move in solution.moves])
@@ -1,7 +1,17 @@
+from datetime import timedelta
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.storage import default_storage
+from django.db.models import QuerySet
 from django.utils import timezone
 from .models import Employee, Skill, Desk, EmployeeSkill, EmployeeImage, Reservation
+from .thumbnails import thumbnail_sizes, thumbnail_name, THUMBNAIL_FORMATS
+from .storage import url_builder
+from .uploads import inspect_image
+from .search import normalize
+from .spatial import get_desk_index
+from .staffing import MAX_REQUIREMENTS
 
 class SkillSerializer(serializers.ModelSerializer):
     class Meta:
@@ -15,18 +25,125 @@ class EmployeeSkillSerializer(serializers.ModelSerializer):
         model = EmployeeSkill
         fields = ['id', 'skill', 'skill_name', 'level']
 
+class ThumbnailsField(serializers.Field):
+    """Миниатюры объекта с методом thumbnail_url: {"50": {"webp": url, "jpeg": url}, ...}"""
+    
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+    
+    def to_representation(self, obj):
+        request = self.context.get('request')
+        thumbnails = {}
+        for size in thumbnail_sizes():
+            urls = {}
+            for fmt in THUMBNAIL_FORMATS:
+                url = obj.thumbnail_url(size, fmt)
+                if not url:
+                    return None
+                urls[fmt] = request.build_absolute_uri(url) if request else url
+            thumbnails[str(size)] = urls
+        return thumbnails
+
+class StreamedImageField(serializers.ImageField):
+    """ImageField с проверкой по заголовку: растр не декодируется, файл не читается в память"""
+    
+    def to_internal_value(self, data):
+        file = serializers.FileField.to_internal_value(self, data)
+        try:
+            inspect_image(file)
+        except DjangoValidationError as error:
+            raise serializers.ValidationError(error.messages)
+        return file
+
 class EmployeeImageSerializer(serializers.ModelSerializer):
+    image = StreamedImageField()
+    thumbnails = ThumbnailsField()
+    
     class Meta:
         model = EmployeeImage
-        fields = ['id', 'image', 'uploaded_at']
+        fields = ['id', 'employee', 'image', 'thumbnails', 'uploaded_at']
+
+class EmployeeImageBulkSerializer(serializers.Serializer):
+    """Несколько фото сотрудника в одном multipart-запросе: employee и повторяющееся поле images"""
+    MAX_FILES = 20
+    
+    employee = serializers.PrimaryKeyRelatedField(queryset=Employee.objects.all())
+    images = serializers.ListField(child=StreamedImageField(), allow_empty=False, max_length=MAX_FILES)
 
 class DeskSerializer(serializers.ModelSerializer):
     class Meta:
         model = Desk
         fields = ['id', 'number', 'location', 'coordinates_x', 'coordinates_y', 'is_available']
 
+class EmployeeListFastSerializer(serializers.ListSerializer):
+    """
+    Быстрый путь EmployeeListSerializer(many=True), только чтение: строки берутся
+    из .values() (или читаются с экземпляров), словари собираются напрямую, без дерева
+    полей DRF на каждый объект. Текущая дата, подписи должностей и функция абсолютных
+    URL вычисляются один раз на запрос. Вывод побайтно совпадает с обычным путём.
+    """
+    VALUE_FIELDS = (
+        'id', 'first_name', 'last_name', 'position', 'desk_number', 'hire_date', 'gender',
+        'skill_names', 'main_photo', 'main_photo_thumbnails', 'image_count',
+    )
+    POSITION_LABELS = dict(Employee.POSITION_CHOICES)
+    
+    def rows(self, data):
+        if isinstance(data, QuerySet):
+            return data.values(*self.VALUE_FIELDS)
+        return (
+            row if isinstance(row, dict) else {field: getattr(row, field) for field in self.VALUE_FIELDS}
+            for row in data
+        )
+    
+    def to_representation(self, data):
+        request = self.context.get('request')
+        url = url_builder(default_storage, request.build_absolute_uri if request else str)
+        hire_date = self.child.fields['hire_date'].to_representation
+        labels = self.POSITION_LABELS
+        today = timezone.now().date()
+        sizes = thumbnail_sizes()
+        
+        result = []
+        for row in self.rows(data):
+            main_photo = row['main_photo']
+            if main_photo:
+                photo = url(main_photo)
+                # Как thumbnail_url: пока миниатюры не готовы, везде URL исходника
+                if row['main_photo_thumbnails']:
+                    thumbnails = {
+                        str(size): {fmt: url(thumbnail_name(main_photo, size, fmt)) for fmt in THUMBNAIL_FORMATS}
+                        for size in sizes
+                    }
+                else:
+                    thumbnails = {str(size): {fmt: photo for fmt in THUMBNAIL_FORMATS} for size in sizes}
+            else:
+                photo = thumbnails = None
+            position = row['position']
+            result.append({
+                'id': row['id'],
+                'first_name': row['first_name'],
+                'last_name': row['last_name'],
+                'position': position,
+                'position_display': labels.get(position, position),
+                'desk_number': row['desk_number'],
+                'hire_date': hire_date(row['hire_date']),
+                'gender': row['gender'],
+                'skills': list(row['skill_names']),
+                'main_photo': photo,
+                'thumbnails': thumbnails,
+                'image_count': row['image_count'],
+                'work_experience_days': (today - row['hire_date']).days,
+            })
+        return result
+
 class EmployeeListSerializer(serializers.ModelSerializer):
-    skills = serializers.SlugRelatedField(many=True, read_only=True, slug_field='name')
+    # Сводка на самом сотруднике - без запросов к навыкам и галерее
+    skills = serializers.ListField(source='skill_names', child=serializers.CharField(), read_only=True)
+    main_photo = serializers.SerializerMethodField()
+    thumbnails = ThumbnailsField()
     work_experience_days = serializers.SerializerMethodField()
     position_display = serializers.CharField(source='get_position_display', read_only=True)
     
@@ -34,8 +151,17 @@ class EmployeeListSerializer(serializers.ModelSerializer):
         model = Employee
         fields = [
             'id', 'first_name', 'last_name', 'position', 'position_display',
-            'desk_number', 'hire_date', 'gender', 'skills', 'work_experience_days'
+            'desk_number', 'hire_date', 'gender', 'skills', 'main_photo', 'thumbnails', 'image_count',
+            'work_experience_days'
         ]
+        list_serializer_class = EmployeeListFastSerializer
+    
+    def get_main_photo(self, obj):
+        url = obj.main_photo_url
+        request = self.context.get('request')
+        if url and request:
+            return request.build_absolute_uri(url)
+        return url or None
     
     def get_work_experience_days(self, obj):
         return obj.get_work_experience_days()
@@ -95,6 +221,87 @@ class EmployeeMoveSerializer(serializers.Serializer):
             raise serializers.ValidationError("Стол с таким номером не существует")
         return value
 
+class BulkMoveItemSerializer(serializers.Serializer):
+    employee = serializers.IntegerField(min_value=1)
+    desk_number = serializers.IntegerField(min_value=1)
+
+class EmployeeBulkMoveSerializer(serializers.Serializer):
+    moves = BulkMoveItemSerializer(many=True, allow_empty=False)
+    
+    def validate_moves(self, value):
+        employee_ids = [move['employee'] for move in value]
+        if len(set(employee_ids)) != len(employee_ids):
+            raise serializers.ValidationError("Сотрудник указан в списке перемещений несколько раз")
+        
+        # Проверяем существование всех сотрудников и столов пачкой, а не по одному
+        employees = Employee.objects.only(
+            'id', 'first_name', 'last_name', 'position', 'desk_number'
+        ).in_bulk(employee_ids)
+        missing = sorted(set(employee_ids) - set(employees))
+        if missing:
+            raise serializers.ValidationError(f"Сотрудники не найдены: {missing}")
+        
+        desk_numbers = {str(move['desk_number']) for move in value}
+        desks = Desk.objects.in_bulk(list(desk_numbers), field_name='number')
+        missing = sorted(desk_numbers - set(desks), key=int)
+        if missing:
+            raise serializers.ValidationError(f"Столы с такими номерами не существуют: {missing}")
+        
+        return [(employees[move['employee']], move['desk_number']) for move in value]
+
+class EmployeeImportSerializer(serializers.Serializer):
+    """Файл .csv/.xlsx с колонками first_name, last_name, position, desk_number[, hire_date, gender, skills]"""
+    file = serializers.FileField()
+    atomic = serializers.BooleanField(default=False)
+    create_skills = serializers.BooleanField(default=False)
+
+class StaffingMatchSerializer(serializers.Serializer):
+    """Требования {навык (id или название): уровень}, k лучших, близость к столу near_desk"""
+    skills = serializers.DictField(child=serializers.ChoiceField(choices=EmployeeSkill.LEVEL_CHOICES), allow_empty=False)
+    k = serializers.IntegerField(min_value=1, max_value=100, default=10)
+    positions = serializers.ListField(
+        child=serializers.ChoiceField(choices=Employee.POSITION_CHOICES), required=False, default=list,
+    )
+    near_desk = serializers.CharField(required=False)
+    proximity_weight = serializers.FloatField(min_value=0, max_value=1, default=0.3)
+    require_all = serializers.BooleanField(default=False)
+    
+    def validate_skills(self, value):
+        """{skill_id: уровень}; названия - без учёта регистра"""
+        if len(value) > MAX_REQUIREMENTS:
+            raise serializers.ValidationError(f'Не больше {MAX_REQUIREMENTS} навыков')
+        ids = {}
+        names = {}
+        for pk, name in Skill.objects.values_list('id', 'name'):
+            ids[str(pk)] = pk
+            names.setdefault(normalize(name), pk)
+        requirements = {}
+        unknown = []
+        for key, level in value.items():
+            pk = ids.get(key.strip()) or names.get(normalize(key.strip()))
+            if pk is None:
+                unknown.append(key)
+            else:
+                requirements[pk] = max(level, requirements.get(pk, 0))
+        if unknown:
+            raise serializers.ValidationError(f'Неизвестные навыки: {", ".join(unknown)}')
+        return requirements
+    
+    def validate_near_desk(self, value):
+        """Координаты (x, y) стола"""
+        desk = get_desk_index().by_number.get(value)
+        if desk is None:
+            raise serializers.ValidationError(f'Стол {value} не найден')
+        return desk[2], desk[3]
+
+class AnalyticsQuerySerializer(serializers.Serializer):
+    min_level = serializers.ChoiceField(choices=EmployeeSkill.LEVEL_CHOICES, required=False)
+    period = serializers.ChoiceField(choices=['month', 'year'], default='month')
+
+class SeatingOptimizeSerializer(serializers.Serializer):
+    employees = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list)
+    time_budget = serializers.FloatField(min_value=0.01, max_value=30, default=2.0)
+
 class ReservationSerializer(serializers.ModelSerializer):
     desk_number = serializers.CharField(source='desk.number', read_only=True)
     user_name = serializers.CharField(source='user.get_full_name', read_only=True)
@@ -103,6 +310,63 @@ class ReservationSerializer(serializers.ModelSerializer):
         model = Reservation
         fields = ['id', 'user', 'user_name', 'desk', 'desk_number', 'date', 'created_at']
         read_only_fields = ['user', 'created_at']
+        # Занятость стола проверяет booking.save_reservation под блокировкой (ответ 409)
+        validators = []
+
+class BulkReservationItemSerializer(serializers.Serializer):
+    desk = serializers.IntegerField(min_value=1)
+    date = serializers.DateField()
+
+class BulkReservationSerializer(serializers.Serializer):
+    """
+    Пакет бронирований: либо правило (desks + weekdays + start/end),
+    либо явный список items из пар стол/дата.
+    """
+    MAX_OCCURRENCES = 1000
+    
+    desks = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    weekdays = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=6), required=False,
+        help_text='Дни недели: 0 - понедельник, 6 - воскресенье',
+    )
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    items = BulkReservationItemSerializer(many=True, required=False)
+    atomic = serializers.BooleanField(default=False)
+    
+    def validate(self, attrs):
+        rule = [name for name in ('desks', 'weekdays', 'start', 'end') if name in attrs]
+        if bool(rule) == ('items' in attrs):
+            raise serializers.ValidationError("Укажите либо правило (desks, weekdays, start, end), либо список items")
+        
+        if rule:
+            if len(rule) != 4:
+                raise serializers.ValidationError("Правило требует desks, weekdays, start и end")
+            if attrs['end'] < attrs['start']:
+                raise serializers.ValidationError("Дата end раньше даты start")
+            if (attrs['end'] - attrs['start']).days > 366:
+                raise serializers.ValidationError("Правило не может охватывать больше года")
+            weekdays = set(attrs['weekdays'])
+            days = [
+                attrs['start'] + timedelta(days=offset)
+                for offset in range((attrs['end'] - attrs['start']).days + 1)
+            ]
+            pairs = [(desk, day) for day in days if day.weekday() in weekdays for desk in attrs['desks']]
+        else:
+            pairs = [(item['desk'], item['date']) for item in attrs['items']]
+        
+        if not pairs:
+            raise serializers.ValidationError("Правило не даёт ни одной даты")
+        if len(pairs) > self.MAX_OCCURRENCES:
+            raise serializers.ValidationError(f"Не больше {self.MAX_OCCURRENCES} бронирований за запрос")
+        
+        desks = Desk.objects.in_bulk({desk for desk, _ in pairs})
+        missing = sorted({desk for desk, _ in pairs} - set(desks))
+        if missing:
+            raise serializers.ValidationError(f"Столы не найдены: {missing}")
+        
+        attrs['occurrences'] = [(desks[desk], day) for desk, day in pairs]
+        return attrs
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
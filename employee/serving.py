@@ -0,0 +1,143 @@
+import mimetypes
+import os
+import re
+import stat
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_etags
+from .storage import content_etag
+
+# Файлы с хэшем содержимого в имени никогда не меняются
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Предсжатые варианты рядом с файлом (см. CompressedStaticFilesStorage), в порядке предпочтения
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+class RangeFile:
+    """Файл, ограниченный диапазоном [start, start + length): FileResponse читает только его"""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+def parse_range(header, size):
+    """
+    (start, length) для заголовка Range с одним диапазоном байт; None, если
+    заголовок не поддерживается (отдаётся весь файл); ValueError - диапазон вне файла.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # bytes=-N: последние N байт
+        length = min(int(last), size)
+        if length == 0:
+            raise ValueError(header)
+        return size - length, length
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end - start + 1
+
+def _stat(path):
+    try:
+        info = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return info if stat.S_ISREG(info.st_mode) else None
+
+def _etag(info, name, encoding):
+    etag = content_etag(name) or f'{info.st_mtime_ns:x}-{info.st_size:x}'
+    return f'"{etag}-{encoding}"' if encoding else f'"{etag}"'
+
+def _select_variant(request, full_path, precompressed):
+    """Предсжатый вариант под Accept-Encoding: (путь, stat, encoding или None)"""
+    if precompressed:
+        accepted = {
+            item.split(';')[0].strip().lower()
+            for item in request.headers.get('Accept-Encoding', '').split(',')
+        }
+        for encoding, suffix in PRECOMPRESSED:
+            if encoding in accepted:
+                info = _stat(full_path + suffix)
+                if info is not None:
+                    return full_path + suffix, info, encoding
+    return full_path, _stat(full_path), None
+
+def serve_file(request, root, path, cache_control=None, precompressed=False):
+    """
+    Отдача файла из каталога root: ETag/Last-Modified (304 и 412 только по stat,
+    без чтения файла), один диапазон Range (206/416), предсжатые .br/.gz варианты.
+    Тело отдаётся FileResponse: под WSGI-сервером с wsgi.file_wrapper
+    (gunicorn, uWSGI) полный файл уходит через sendfile.
+    """
+    try:
+        full_path = safe_join(root, path)
+    except SuspiciousFileOperation:
+        raise Http404(path)
+    served_path, info, encoding = _select_variant(request, full_path, precompressed)
+    if info is None:
+        raise Http404(path)
+
+    etag = _etag(info, path, encoding)
+    last_modified = int(info.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _file_response(request, served_path, info.st_size, etag)
+        if isinstance(response, FileResponse):
+            content_type, _ = mimetypes.guess_type(full_path)
+            response['Content-Type'] = content_type or 'application/octet-stream'
+            # FileResponse подставляет Content-Disposition по имени файла (для варианта - .br/.gz)
+            del response['Content-Disposition']
+            if encoding:
+                response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if content_etag(path):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    else:
+        response['Cache-Control'] = cache_control or f'public, max-age={settings.STATIC_CACHE_MAX_AGE}'
+    if precompressed:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+def _file_response(request, path, size, etag):
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if range_header and request.method in ('GET', 'HEAD') and (not if_range or etag in parse_etags(if_range)):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        if byte_range is not None:
+            start, length = byte_range
+            response = FileResponse(RangeFile(open(path, 'rb'), start, length), status=206)
+            response['Content-Length'] = str(length)
+            response['Content-Range'] = f'bytes {start}-{start + length - 1}/{size}'
+            response['Accept-Ranges'] = 'bytes'
+            return response
+    response = FileResponse(open(path, 'rb'))
+    response['Content-Length'] = str(size)
+    response['Accept-Ranges'] = 'bytes'
+    return response
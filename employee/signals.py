@@ -0,0 +1,141 @@
+from django.db import transaction
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from django_cleanup.signals import cleanup_post_delete
+from .models import Desk, Reservation, Employee, Skill, EmployeeSkill, EmployeeImage
+from .spatial import invalidate_desk_index
+from .summary import refresh_employee_summaries
+from .caching import bump_employees, bump_skill_matrix, bump_permissions, bump_desk_index
+from .search import index_employees, unindex_employees
+from .thumbnails import schedule_thumbnails, delete_thumbnails
+from . import availability, analytics
+
+User = get_user_model()
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def permissions_changed(sender, action, **kwargs):
+    """Состав групп или права изменились - роли (permissions.py) пересчитываются"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_permissions()
+
+@receiver([post_save, post_delete], sender=Group)
+@receiver(post_delete, sender=Permission)
+def group_changed(sender, **kwargs):
+    # Смотритель определяется по названию группы; удаление права удаляет и его связи
+    bump_permissions()
+
+@receiver([post_save, post_delete], sender=Desk)
+def desk_changed(sender, **kwargs):
+    """Координаты или набор столов изменились - пространственный индекс и список свободных столов устарели"""
+    invalidate_desk_index()
+    bump_desk_index()
+    availability.invalidate_desks()
+
+@receiver(pre_save, sender=Reservation)
+def reservation_pre_save(sender, instance, **kwargs):
+    # При изменении брони нужно знать прежнюю дату, чтобы сбросить её маску
+    if instance.pk is not None:
+        instance._previous_date = (
+            Reservation.objects.filter(pk=instance.pk).values_list('date', flat=True).first()
+        )
+
+@receiver(post_save, sender=Reservation)
+def reservation_saved(sender, instance, created, **kwargs):
+    availability.invalidate_dates(
+        day for day in (instance.date, getattr(instance, '_previous_date', None)) if day is not None
+    )
+
+@receiver(post_delete, sender=Reservation)
+def reservation_deleted(sender, instance, **kwargs):
+    availability.invalidate_dates([instance.date])
+
+
+@receiver([post_save, post_delete], sender=Employee)
+def employee_changed(sender, instance, **kwargs):
+    """Сотрудник добавлен, изменён или удалён - сбрасываем его страницы и списки"""
+    bump_employees([instance.pk], collection=True)
+
+@receiver([post_save, post_delete], sender=Employee)
+@receiver([post_save, post_delete], sender=EmployeeSkill)
+@receiver([post_save, post_delete], sender=Desk)
+def skill_matrix_changed(sender, **kwargs):
+    # Матрица подбора (staffing.py) перестраивается лениво - при следующем запросе
+    bump_skill_matrix()
+
+@receiver(post_save, sender=Employee)
+def employee_saved(sender, instance, **kwargs):
+    index_employees([instance.pk])
+
+@receiver(post_delete, sender=Employee)
+def employee_deleted(sender, instance, **kwargs):
+    unindex_employees([instance.pk])
+
+def _analytics_fields_saved(update_fields):
+    return update_fields is None or not set(update_fields).isdisjoint(analytics.EMPLOYEE_FIELDS)
+
+@receiver(pre_save, sender=Employee)
+def employee_pre_save(sender, instance, update_fields=None, **kwargs):
+    # Прежние должность, пол и дата приёма - чтобы перенести счётчики аналитики
+    instance._previous_analytics = None
+    if instance.pk is not None and _analytics_fields_saved(update_fields):
+        instance._previous_analytics = (
+            Employee.objects.filter(pk=instance.pk).values(*analytics.EMPLOYEE_FIELDS).first()
+        )
+
+@receiver(post_save, sender=Employee)
+def employee_analytics_saved(sender, instance, created, update_fields=None, **kwargs):
+    if _analytics_fields_saved(update_fields):
+        analytics.employee_saved(instance, None if created else getattr(instance, '_previous_analytics', None))
+
+@receiver(post_delete, sender=Employee)
+def employee_analytics_deleted(sender, instance, **kwargs):
+    analytics.employee_deleted(instance)
+
+@receiver(pre_save, sender=EmployeeSkill)
+def employee_skill_pre_save(sender, instance, **kwargs):
+    instance._previous_analytics = None
+    if instance.pk is not None:
+        instance._previous_analytics = (
+            EmployeeSkill.objects.filter(pk=instance.pk).values('employee_id', 'skill_id', 'level').first()
+        )
+
+@receiver(post_save, sender=EmployeeSkill)
+def employee_skill_analytics_saved(sender, instance, created, **kwargs):
+    analytics.skill_saved(instance, None if created else getattr(instance, '_previous_analytics', None))
+
+@receiver(post_delete, sender=EmployeeSkill)
+def employee_skill_analytics_deleted(sender, instance, **kwargs):
+    analytics.skill_deleted(instance)
+
+@receiver([post_save, post_delete], sender=EmployeeSkill)
+@receiver([post_save, post_delete], sender=EmployeeImage)
+def employee_summary_changed(sender, instance, **kwargs):
+    """
+    Навыки или галерея сотрудника изменились - пересчитываем сводку для списков
+    (refresh_employee_summaries заодно сбрасывает закэшированные карточки)
+    """
+    refresh_employee_summaries([instance.employee_id])
+
+@receiver(post_save, sender=Skill)
+def skill_renamed(sender, instance, created, **kwargs):
+    if not created:
+        refresh_employee_summaries(
+            EmployeeSkill.objects.filter(skill=instance).values_list('employee_id', flat=True)
+        )
+
+@receiver(post_save, sender=EmployeeImage)
+def employee_image_saved(sender, instance, **kwargs):
+    """Новый файл - миниатюры строятся в пуле воркеров после фиксации транзакции"""
+    if instance.image and not instance.has_thumbnails:
+        transaction.on_commit(lambda: schedule_thumbnails(instance.pk))
+
+@receiver(cleanup_post_delete, sender=EmployeeImage)
+def image_file_deleted(sender, file_name, file, **kwargs):
+    # django_cleanup удалил исходник (удаление или замена фото) - удаляем и его миниатюры.
+    # Файл, на который ещё ссылаются другие фото, хранилище не удаляет - миниатюры тоже нужны
+    if not file.storage.exists(file_name):
+        delete_thumbnails(file_name)
@@ -0,0 +1,133 @@
+import math
+import threading
+from collections import defaultdict
+from heapq import nsmallest
+from django.conf import settings
+from .caching import desk_index_version
+
+class DeskSpatialIndex:
+    """
+    Сеточный пространственный индекс столов по coordinates_x/coordinates_y.
+    Стол попадает в ячейку (x // cell_size, y // cell_size); поиск в радиусе и
+    k ближайших обходит только ячейки рядом с точкой.
+    """
+
+    def __init__(self, desks, cell_size=1.0):
+        self.cell_size = float(cell_size)
+        self.cells = defaultdict(list)
+        self.by_id = {}
+        self.by_number = {}
+        for desk_id, number, x, y in desks:
+            entry = (desk_id, number, x, y)
+            self.cells[self._cell(x, y)].append(entry)
+            self.by_id[desk_id] = entry
+            self.by_number[number] = entry
+        if self.cells:
+            self.bounds = (
+                min(cx for cx, _ in self.cells), max(cx for cx, _ in self.cells),
+                min(cy for _, cy in self.cells), max(cy for _, cy in self.cells),
+            )
+
+    @classmethod
+    def from_db(cls, cell_size=1.0):
+        from .models import Desk
+        return cls(Desk.objects.values_list('id', 'number', 'coordinates_x', 'coordinates_y'), cell_size)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def _cell(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def within(self, x, y, radius):
+        """Столы (id, number, x, y) на расстоянии не больше radius, по возрастанию расстояния"""
+        if not self.cells:
+            return []
+        min_cx, min_cy = self._cell(x - radius, y - radius)
+        max_cx, max_cy = self._cell(x + radius, y + radius)
+        min_cx, max_cx = max(min_cx, self.bounds[0]), min(max_cx, self.bounds[1])
+        min_cy, max_cy = max(min_cy, self.bounds[2]), min(max_cy, self.bounds[3])
+        limit = radius * radius
+        found = []
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                for entry in self.cells.get((cx, cy), ()):
+                    distance = (entry[2] - x) ** 2 + (entry[3] - y) ** 2
+                    if distance <= limit:
+                        found.append((distance, entry))
+        found.sort(key=lambda item: (item[0], item[1][0]))
+        return [entry for _, entry in found]
+
+    def nearest(self, x, y, k=1):
+        """k ближайших к точке столов: обход колец ячеек, пока кольцо может дать кого-то ближе"""
+        if not self.cells or k <= 0:
+            return []
+        k = min(k, len(self.by_id))
+        cx, cy = self._cell(x, y)
+        max_ring = max(
+            abs(cx - self.bounds[0]), abs(cx - self.bounds[1]),
+            abs(cy - self.bounds[2]), abs(cy - self.bounds[3]),
+        )
+        candidates = []
+        for ring in range(max_ring + 1):
+            for gx in range(cx - ring, cx + ring + 1):
+                for gy in range(cy - ring, cy + ring + 1):
+                    if max(abs(gx - cx), abs(gy - cy)) != ring:
+                        continue
+                    for entry in self.cells.get((gx, gy), ()):
+                        candidates.append(((entry[2] - x) ** 2 + (entry[3] - y) ** 2, entry[0], entry))
+            if len(candidates) >= k:
+                # Всё, что лежит за пределами кольца ring, не ближе ring * cell_size
+                kth = nsmallest(k, candidates)[-1][0]
+                if kth <= (ring * self.cell_size) ** 2:
+                    break
+        return [entry for _, _, entry in nsmallest(k, candidates)]
+
+    def neighbors(self, number, radius):
+        """Столы в радиусе radius от стола с номером number (без него самого); None, если стола нет"""
+        desk = self.by_number.get(str(number))
+        if desk is None:
+            return None
+        return [entry for entry in self.within(desk[2], desk[3], radius) if entry[0] != desk[0]]
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+def get_desk_index():
+    """
+    Индекс строится одним запросом при первом обращении и живёт, пока не изменится
+    версия в общем кэше (bump_desk_index) - так его перестраивают все процессы,
+    а не только тот, где изменили стол.
+    """
+    global _index, _index_version
+    version = desk_index_version()
+    with _index_lock:
+        if _index is None or _index_version != version:
+            _index = DeskSpatialIndex.from_db(cell_size=max(settings.DESK_NEIGHBOR_RADIUS, 1))
+            _index_version = version
+        return _index
+
+def invalidate_desk_index(**kwargs):
+    """
+    Сбрасывает индекс этого процесса: изменения столов видны ему сразу, ещё до
+    фиксации транзакции; остальные процессы сбрасывает bump_desk_index
+    """
+    global _index
+    with _index_lock:
+        _index = None
+
+def geometric_adjacency():
+    return settings.DESK_ADJACENCY == 'geometry'
+
+def adjacent_desk_numbers(desk_number):
+    """
+    Номера соседних столов для правила тестировщик/разработчик.
+    В режиме DESK_ADJACENCY = 'geometry' - столы в радиусе DESK_NEIGHBOR_RADIUS
+    по координатам; для столов, которых нет в справочнике Desk, - номер ± 1.
+    """
+    if geometric_adjacency():
+        neighbors = get_desk_index().neighbors(desk_number, settings.DESK_NEIGHBOR_RADIUS)
+        if neighbors is not None:
+            return [int(entry[1]) for entry in neighbors if entry[1].isdigit()]
+    return [desk_number - 1, desk_number + 1]
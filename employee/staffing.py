@@ -0,0 +1,244 @@
+import math
+import heapq
+import threading
+from collections import namedtuple
+from django.conf import settings
+from .caching import skill_matrix_version
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Кандидат подбора: итоговая оценка, доля покрытия требований (0..1), расстояние
+# от его стола до точки (None - стол неизвестен), соответствие всем уровням,
+# уровни требуемых навыков в порядке требований
+Match = namedtuple('Match', 'employee score skill_score distance meets_all levels')
+
+MAX_LEVEL = 4
+# Вклад навыка в оценку - целое min(уровень, требуемый) * SCALE / требуемый (SCALE делится
+# на 1..4); сумма по MAX_REQUIREMENTS навыкам помещается в байт
+SCALE = 12
+MAX_REQUIREMENTS = 255 // SCALE
+
+def _table(value):
+    return bytes(value(min(level, MAX_LEVEL)) for level in range(256))
+
+# Таблицы bytes.translate: уровень -> вклад в оценку и уровень -> 1, если не ниже требуемого
+SCORE_TABLES = {need: _table(lambda level, need=need: min(level, need) * SCALE // need) for need in range(1, MAX_LEVEL + 1)}
+MEETS_TABLES = {need: _table(lambda level, need=need: int(level >= need)) for need in range(1, MAX_LEVEL + 1)}
+
+class SkillMatrix:
+    """
+    Матрица сотрудник x навык в памяти процесса: на каждый навык - bytes длиной
+    в число сотрудников (строки по возрастанию id), байт - уровень (0 - навыка нет).
+
+    Оценка навыков - среднее по требованиям min(уровень, требуемый) / требуемый;
+    при proximity_weight = w итог (1 - w) * оценка + w / (1 + расстояние / DESK_NEIGHBOR_RADIUS).
+    С NumPy колонки складываются в массив uint8 и считаются векторно; без него колонки
+    переводятся в вклады (bytes.translate) и складываются как длинные целые - байт
+    на сотрудника, без переноса между байтами, - так что цикл на Python идёт только
+    по лучшим оценкам, а не по всем сотрудникам.
+    """
+
+    def __init__(self, employees, skills, desks, use_numpy=None):
+        """employees - (id, position, desk_number); skills - (employee_id, skill_id, level); desks - (number, x, y)"""
+        coordinates = {str(number): (float(x), float(y)) for number, x, y in desks}
+        self.ids = []
+        self.positions = []
+        self.x = []
+        self.y = []
+        for pk, position, desk_number in sorted(employees):
+            self.ids.append(pk)
+            self.positions.append(position)
+            x, y = coordinates.get(str(desk_number), (math.nan, math.nan))
+            self.x.append(x)
+            self.y.append(y)
+        rows = {pk: row for row, pk in enumerate(self.ids)}
+        columns = {}
+        for employee_id, skill_id, level in skills:
+            row = rows.get(employee_id)
+            if row is not None:
+                column = columns.setdefault(skill_id, bytearray(len(self.ids)))
+                column[row] = max(column[row], min(level, MAX_LEVEL))
+        self.columns = {skill_id: bytes(column) for skill_id, column in columns.items()}
+        self.position_masks = {
+            position: int.from_bytes(bytes(255 if item == position else 0 for item in self.positions), 'big')
+            for position in set(self.positions)
+        }
+        self.use_numpy = numpy is not None if use_numpy is None else use_numpy
+        if self.use_numpy:
+            self._build_arrays()
+
+    def _build_arrays(self):
+        # Последняя строка - нули для навыков, которых нет ни у кого
+        self.skill_rows = {skill_id: index for index, skill_id in enumerate(self.columns)}
+        self.levels = numpy.zeros((len(self.columns) + 1, len(self.ids)), dtype=numpy.uint8)
+        for index, column in enumerate(self.columns.values()):
+            self.levels[index] = numpy.frombuffer(column, dtype=numpy.uint8)
+        self.id_array = numpy.array(self.ids, dtype=numpy.int64)
+        self.position_array = numpy.array(self.positions, dtype=object)
+        self.x_array = numpy.array(self.x, dtype=float)
+        self.y_array = numpy.array(self.y, dtype=float)
+
+    @classmethod
+    def from_db(cls):
+        from .models import Employee, EmployeeSkill, Desk
+        return cls(
+            Employee.objects.order_by().values_list('id', 'position', 'desk_number').iterator(chunk_size=5000),
+            EmployeeSkill.objects.order_by().values_list('employee_id', 'skill_id', 'level').iterator(chunk_size=5000),
+            Desk.objects.values_list('number', 'coordinates_x', 'coordinates_y'),
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def match(self, requirements, k=10, positions=None, near=None, proximity_weight=0.0, require_all=False):
+        """
+        k лучших сотрудников под требования {skill_id: уровень} (не больше MAX_REQUIREMENTS);
+        positions - допустимые должности, near - точка (x, y) для учёта близости столов.
+        Сотрудники без единого требуемого навыка не подходят. При равных оценках - по возрастанию id.
+        """
+        if len(requirements) > MAX_REQUIREMENTS:
+            raise ValueError(f'Не больше {MAX_REQUIREMENTS} навыков в запросе')
+        if not requirements or k <= 0 or not self.ids:
+            return []
+        skill_ids = list(requirements)
+        needed = [min(requirements[skill_id], MAX_LEVEL) for skill_id in skill_ids]
+        weight = proximity_weight if near is not None else 0.0
+        match = self._match_numpy if self.use_numpy else self._match_python
+        return match(skill_ids, needed, k, set(positions or ()), near, weight, require_all)
+
+    def _proximity(self, distance):
+        return 1 / (1 + distance / settings.DESK_NEIGHBOR_RADIUS)
+
+    def _distance(self, row, near):
+        if near is None or math.isnan(self.x[row]):
+            return None
+        return math.hypot(self.x[row] - near[0], self.y[row] - near[1])
+
+    def _match_python(self, skill_ids, needed, k, positions, near, weight, require_all):
+        size = len(self.ids)
+        total = meets = 0
+        for skill_id, need in zip(skill_ids, needed):
+            column = self.columns.get(skill_id)
+            if column is None:
+                if require_all:
+                    return []
+                continue
+            total += int.from_bytes(column.translate(SCORE_TABLES[need]), 'big')
+            if require_all:
+                meets += int.from_bytes(column.translate(MEETS_TABLES[need]), 'big')
+        if require_all:
+            full = bytes(255 if count == len(needed) else 0 for count in range(256))
+            total &= int.from_bytes(meets.to_bytes(size, 'big').translate(full), 'big')
+        if positions:
+            mask = 0
+            for position in positions:
+                mask |= self.position_masks.get(position, 0)
+            total &= mask
+        scores = total.to_bytes(size, 'big')
+
+        # Обход по убыванию суммы вкладов; строки с одной суммой - по возрастанию id.
+        # best - куча k лучших (оценка, -id, строка), наверху худший
+        best = []
+        scale = SCALE * len(needed)
+        ids, xs, ys = self.ids, self.x, self.y
+        radius = settings.DESK_NEIGHBOR_RADIUS
+        for value in range(scale, 0, -1):
+            skill_score = value / scale
+            if len(best) >= k and best[0][0] > (1 - weight) * skill_score + weight:
+                # Даже стол в самой точке near не поднимет эту и меньшие суммы выше k-го
+                break
+            marker = bytes([value])
+            row = scores.find(marker)
+            while row != -1:
+                score = skill_score
+                if weight:
+                    # Без стола близость 0; формула та же, что в _proximity
+                    x = xs[row]
+                    proximity = 0.0 if math.isnan(x) else 1 / (1 + math.hypot(x - near[0], ys[row] - near[1]) / radius)
+                    score = (1 - weight) * skill_score + weight * proximity
+                entry = (score, -ids[row], row)
+                if len(best) < k:
+                    heapq.heappush(best, entry)
+                elif entry > best[0]:
+                    heapq.heapreplace(best, entry)
+                elif not weight:
+                    # Без близости дальше в этой сумме - те же оценки с большими id
+                    break
+                row = scores.find(marker, row + 1)
+        return [
+            self._python_match(row, score, skill_ids, needed, near)
+            for score, _, row in sorted(best, key=lambda entry: (-entry[0], -entry[1]))
+        ]
+
+    def _python_match(self, row, score, skill_ids, needed, near):
+        levels = [self.columns[skill_id][row] if skill_id in self.columns else 0 for skill_id in skill_ids]
+        skill_score = sum(min(level, need) * SCALE // need for level, need in zip(levels, needed)) / (SCALE * len(needed))
+        return Match(
+            self.ids[row], score, skill_score, self._distance(row, near),
+            all(level >= need for level, need in zip(levels, needed)), levels,
+        )
+
+    def _match_numpy(self, skill_ids, needed, k, positions, near, weight, require_all):
+        empty = len(self.columns)
+        taken = self.levels[[self.skill_rows.get(skill_id, empty) for skill_id in skill_ids]]
+        need = numpy.array(needed, dtype=numpy.int64)[:, None]
+        skill_score = (numpy.minimum(taken, need) * (SCALE // need)).sum(axis=0) / (SCALE * len(needed))
+        mask = skill_score > 0
+        meets_all = (taken >= need).all(axis=0)
+        if require_all:
+            mask &= meets_all
+        if positions:
+            mask &= numpy.isin(self.position_array, list(positions))
+        rows = numpy.flatnonzero(mask)
+        score = skill_score[rows]
+        distance = None
+        if near is not None:
+            distance = numpy.hypot(self.x_array[rows] - near[0], self.y_array[rows] - near[1])
+        if weight:
+            proximity = numpy.where(numpy.isnan(distance), 0.0, self._proximity(distance))
+            score = (1 - weight) * score + weight * proximity
+        if len(rows) > k:
+            # Все с оценкой не ниже k-й - чтобы при равенстве решал id, а не argpartition
+            kth = numpy.partition(score, len(score) - k)[len(score) - k]
+            selected = numpy.flatnonzero(score >= kth)
+        else:
+            selected = numpy.arange(len(rows))
+        order = selected[numpy.lexsort((self.id_array[rows[selected]], -score[selected]))][:k]
+        return [
+            Match(
+                int(self.id_array[rows[index]]),
+                float(score[index]),
+                float(skill_score[rows[index]]),
+                None if distance is None or numpy.isnan(distance[index]) else float(distance[index]),
+                bool(meets_all[rows[index]]),
+                [int(level) for level in taken[:, rows[index]]],
+            )
+            for index in order
+        ]
+
+_matrix = None
+_matrix_version = None
+_matrix_lock = threading.Lock()
+
+def get_skill_matrix():
+    """
+    Матрица строится тремя запросами при первом обращении и живёт, пока не изменится
+    версия в общем кэше (bump_skill_matrix: навыки, сотрудники, столы) - так её
+    перестраивают все процессы, а не только тот, где произошло изменение.
+    """
+    global _matrix, _matrix_version
+    version = skill_matrix_version()
+    with _matrix_lock:
+        if _matrix is None or _matrix_version != version:
+            _matrix = SkillMatrix.from_db()
+            _matrix_version = version
+        return _matrix
+
+def invalidate_skill_matrix():
+    """Сбрасывает матрицу этого процесса (тесты); изменения данных сбрасывают её через bump_skill_matrix"""
+    global _matrix
+    with _matrix_lock:
+        _matrix = None
@@ -0,0 +1,181 @@
+import gzip
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+from django.core.files import File
+from django.core.files.move import file_move_safe
+from django.contrib.staticfiles.storage import StaticFilesStorage
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# employees/3f/3fa1...e9.jpg: каталог upload_to, два первых символа хэша, хэш
+CONTENT_ADDRESSED_NAME = re.compile(r'(?:^|/)[0-9a-f]{2}/(?P<digest>[0-9a-f]{64})\.[0-9a-z]+$')
+
+def content_etag(name):
+    """
+    Сильный ETag для файла с хэшем содержимого в пути (исходник или его миниатюра),
+    для остальных файлов - None. Такой путь всегда указывает на одни и те же байты.
+    """
+    if CONTENT_ADDRESSED_NAME.search(name) is None:
+        return None
+    return hashlib.sha256(name.encode()).hexdigest()[:32]
+
+# Имена, которые FileSystemStorage.url не экранирует и не нормализует: URL = base_url + name
+PLAIN_NAME = re.compile(r'[0-9A-Za-z_-][0-9A-Za-z_.-]*(?:/[0-9A-Za-z_-][0-9A-Za-z_.-]*)*')
+
+def url_builder(storage, absolute=str):
+    """
+    Функция name -> absolute(storage.url(name)) для сериализации тысяч строк:
+    обычные имена в FileSystemStorage склеиваются с заранее посчитанным префиксом,
+    остальные идут через storage.url.
+    """
+    base_url = getattr(storage, 'base_url', None) if isinstance(storage, FileSystemStorage) else None
+    prefix = absolute(base_url) if base_url and base_url.endswith('/') else None
+
+    def url(name):
+        if prefix is not None and PLAIN_NAME.fullmatch(name):
+            return prefix + name
+        return absolute(storage.url(name))
+    return url
+
+def content_digest(content):
+    """SHA-256 содержимого, читается кусками без загрузки файла в память"""
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файлы хранятся под именем из хэша содержимого: <каталог>/<ab>/<sha256>.<ext>.
+    Одинаковые файлы записываются один раз; удаление выполняется, только когда
+    на файл не осталось ссылок (см. is_referenced), поэтому django_cleanup может
+    удалять файлы как обычно.
+    """
+
+    def save(self, name, content, max_length=None):
+        if content is None:
+            return super().save(name, content, max_length)
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        directory, filename = posixpath.split(name)
+        extension = posixpath.splitext(filename)[1].lower()
+        if extension == '.jpeg':
+            extension = '.jpg'
+        digest = content_digest(content)
+        name = posixpath.join(directory, digest[:2], f'{digest}{extension}')
+        if self.exists(name):
+            # Параллельный django_cleanup может удалить файл: is_referenced не видит
+            # ещё не зафиксированную запись с этим именем. После фиксации файл
+            # записывается заново, если его уже нет
+            transaction.on_commit(lambda: self._restore(name, content))
+            return name
+        return super().save(name, content, max_length)
+
+    def _restore(self, name, content):
+        if self.exists(name):
+            return
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        super().save(name, content)
+
+    def get_available_name(self, name, max_length=None):
+        # Имя определяется содержимым: тот же путь - тот же файл
+        return name
+
+    def _save(self, name, content):
+        """Запись во временный файл рядом и атомарный os.replace: читатели не видят недописанный файл"""
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+        try:
+            if hasattr(content, 'temporary_file_path'):
+                os.close(fd)
+                file_move_safe(content.temporary_file_path(), temp_path, allow_overwrite=True)
+            else:
+                with os.fdopen(fd, 'wb') as target:
+                    for chunk in content.chunks():
+                        target.write(chunk if isinstance(chunk, bytes) else chunk.encode())
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
+
+    def is_referenced(self, name):
+        """Ссылаются ли на файл записи в БД; переопределяется для конкретной модели"""
+        return False
+
+    def delete(self, name):
+        # django_cleanup удаляет файл после фиксации транзакции, когда удалённая или
+        # изменённая запись на него уже не ссылается - остаются только чужие ссылки
+        if name and self.is_referenced(name):
+            return
+        super().delete(name)
+
+class EmployeeImageStorage(ContentAddressedStorage):
+    """Хранилище галереи: файл удаляется, когда на него не ссылается ни одно EmployeeImage"""
+
+    def is_referenced(self, name):
+        from .models import EmployeeImage
+        return EmployeeImage.objects.filter(image=name).exists()
+
+_employee_image_storage = EmployeeImageStorage()
+
+def employee_image_storage():
+    """Callable для ImageField(storage=...), чтобы миграции не фиксировали MEDIA_ROOT"""
+    return _employee_image_storage
+
+
+# Текстовые ассеты, для которых при collectstatic готовятся .gz и .br
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.html', '.txt', '.json', '.map', '.xml')
+MIN_COMPRESS_SIZE = 256
+
+def compress_file(path):
+    """
+    Пишет рядом с файлом path.gz и path.br (если установлен brotli), только когда
+    сжатый вариант меньше. mtime=0 делает gzip детерминированным.
+    Возвращает список записанных путей.
+    """
+    with open(path, 'rb') as source:
+        data = source.read()
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data, quality=11)))
+    written = []
+    for suffix, compressed in variants:
+        if len(compressed) < len(data):
+            with open(path + suffix, 'wb') as target:
+                target.write(compressed)
+            written.append(path + suffix)
+        elif os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return written
+
+class CompressedStaticFilesStorage(StaticFilesStorage):
+    """Статика с предсжатыми вариантами: serving.serve_file отдаёт их без сжатия на лету"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            return
+        for name in paths:
+            if name.endswith(COMPRESSIBLE_EXTENSIONS) and self.size(name) >= MIN_COMPRESS_SIZE:
+                compress_file(self.path(name))
+                yield name, name, True
@@ -0,0 +1,45 @@
+from collections import defaultdict
+from django.utils import timezone
+from .models import Employee, EmployeeSkill, EmployeeImage
+from .caching import bump_employees
+from .search import index_employees
+
+def refresh_employee_summaries(employee_ids):
+    """
+    Пересчитывает сводку (skill_names, main_photo, image_count, main_photo_thumbnails) для сотрудников.
+    Два запроса на чтение и bulk_update, сколько бы сотрудников ни было.
+    """
+    employee_ids = set(employee_ids)
+    if not employee_ids:
+        return
+    skills = defaultdict(list)
+    for employee_id, name in (
+        EmployeeSkill.objects.filter(employee_id__in=employee_ids)
+        .order_by('id').values_list('employee_id', 'skill__name')
+    ):
+        skills[employee_id].append(name)
+    
+    images = defaultdict(list)
+    for employee_id, image, has_thumbnails in (
+        EmployeeImage.objects.filter(employee_id__in=employee_ids)
+        .order_by('uploaded_at', 'id').values_list('employee_id', 'image', 'has_thumbnails')
+    ):
+        images[employee_id].append((image, has_thumbnails))
+    
+    now = timezone.now()
+    employees = []
+    for employee_id in employee_ids:
+        main_photo, main_photo_thumbnails = images[employee_id][0] if images[employee_id] else ('', False)
+        employees.append(Employee(
+            pk=employee_id,
+            skill_names=skills[employee_id],
+            main_photo=main_photo,
+            main_photo_thumbnails=main_photo_thumbnails,
+            image_count=len(images[employee_id]),
+            updated_at=now,
+        ))
+    Employee.objects.bulk_update(employees, Employee.SUMMARY_FIELDS + ('updated_at',), batch_size=500)
+    # bulk_update не отправляет сигналы и не трогает auto_now - версию, карточки,
+    # страницы и поисковый индекс (навыки) обновляем явно
+    bump_employees(employee_ids)
+    index_employees(employee_ids)
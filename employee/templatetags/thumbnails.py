@@ -0,0 +1,13 @@
+from django import template
+
+register = template.Library()
+
+@register.filter
+def thumbnail(obj, size):
+    """URL JPEG-миниатюры: {{ employee|thumbnail:300 }} или {{ photo|thumbnail:100 }}"""
+    return obj.thumbnail_url(size, 'jpeg')
+
+@register.filter
+def thumbnail_webp(obj, size):
+    """URL WebP-миниатюры для <source type="image/webp">"""
+    return obj.thumbnail_url(size, 'webp')
@@ -1,8 +1,55 @@
-from django.test import TestCase, Client
+import csv
+import gzip
+import json
+import math
+import os
+import random
+import shutil
+import tempfile
+import threading
+from contextlib import nullcontext
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import skipIf
+from unittest.mock import patch
+from django.test import TestCase, TransactionTestCase, Client, RequestFactory, override_settings
+from django.db import connection, close_old_connections, transaction
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command, CommandError
 from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
-from django.contrib.auth.models import Group
-from .models import Employee, Desk, Reservation, Skill
+from django.contrib.auth.models import Group, Permission, AnonymousUser
+from django.contrib.contenttypes.models import ContentType
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import ListSerializer
+from PIL import Image
+from .models import Employee, Desk, Reservation, Skill, EmployeeSkill, EmployeeImage, HeadcountStat, SkillLevelStat
+from .pagination import KeysetPaginator, KeysetPagination, InvalidCursor, encode_cursor
+from .views import EmployeeViewSet, media_file
+from .spatial import DeskSpatialIndex, get_desk_index, invalidate_desk_index
+from .validators import NeighborDeskValidator
+from .booking import save_reservation, BookingConflict
+from .availability import availability_calendar, OCCUPANCY_KEY
+from .summary import refresh_employee_summaries
+from .uploads import inspect_image
+from .storage import CONTENT_ADDRESSED_NAME
+from .caching import cache_stats, reset_cache_stats, bump_desk_index, bump_search_index, occupancy_versions
+from .serializers import EmployeeListSerializer
+from .exports import export_stream, openpyxl
+from .imports import import_employees, load_dataset
+from .search import search_employees, invalidate_local_index, edit_distance
+from .filters import EmployeeFilter
+from .analytics import rebuild_analytics
+from .staffing import SkillMatrix, get_skill_matrix, invalidate_skill_matrix, numpy
+from .permissions import IsViewer, IsKeeper, IsAdmin, KEEPER_GROUP
+from .thumbnails import generate_thumbnails, process_image, thumbnail_name, thumbnail_names
+from .seating import find_seating_conflicts, apply_seating_plan, optimize_seating, apply_seating_solution, SeatingConflictError
 
 User = get_user_model()
 
@@ -351,4 +398,1959 @@ class EdgeCaseTests(TestCase):
             developer.full_clean()
             tester.full_clean()
         except ValidationError:
-            self.fail("ValidationError raised for far apart desks")
\ No newline at end of file
+            self.fail("ValidationError raised for far apart desks")
+
+# 10. Тесты количества запросов API
+class EmployeeAPIQueryCountTest(TestCase):
+    """Число запросов к БД не должно зависеть от размера страницы"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="viewer", password="testpass123")
+        skills = Skill.objects.bulk_create([Skill(name=f"Навык{i}") for i in range(5)])
+        employees = Employee.objects.bulk_create([
+            Employee(first_name=f"Имя{i}", last_name="Фамилия", position="manager", desk_number=i)
+            for i in range(1000)
+        ])
+        EmployeeSkill.objects.bulk_create([
+            EmployeeSkill(employee=employee, skill=skill, level=2)
+            for employee in employees for skill in skills[:3]
+        ])
+        EmployeeImage.objects.bulk_create([
+            EmployeeImage(employee=employee, image=f"employees/{employee.pk}.jpg")
+            for employee in employees
+        ])
+        refresh_employee_summaries([employee.pk for employee in employees])
+        cls.employee = employees[0]
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def test_list_query_count_by_page_size(self):
+        """Список: версия для ETag + COUNT + сотрудники (навыки и фото - из сводки) при любом размере страницы"""
+        for page_size in [10, 100, 1000]:
+            with self.subTest(page_size=page_size):
+                with self.assertNumQueries(3):
+                    response = self.client.get('/api/employees/', {'page_size': page_size})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), page_size)
+                self.assertEqual(len(response.data['results'][0]['skills']), 3)
+    
+    def test_detail_query_count(self):
+        """Карточка: версия для ETag + сотрудник + навыки с уровнями + изображения"""
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/api/employees/{self.employee.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['skills_details']), 3)
+        self.assertEqual(len(response.data['images']), 1)
+    
+    def test_reservation_list_query_count(self):
+        """Бронирования: стол и пользователь подтягиваются одним JOIN"""
+        desks = Desk.objects.bulk_create([Desk(number=f"R{i}") for i in range(50)])
+        Reservation.objects.bulk_create([
+            Reservation(user=self.user, desk=desk, date="2024-01-15") for desk in desks
+        ])
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/reservations/', {'page_size': 50})
+        self.assertEqual(len(response.data['results']), 50)
+
+
+# 11. Тесты keyset-пагинации
+class KeysetPaginationTest(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="viewer", password="testpass123")
+        # По 5 сотрудников на дату, чтобы проверить разрешение равенства hire_date через id
+        Employee.objects.bulk_create([
+            Employee(first_name=f"Имя{i}", position="manager", desk_number=i,
+                     hire_date=date(2024, 1, 1) + timedelta(days=i // 5))
+            for i in range(47)
+        ])
+        cls.expected = list(Employee.objects.order_by('-hire_date', '-id').values_list('id', flat=True))
+    
+    def test_walk_forward_and_back(self):
+        """Проход вперёд и назад по курсорам даёт все строки ровно один раз"""
+        paginator = KeysetPaginator(Employee.objects.all(), 10)
+        pages, cursor = [], None
+        while True:
+            page = paginator.get_page(cursor)
+            pages.append([e.pk for e in page])
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertFalse(paginator.get_page().has_previous())
+        
+        back = [[e.pk for e in paginator.get_page(page.previous_cursor)]]
+        self.assertEqual(back[0], pages[-2])
+    
+    def test_deep_page_costs_same_as_first(self):
+        """Страница N - один запрос без COUNT(*) и OFFSET"""
+        paginator = KeysetPaginator(Employee.objects.all(), 10)
+        page = paginator.get_page()
+        for _ in range(3):
+            with self.assertNumQueries(1) as context:
+                page = paginator.get_page(page.next_cursor)
+        sql = context.captured_queries[0]['sql']
+        self.assertNotIn('COUNT', sql)
+        self.assertNotIn('OFFSET', sql)
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('USING INDEX employee_hire_date_id_idx', plan)
+    
+    def test_invalid_cursor(self):
+        paginator = KeysetPaginator(Employee.objects.all(), 10)
+        for cursor in ['мусор', encode_cursor(['не дата', 1]), encode_cursor([1])]:
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(InvalidCursor):
+                    paginator.get_page(cursor)
+    
+    def test_api_cursor_links(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with patch.object(EmployeeViewSet, 'pagination_class', KeysetPagination):
+            response = client.get('/api/employees/')
+            self.assertNotIn('count', response.data)
+            self.assertIsNone(response.data['previous'])
+            self.assertEqual([e['id'] for e in response.data['results']], self.expected[:10])
+            
+            response = client.get(response.data['next'])
+            self.assertEqual([e['id'] for e in response.data['results']], self.expected[10:20])
+            self.assertIsNotNone(response.data['previous'])
+            
+            self.assertEqual(client.get('/api/employees/', {'cursor': 'мусор'}).status_code, 404)
+    
+    @override_settings(KEYSET_PAGINATION=True)
+    def test_html_list_uses_cursor_links(self):
+        response = self.client.get('/employees/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '?cursor=')
+        self.assertNotContains(response, 'Страница')
+        
+        response = self.client.get('/employees/', {'cursor': response.context['page_obj'].next_cursor})
+        self.assertEqual([e.pk for e in response.context['page_obj']], self.expected[10:20])
+
+
+# 12. Тесты движка конфликтов рассадки
+class SeatingConflictEngineTest(TestCase):
+    
+    def setUp(self):
+        self.developer = Employee.objects.create(first_name="Разработчик", position="backend", desk_number=1)
+        self.tester = Employee.objects.create(first_name="Тестировщик", position="tester", desk_number=10)
+        self.manager = Employee.objects.create(first_name="Менеджер", position="manager", desk_number=20)
+    
+    def test_all_conflicts_in_one_query(self):
+        """Все нарушения плана возвращаются сразу, за один запрос"""
+        newcomers = [Employee(first_name=f"Тестировщик{i}", position="tester") for i in range(3)]
+        plan = [(newcomers[0], 2), (newcomers[1], 0), (newcomers[2], 50)]
+        with self.assertNumQueries(1):
+            conflicts = find_seating_conflicts(plan)
+        self.assertEqual(
+            sorted((c.employee.first_name, c.neighbor.first_name) for c in conflicts),
+            [("Тестировщик0", "Разработчик"), ("Тестировщик1", "Разработчик")],
+        )
+    
+    def test_conflicts_inside_plan(self):
+        """Сотрудники плана проверяются и друг против друга"""
+        plan = [(self.tester, 30), (self.manager, 31), (Employee(position="frontend"), 29)]
+        conflicts = find_seating_conflicts(plan)
+        self.assertEqual(len(conflicts), 1)
+        self.assertEqual({conflicts[0].desk_number, conflicts[0].neighbor_desk_number}, {29, 30})
+    
+    def test_swap_is_checked_against_final_state(self):
+        """Обмен столами проверяется по итоговому состоянию, а не по промежуточному"""
+        Employee.objects.create(first_name="Тестировщик2", position="tester", desk_number=11)
+        plan = [(self.developer, 10), (self.tester, 1)]
+        self.assertEqual(len(find_seating_conflicts(plan)), 1)
+        
+        plan = [(self.developer, 40), (self.tester, 2)]
+        self.assertEqual(find_seating_conflicts(plan), [])
+        apply_seating_plan(plan)
+        self.developer.refresh_from_db()
+        self.tester.refresh_from_db()
+        self.assertEqual((self.developer.desk_number, self.tester.desk_number), (40, 2))
+    
+    def test_apply_rejects_whole_plan(self):
+        plan = [(self.manager, 2), (Employee.objects.get(pk=self.tester.pk), 2)]
+        with self.assertRaises(ValidationError) as context:
+            apply_seating_plan(plan)
+        self.assertEqual(len(context.exception.messages), 1)
+        self.tester.refresh_from_db()
+        self.assertEqual(self.tester.desk_number, 10)
+    
+    def test_save_uses_engine(self):
+        """save() делает один запрос за соседями и сообщает о нарушении"""
+        tester = Employee(first_name="Новый", position="tester", desk_number=2)
+        with self.assertNumQueries(1):
+            with self.assertRaises(ValidationError):
+                tester.full_clean()
+
+
+# 13. Тесты пакетной пересадки
+class BulkMoveAPITest(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.keeper = User.objects.create_user(username="keeper", password="testpass123", is_staff=True)
+        cls.viewer = User.objects.create_user(username="viewer", password="testpass123")
+        Desk.objects.bulk_create([Desk(number=str(n)) for n in range(1, 401)])
+        # Разработчики за нечётными столами 1..199, тестировщики за столами 301..399
+        Employee.objects.bulk_create(
+            [Employee(first_name=f"Разработчик{n}", position="backend", desk_number=n) for n in range(1, 200, 2)]
+            + [Employee(first_name=f"Тестировщик{n}", position="tester", desk_number=n) for n in range(301, 400, 2)]
+        )
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.keeper)
+    
+    def test_swap_developers_and_testers(self):
+        """Обмен группами: промежуточные состояния нарушают правило, итоговое - нет"""
+        developers = list(Employee.objects.filter(position="backend", desk_number__gt=100))
+        testers = list(Employee.objects.filter(position="tester"))
+        moves = [{'employee': e.pk, 'desk_number': e.desk_number + 200} for e in developers]
+        moves += [{'employee': e.pk, 'desk_number': e.desk_number - 200} for e in testers]
+        
+        response = self.client.post('/api/employees/bulk-move/', {'moves': moves}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['moved'], 100)
+        self.assertEqual(Employee.objects.get(pk=testers[0].pk).desk_number, 101)
+    
+    def test_conflicts_reported_and_nothing_applied(self):
+        testers = list(Employee.objects.filter(position="tester")[:3])
+        moves = [{'employee': e.pk, 'desk_number': 2 + 2 * i} for i, e in enumerate(testers)]
+        response = self.client.post('/api/employees/bulk-move/', {'moves': moves}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data['conflicts']), 6)
+        self.assertFalse(Employee.objects.filter(position="tester", desk_number__lt=300).exists())
+    
+    def test_query_count_does_not_grow_with_moves(self):
+        """Сотрудники, столы, соседи и UPDATE - без запросов на каждую строку"""
+        employees = list(Employee.objects.filter(position="backend")[:50])
+        moves = [{'employee': e.pk, 'desk_number': e.desk_number + 1} for e in employees]
+        # сотрудники + столы + соседи + savepoint/UPDATE/release
+        with self.assertNumQueries(6):
+            response = self.client.post('/api/employees/bulk-move/', {'moves': moves}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+    
+    def test_unknown_desk_and_employee(self):
+        response = self.client.post('/api/employees/bulk-move/', {'moves': [
+            {'employee': 999999, 'desk_number': 1},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        employee = Employee.objects.first()
+        response = self.client.post('/api/employees/bulk-move/', {'moves': [
+            {'employee': employee.pk, 'desk_number': 5000},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_viewer_cannot_bulk_move(self):
+        self.client.force_authenticate(self.viewer)
+        response = self.client.post('/api/employees/bulk-move/', {'moves': []}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+# 14. Тесты оптимизатора рассадки
+class SeatingOptimizerTest(TestCase):
+    
+    def setUp(self):
+        Desk.objects.bulk_create([Desk(number=str(n)) for n in range(1, 11)] + [Desk(number="11", is_available=False)])
+        Employee.objects.bulk_create([
+            Employee(first_name="Разработчик", position="backend", desk_number=1),
+            Employee(first_name="Тестировщик", position="tester", desk_number=2),
+            Employee(first_name="Менеджер", position="manager", desk_number=5),
+            Employee(first_name="Дизайнер", position="designer", desk_number=11),
+        ])
+    
+    def test_resolves_conflicts_with_minimal_moves(self):
+        solution = optimize_seating()
+        self.assertFalse(solution.unplaced)
+        # Конфликтная пара - одна пересадка, плюс сотрудник за недоступным столом
+        self.assertEqual(len(solution.moves), 2)
+        apply_seating_solution(solution)
+        plan = [(e, e.desk_number) for e in Employee.objects.all()]
+        self.assertEqual(find_seating_conflicts(plan), [])
+        self.assertFalse(Employee.objects.filter(desk_number=11).exists())
+    
+    def test_valid_plan_is_left_alone(self):
+        Employee.objects.filter(position="tester").update(desk_number=3)
+        Employee.objects.filter(position="designer").update(desk_number=10)
+        self.assertEqual(optimize_seating().moves, [])
+    
+    def test_reports_unplaced_when_no_desk_fits(self):
+        Desk.objects.filter(number__in=[str(n) for n in range(3, 11)]).update(is_available=False)
+        solution = optimize_seating()
+        self.assertEqual(len(solution.unplaced), 2)
+    
+    def test_scales_to_large_floor(self):
+        Desk.objects.bulk_create([Desk(number=str(n)) for n in range(12, 20001)])
+        positions = ['backend', 'tester', 'manager']
+        Employee.objects.bulk_create([
+            Employee(position=positions[n % 3], desk_number=n) for n in range(12, 15000)
+        ])
+        solution = optimize_seating(time_budget=10)
+        self.assertFalse(solution.timed_out)
+        moved = {move.employee: move.to_desk for move in solution.moves}
+        plan = [(e, moved.get(e.pk, e.desk_number)) for e in Employee.objects.exclude(pk__in=solution.unplaced)]
+        self.assertEqual(find_seating_conflicts(plan), [])
+    
+    def test_random_floors_apply_cleanly(self):
+        # Когда все рассажены, план применяется без SeatingConflictError
+        positions = ["backend", "frontend", "tester", "manager", "designer"]
+        for mode, seed in [(mode, seed) for mode in ("number", "geometry") for seed in range(40)]:
+            with self.subTest(mode=mode, seed=seed), override_settings(DESK_ADJACENCY=mode), transaction.atomic():
+                rng = random.Random(seed)
+                Employee.objects.all().delete()
+                Desk.objects.all().delete()
+                count = rng.randint(5, 50)
+                Desk.objects.bulk_create([
+                    Desk(number=str(n), is_available=rng.random() > 0.15,
+                         coordinates_x=rng.randint(0, 8), coordinates_y=rng.randint(0, 8))
+                    for n in range(1, count + 1)
+                ])
+                invalidate_desk_index()
+                Employee.objects.bulk_create([
+                    Employee(position=rng.choice(positions), desk_number=rng.randint(1, count + 5))
+                    for _ in range(rng.randint(1, count))
+                ])
+                reseat = rng.sample(list(Employee.objects.values_list("pk", flat=True)), 1)
+                solution = optimize_seating(reseat)
+                if not solution.unplaced:
+                    apply_seating_solution(solution)
+                    plan = [(e, e.desk_number) for e in Employee.objects.all()]
+                    self.assertEqual(find_seating_conflicts(plan), [])
+                transaction.set_rollback(True)
+        invalidate_desk_index()
+    
+    def test_dry_run_api_and_command(self):
+        keeper = User.objects.create_user(username="keeper", password="testpass123", is_staff=True)
+        client = APIClient()
+        client.force_authenticate(keeper)
+        response = client.post('/api/employees/optimize-seating/', {}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['moves']), 2)
+        self.assertEqual(set(response.data['moves'][0]), {'employee', 'from_desk', 'to_desk'})
+        self.assertTrue(Employee.objects.filter(desk_number=11).exists())
+        
+        out = StringIO()
+        call_command('optimize_seating', stdout=out)
+        self.assertTrue(Employee.objects.filter(desk_number=11).exists())
+        call_command('optimize_seating', '--apply', stdout=out)
+        self.assertFalse(Employee.objects.filter(desk_number=11).exists())
+    
+    def test_command_refuses_to_apply_with_unplaced(self):
+        Desk.objects.filter(number__in=[str(n) for n in range(3, 11)]).update(is_available=False)
+        desks = sorted(Employee.objects.values_list("desk_number", flat=True))
+        with self.assertRaisesMessage(CommandError, "--allow-unplaced"):
+            call_command("optimize_seating", "--apply", stdout=StringIO())
+        self.assertEqual(sorted(Employee.objects.values_list("desk_number", flat=True)), desks)
+        
+        conflict = SimpleNamespace(message="Стол 1 соседствует со столом 2")
+        with patch(
+            "employee.management.commands.optimize_seating.apply_seating_solution",
+            side_effect=SeatingConflictError([conflict]),
+        ), self.assertRaisesMessage(CommandError, "Стол 1 соседствует со столом 2"):
+            call_command("optimize_seating", "--apply", "--allow-unplaced", stdout=StringIO())
+
+
+# 15. Тесты пространственного индекса столов
+class DeskSpatialIndexTest(TestCase):
+    
+    def setUp(self):
+        invalidate_desk_index()
+        self.addCleanup(invalidate_desk_index)
+    
+    def test_within_and_nearest_match_brute_force(self):
+        rng = random.Random(7)
+        desks = [(i, str(i), rng.randint(-500, 500), rng.randint(-500, 500)) for i in range(3000)]
+        index = DeskSpatialIndex(desks, cell_size=10)
+        
+        def distance(desk, x, y):
+            return (desk[2] - x) ** 2 + (desk[3] - y) ** 2
+        
+        for x, y in [(0, 0), (480, -480), (-900, 900), (13, 37)]:
+            with self.subTest(point=(x, y)):
+                expected = {d[0] for d in desks if distance(d, x, y) <= 40 ** 2}
+                self.assertEqual({d[0] for d in index.within(x, y, 40)}, expected)
+                
+                expected = sorted(desks, key=lambda d: (distance(d, x, y), d[0]))[:5]
+                self.assertEqual(index.nearest(x, y, 5), expected)
+    
+    def test_lookups_visit_only_nearby_cells(self):
+        # Время замеряет benchmark_spatial; здесь - что поиск не обходит всю сетку
+        rng = random.Random(1)
+        desks = [(i, str(i), rng.randint(0, 2000), rng.randint(0, 2000)) for i in range(20000)]
+        index = DeskSpatialIndex(desks, cell_size=10)
+        visited = []
+        
+        class Cells(dict):
+            def get(self, key, default=None):
+                visited.append(key)
+                return super().get(key, default)
+        
+        index.cells = Cells(index.cells)
+        
+        def distance(desk):
+            return (desk[2] - 1000) ** 2 + (desk[3] - 1000) ** 2
+        
+        expected = sorted((d for d in desks if distance(d) <= 10 ** 2), key=lambda d: (distance(d), d[0]))
+        self.assertEqual(index.within(1000, 1000, 10), expected)
+        self.assertLessEqual(len(visited), 9)
+        
+        visited.clear()
+        self.assertEqual(index.nearest(1000, 1000, 5), sorted(desks, key=lambda d: (distance(d), d[0]))[:5])
+        self.assertLess(len(visited), 100)
+    
+    def test_index_invalidated_on_desk_save_and_delete(self):
+        desk = Desk.objects.create(number="1", coordinates_x=0, coordinates_y=0)
+        self.assertEqual(len(get_desk_index()), 1)
+        other = Desk.objects.create(number="2", coordinates_x=1, coordinates_y=0)
+        self.assertEqual([d[1] for d in get_desk_index().neighbors("1", 1.5)], ["2"])
+        other.coordinates_x = 10
+        other.save()
+        self.assertEqual(get_desk_index().neighbors("1", 1.5), [])
+        desk.delete()
+        self.assertEqual(len(get_desk_index()), 1)
+    
+    def test_index_rebuilt_when_shared_version_changes(self):
+        # Другой процесс изменил стол: локальный индекс не сброшен, но версия в кэше новая
+        self.assertEqual(len(get_desk_index()), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            Desk.objects.bulk_create([Desk(number="1", coordinates_x=0, coordinates_y=0)])
+            bump_desk_index()
+        self.assertEqual(len(get_desk_index()), 1)
+    
+    @override_settings(DESK_ADJACENCY='geometry')
+    def test_geometric_neighbors_in_validators(self):
+        # Столы 1 и 7 стоят рядом, хотя номера не соседние; стол 2 - далеко
+        Desk.objects.create(number="1", coordinates_x=0, coordinates_y=0)
+        Desk.objects.create(number="7", coordinates_x=0, coordinates_y=1)
+        far = Desk.objects.create(number="2", coordinates_x=50, coordinates_y=50)
+        Employee.objects.create(first_name="Разработчик", position="backend", desk_number=1)
+        
+        Employee.objects.create(first_name="Тестировщик", position="tester", desk_number=2)
+        with self.assertRaises(ValidationError):
+            Employee.objects.create(first_name="Тестировщик", position="tester", desk_number=7)
+        
+        user = User.objects.create_user(username="booker", password="testpass123")
+        Reservation.objects.create(user=user, desk=Desk.objects.get(number="1"), date="2024-01-15")
+        NeighborDeskValidator().validate(Reservation(user=user, desk=far, date="2024-01-15"))
+        with self.assertRaises(ValidationError):
+            NeighborDeskValidator().validate(
+                Reservation(user=user, desk=Desk.objects.get(number="7"), date="2024-01-15")
+            )
+
+
+# 16. Тесты проверки соседних бронирований
+class NeighborDeskValidatorTest(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="booker", password="testpass123")
+        cls.desks = {str(n): Desk.objects.create(number=str(n)) for n in range(1, 21)}
+        cls.day = date(2024, 1, 15)
+        Reservation.objects.create(user=cls.user, desk=cls.desks["5"], date=cls.day)
+    
+    def reservation(self, number, day=None):
+        return Reservation(user=self.user, desk=self.desks[number], date=day or self.day)
+    
+    def test_single_reservation_one_query(self):
+        validator = NeighborDeskValidator()
+        with self.assertNumQueries(1):
+            with self.assertRaises(ValidationError) as context:
+                validator.validate(self.reservation("6"))
+        self.assertIn('соседний стол 5 уже забронирован', str(context.exception))
+        with self.assertNumQueries(1):
+            validator.validate(self.reservation("10"))
+        with self.assertNumQueries(1):
+            validator.validate(self.reservation("6", self.day + timedelta(days=1)))
+    
+    def test_non_numeric_desk_skipped(self):
+        desk = Desk.objects.create(number="A1")
+        with self.assertNumQueries(0):
+            NeighborDeskValidator().validate(Reservation(user=self.user, desk=desk, date=self.day))
+    
+    def test_batch_constant_queries(self):
+        """Пачка на много дат - один запрос, включая конфликты внутри пачки"""
+        batch = [self.reservation(number, self.day + timedelta(days=offset))
+                 for offset in range(30) for number in ("10", "15")]
+        batch += [self.reservation("4"), self.reservation("12"), self.reservation("13")]
+        with self.assertNumQueries(1):
+            conflicts = NeighborDeskValidator().find_conflicts(batch)
+        self.assertEqual(
+            sorted((c.reservation.desk.number, c.neighbor_desk_number) for c in conflicts),
+            [("12", "13"), ("13", "12"), ("4", "5")],
+        )
+        with self.assertRaises(ValidationError) as context:
+            NeighborDeskValidator().validate_many(batch)
+        self.assertEqual(len(context.exception.messages), 3)
+    
+    def test_query_uses_index(self):
+        with CaptureQueriesContext(connection) as context:
+            NeighborDeskValidator().validate(self.reservation("10"))
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + context.captured_queries[0]['sql'])
+            plan = [str(row[-1]) for row in cursor.fetchall()]
+        self.assertFalse([step for step in plan if step.startswith('SCAN')], plan)
+
+
+# 17. Тесты календаря свободных столов
+class DeskAvailabilityTest(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="booker", password="testpass123")
+        cls.desks = Desk.objects.bulk_create([Desk(number=str(n)) for n in range(1, 2001)])
+        cls.start = date(2024, 3, 1)
+        Reservation.objects.bulk_create([
+            Reservation(user=cls.user, desk=desk, date=cls.start + timedelta(days=offset))
+            for offset in range(0, 90, 3) for desk in cls.desks[offset:offset + 500:2]
+        ])
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def get(self, start, end):
+        return self.client.get('/api/desks/availability/', {'from': start.isoformat(), 'to': end.isoformat()})
+    
+    def test_calendar_built_once_then_served_from_cache(self):
+        end = self.start + timedelta(days=89)
+        with self.assertNumQueries(2):
+            response = self.get(self.start, end)
+        self.assertEqual(response.status_code, 200)
+        days = response.data['days']
+        self.assertEqual(len(days), 90)
+        self.assertEqual(days[0]['free'], 1750)
+        self.assertEqual(days[1]['free'], 2000)
+        self.assertEqual(days[3]['occupied'][0], self.desks[3].pk)
+        
+        with self.assertNumQueries(0):
+            self.get(self.start, end)
+    
+    def test_dates_reset_after_commit(self):
+        self.get(self.start, self.start)
+        desk = self.desks[-1]
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation = Reservation.objects.create(user=self.user, desk=desk, date=self.start)
+        with self.assertNumQueries(1):
+            self.assertIn(desk.pk, self.get(self.start, self.start).data['days'][0]['occupied'])
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation.delete()
+        self.assertNotIn(desk.pk, self.get(self.start, self.start).data['days'][0]['occupied'])
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            desk.is_available = False
+            desk.save()
+        self.assertEqual(self.get(self.start, self.start).data['desks'][-1], self.desks[-2].pk)
+    
+    def test_mask_computed_before_commit_not_served(self):
+        desk = self.desks[-1]
+        with self.captureOnCommitCallbacks(execute=True):
+            Reservation.objects.create(user=self.user, desk=desk, date=self.start)
+            # Параллельный читатель прочитал версию до фиксации брони, а маску без неё записал после
+            version = occupancy_versions([self.start])[self.start]
+        cache.set(OCCUPANCY_KEY.format(day=self.start, version=version), 0)
+        self.assertIn(desk.pk, self.get(self.start, self.start).data['days'][0]['occupied'])
+    
+    def test_rollback_keeps_cached_dates(self):
+        self.get(self.start, self.start)
+        desk = self.desks[-1]
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    Reservation.objects.create(user=self.user, desk=desk, date=self.start)
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(callbacks, [])
+        with self.assertNumQueries(0):
+            self.assertNotIn(desk.pk, self.get(self.start, self.start).data['days'][0]['occupied'])
+    
+    def test_invalid_window(self):
+        self.assertEqual(self.get(self.start, self.start - timedelta(days=1)).status_code, 400)
+        self.assertEqual(self.get(self.start, self.start + timedelta(days=400)).status_code, 400)
+        response = self.client.get('/api/desks/availability/', {'from': 'вчера'})
+        self.assertEqual(response.status_code, 400)
+
+
+# 18. Тесты конкурентного бронирования
+class ConcurrentBookingTest(TransactionTestCase):
+    
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f"user{i}") for i in range(8)]
+        self.desks = [Desk.objects.create(number=str(n)) for n in range(1, 21)]
+        self.day = date(2024, 5, 20)
+    
+    def test_parallel_bookings_never_conflict(self):
+        """Потоки бронируют соседние столы на одну дату: ни одна пара соседей не проходит"""
+        barrier = threading.Barrier(len(self.users))
+        outcomes = []
+        
+        def worker(user, desks):
+            barrier.wait()
+            for desk in desks:
+                try:
+                    save_reservation(Reservation(user=user, desk=desk, date=self.day))
+                    outcomes.append('ok')
+                except BookingConflict:
+                    outcomes.append('conflict')
+                finally:
+                    close_old_connections()
+            connection.close()
+        
+        threads = [
+            threading.Thread(target=worker, args=(user, random.Random(i).sample(self.desks, len(self.desks))))
+            for i, user in enumerate(self.users)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(len(outcomes), len(self.users) * len(self.desks))
+        booked = sorted(int(n) for n in Reservation.objects.filter(date=self.day).values_list('desk__number', flat=True))
+        self.assertEqual(len(booked), outcomes.count('ok'))
+        self.assertEqual(len(booked), len(set(booked)))
+        self.assertFalse([n for n in booked if n + 1 in booked])
+    
+    def test_database_serializes_bookings_without_process_lock(self):
+        """
+        Как разные процессы: блокировка по дате отключена, потоки одновременно
+        бронируют один стол и соседний - побеждает одна бронь
+        """
+        barrier = threading.Barrier(len(self.users))
+        outcomes = []
+        desks = [self.desks[9], self.desks[10]]
+        
+        def worker(index, user):
+            barrier.wait()
+            try:
+                save_reservation(Reservation(user=user, desk=desks[index % len(desks)], date=self.day))
+                outcomes.append('ok')
+            except BookingConflict:
+                outcomes.append('conflict')
+            finally:
+                connection.close()
+        
+        with patch("employee.booking._date_lock", lambda day: nullcontext()):
+            threads = [threading.Thread(target=worker, args=(i, user)) for i, user in enumerate(self.users)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        
+        self.assertEqual(sorted(outcomes), ['conflict'] * (len(self.users) - 1) + ['ok'])
+        self.assertEqual(Reservation.objects.filter(date=self.day).count(), 1)
+    
+    def test_api_returns_409(self):
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        response = client.post('/api/reservations/', {'desk': self.desks[4].pk, 'date': '2024-05-20'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        for desk in (self.desks[4], self.desks[5]):
+            response = client.post('/api/reservations/', {'desk': desk.pk, 'date': '2024-05-20'}, format='json')
+            self.assertEqual(response.status_code, 409)
+        response = client.post('/api/reservations/', {'desk': self.desks[5].pk, 'date': '2024-05-21'}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+
+# 19. Тесты пакетных и повторяющихся бронирований
+class BulkReservationAPITest(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="booker", password="testpass123")
+        cls.desks = {str(n): Desk.objects.create(number=str(n)) for n in range(1, 11)}
+        # Вторник 2024-01-02 - стол 5 уже занят
+        Reservation.objects.create(user=cls.user, desk=cls.desks["5"], date=date(2024, 1, 2))
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def post(self, data):
+        return self.client.post('/api/reservations/bulk/', data, format='json')
+    
+    def test_every_tuesday_for_a_quarter(self):
+        """Правило: вторники квартала для двух столов - постоянное число запросов"""
+        data = {
+            'desks': [self.desks["4"].pk, self.desks["8"].pk], 'weekdays': [1],
+            'start': '2024-01-01', 'end': '2024-03-31',
+        }
+        # столы + savepoint + занятость + INSERT + release
+        with self.assertNumQueries(5):
+            response = self.post(data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'] + response.data['conflicts'], 26)
+        self.assertEqual(response.data['conflicts'], 1)
+        conflict = next(r for r in response.data['results'] if r['status'] == 'conflict')
+        self.assertEqual((conflict['desk'], str(conflict['date'])), (self.desks["4"].pk, '2024-01-02'))
+        self.assertIsNotNone(response.data['results'][-1]['id'])
+        self.assertEqual(Reservation.objects.count(), 26)
+    
+    def test_explicit_items_conflict_inside_batch(self):
+        response = self.post({'items': [
+            {'desk': self.desks["1"].pk, 'date': '2024-02-01'},
+            {'desk': self.desks["2"].pk, 'date': '2024-02-01'},
+            {'desk': self.desks["1"].pk, 'date': '2024-02-01'},
+            {'desk': self.desks["2"].pk, 'date': '2024-02-02'},
+        ]})
+        self.assertEqual([r['status'] for r in response.data['results']], ['created', 'conflict', 'conflict', 'created'])
+    
+    def test_atomic_batch_rejected_entirely(self):
+        response = self.post({'atomic': True, 'items': [
+            {'desk': self.desks["8"].pk, 'date': '2024-01-02'},
+            {'desk': self.desks["6"].pk, 'date': '2024-01-02'},
+        ]})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Reservation.objects.count(), 1)
+    
+    def test_invalid_requests(self):
+        self.assertEqual(self.post({}).status_code, 400)
+        self.assertEqual(self.post({'desks': [self.desks["1"].pk], 'weekdays': [1]}).status_code, 400)
+        self.assertEqual(self.post({'items': [{'desk': 999999, 'date': '2024-02-01'}]}).status_code, 400)
+    
+    def test_availability_cache_invalidated(self):
+        cache.clear()
+        day = date(2024, 2, 1)
+        self.assertEqual(availability_calendar(day, day)['days'][0]['occupied'], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post({'items': [{'desk': self.desks["1"].pk, 'date': '2024-02-01'}]})
+        self.assertEqual(availability_calendar(day, day)['days'][0]['occupied'], [self.desks["1"].pk])
+
+# 20. Тесты сводки навыков и фото сотрудника
+class EmployeeSummaryTest(TestCase):
+    
+    def setUp(self):
+        cache.clear()
+        self.employee = Employee.objects.create(first_name="Иван", last_name="Петров", position="manager", desk_number=1)
+        self.python = Skill.objects.create(name="Python")
+        self.django = Skill.objects.create(name="Django")
+    
+    def test_skills_kept_in_sync(self):
+        EmployeeSkill.objects.create(employee=self.employee, skill=self.python, level=3)
+        link = EmployeeSkill.objects.create(employee=self.employee, skill=self.django, level=2)
+        self.employee.refresh_from_db()
+        self.assertEqual(self.employee.skill_names, ["Python", "Django"])
+        
+        self.django.name = "Django REST"
+        self.django.save()
+        self.employee.refresh_from_db()
+        self.assertEqual(self.employee.skill_names, ["Python", "Django REST"])
+        
+        link.delete()
+        self.employee.refresh_from_db()
+        self.assertEqual(self.employee.skill_names, ["Python"])
+    
+    def test_photos_kept_in_sync(self):
+        first = EmployeeImage.objects.create(employee=self.employee, image="employees/first.jpg")
+        EmployeeImage.objects.create(employee=self.employee, image="employees/second.jpg")
+        self.employee.refresh_from_db()
+        self.assertEqual((self.employee.main_photo, self.employee.image_count), ("employees/first.jpg", 2))
+        self.assertTrue(self.employee.main_photo_url.endswith("employees/first.jpg"))
+        
+        first.delete()
+        self.employee.refresh_from_db()
+        self.assertEqual((self.employee.main_photo, self.employee.image_count), ("employees/second.jpg", 1))
+    
+    def test_stale_instance_save_keeps_summary(self):
+        """Сохранение устаревшего экземпляра не затирает сводку"""
+        stale = Employee.objects.get(pk=self.employee.pk)
+        EmployeeSkill.objects.create(employee=self.employee, skill=self.python, level=3)
+        stale.first_name = "Пётр"
+        stale.save()
+        self.employee.refresh_from_db()
+        self.assertEqual((self.employee.first_name, self.employee.skill_names), ("Пётр", ["Python"]))
+    
+    def test_list_page_without_related_queries(self):
+        """HTML-список: COUNT + страница сотрудников, навыки и фото из сводки"""
+        EmployeeSkill.objects.create(employee=self.employee, skill=self.python, level=3)
+        EmployeeImage.objects.create(employee=self.employee, image="employees/photo.jpg")
+        with self.assertNumQueries(2):
+            response = Client().get('/employees/')
+        self.assertContains(response, "Python")
+        self.assertContains(response, "employees/photo.jpg")
+
+
+# 21. Тесты миниатюр фото
+class ThumbnailPipelineTest(TestCase):
+    
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.addCleanup(settings_override.disable)
+        self.employee = Employee.objects.create(first_name="Иван", last_name="Петров", position="manager", desk_number=1)
+    
+    def upload(self, size=(1600, 1200)):
+        buffer = BytesIO()
+        Image.new("RGB", size, (200, 50, 50)).save(buffer, "JPEG")
+        upload = SimpleUploadedFile("photo.jpg", buffer.getvalue(), content_type="image/jpeg")
+        with patch("employee.signals.schedule_thumbnails"):
+            return EmployeeImage.objects.create(employee=self.employee, image=upload)
+    
+    def test_renditions_generated(self):
+        photo = self.upload()
+        written = generate_thumbnails(photo.image.name)
+        self.assertEqual(sorted(written), sorted(thumbnail_names(photo.image.name)))
+        for size in (50, 100, 300):
+            for fmt in ("jpeg", "webp"):
+                with default_storage.open(thumbnail_name(photo.image.name, size, fmt)) as rendition:
+                    image = Image.open(rendition)
+                    self.assertEqual(image.format, fmt.upper())
+                    self.assertEqual(min(image.size), size)
+        # Повторный запуск ничего не перестраивает
+        self.assertEqual(generate_thumbnails(photo.image.name), [])
+    
+    def test_small_image_not_upscaled(self):
+        photo = self.upload(size=(80, 60))
+        generate_thumbnails(photo.image.name)
+        with default_storage.open(thumbnail_name(photo.image.name, 300, "jpeg")) as rendition:
+            self.assertEqual(Image.open(rendition).size, (80, 60))
+    
+    def test_upload_schedules_worker_after_commit(self):
+        with patch("employee.signals.schedule_thumbnails") as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                photo = self.upload()
+                photo.save()
+        schedule.assert_called_with(photo.pk)
+    
+    def test_urls_fall_back_to_original_until_ready(self):
+        photo = self.upload()
+        self.employee.refresh_from_db()
+        self.assertEqual(photo.thumbnail_url(100), photo.image.url)
+        self.assertEqual(self.employee.thumbnail_url(300), photo.image.url)
+        
+        self.assertTrue(process_image(photo.pk))
+        photo.refresh_from_db()
+        self.employee.refresh_from_db()
+        self.assertTrue(photo.has_thumbnails)
+        self.assertTrue(self.employee.main_photo_thumbnails)
+        self.assertTrue(photo.thumbnail_url(100).endswith("/100/" + photo.image.name.replace(".jpg", ".jpeg")))
+        self.assertTrue(self.employee.thumbnail_url(300, "webp").endswith(".webp"))
+        # Размер округляется вверх до ближайшей rendition
+        self.assertEqual(photo.thumbnail_url(80), photo.thumbnail_url(100))
+    
+    def test_api_and_list_page_reference_renditions(self):
+        photo = self.upload()
+        process_image(photo.pk)
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="viewer"))
+        employee = client.get("/api/employees/").data["results"][0]
+        self.assertTrue(employee["thumbnails"]["50"]["webp"].startswith("http://testserver/"))
+        self.assertTrue(employee["thumbnails"]["300"]["jpeg"].endswith(".jpeg"))
+        
+        response = Client().get("/employees/")
+        self.assertContains(response, thumbnail_name(photo.image.name, 300, "webp"))
+        self.assertNotContains(response, f'src="{photo.image.url}"')
+    
+    def test_thumbnails_deleted_with_image(self):
+        photo = self.upload()
+        generate_thumbnails(photo.image.name)
+        with self.captureOnCommitCallbacks(execute=True):
+            photo.delete()
+        for name in thumbnail_names(photo.image.name) + [photo.image.name]:
+            self.assertFalse(default_storage.exists(name))
+    
+    def test_backfill_command(self):
+        photos = [self.upload() for _ in range(3)]
+        EmployeeImage.objects.create(employee=self.employee, image="employees/missing.jpg")
+        out = StringIO()
+        call_command("generate_thumbnails", "--workers", "3", stdout=out)
+        self.assertIn("3 из 4", out.getvalue())
+        self.assertEqual(EmployeeImage.objects.filter(has_thumbnails=True).count(), 3)
+        for photo in photos:
+            self.assertTrue(default_storage.exists(thumbnail_name(photo.image.name, 50, "webp")))
+        self.employee.refresh_from_db()
+        self.assertTrue(self.employee.main_photo_thumbnails)
+
+
+# 22. Тесты потоковой загрузки фото
+class ImageUploadTest(TestCase):
+    
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.addCleanup(settings_override.disable)
+        self.employee = Employee.objects.create(first_name="Иван", last_name="Петров", position="manager", desk_number=1)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="admin", is_staff=True))
+    
+    def image_file(self, name="photo.jpg", size=(64, 48), image_format="JPEG"):
+        buffer = BytesIO()
+        Image.new("RGB", size).save(buffer, image_format)
+        return SimpleUploadedFile(name, buffer.getvalue())
+    
+    def test_header_inspection(self):
+        self.assertEqual(inspect_image(self.image_file()), ("JPEG", 64, 48))
+        self.assertEqual(inspect_image(self.image_file("photo.png", image_format="PNG"))[0], "PNG")
+        invalid = [
+            SimpleUploadedFile("photo.jpg", b"not an image"),
+            self.image_file("photo.bmp", image_format="BMP"),
+        ]
+        for upload in invalid:
+            with self.subTest(name=upload.name), self.assertRaises(ValidationError):
+                inspect_image(upload)
+        with override_settings(IMAGE_UPLOAD_MAX_PIXELS=1000), self.assertRaises(ValidationError):
+            inspect_image(self.image_file())
+    
+    def test_header_only_no_full_decode(self):
+        with patch("PIL.ImageFile.ImageFile.load") as load:
+            inspect_image(self.image_file(size=(4000, 3000)))
+        load.assert_not_called()
+    
+    def test_single_upload_streams_to_disk(self):
+        with patch("employee.signals.schedule_thumbnails"):
+            response = self.client.post(
+                "/api/images/", {"employee": self.employee.pk, "image": self.image_file()}, format="multipart"
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(default_storage.exists(EmployeeImage.objects.get().image.name))
+    
+    def test_gallery_upload(self):
+        files = [self.image_file(f"photo{i}.jpg") for i in range(3)]
+        with patch("employee.uploads.schedule_thumbnails") as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    "/api/images/bulk/", {"employee": self.employee.pk, "images": files}, format="multipart"
+                )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(schedule.call_count, 3)
+        self.employee.refresh_from_db()
+        self.assertEqual(self.employee.image_count, 3)
+        self.assertEqual(self.employee.main_photo, EmployeeImage.objects.order_by("id").first().image.name)
+    
+    def test_gallery_upload_rejects_invalid_file(self):
+        response = self.client.post("/api/images/bulk/", {
+            "employee": self.employee.pk,
+            "images": [self.image_file(), SimpleUploadedFile("broken.jpg", b"broken")],
+        }, format="multipart")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("images", response.data)
+        self.assertFalse(EmployeeImage.objects.exists())
+    
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("benchmark_upload", "--sizes", "0.1", stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+
+
+# 23. Тесты content-addressed хранилища фото
+class ContentAddressedStorageTest(TestCase):
+    
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.addCleanup(settings_override.disable)
+        self.first = Employee.objects.create(first_name="Иван", last_name="Петров", position="manager", desk_number=1)
+        self.second = Employee.objects.create(first_name="Анна", last_name="Смирнова", position="manager", desk_number=3)
+    
+    def jpeg(self, color=(10, 20, 30)):
+        buffer = BytesIO()
+        Image.new("RGB", (32, 32), color).save(buffer, "JPEG")
+        return buffer.getvalue()
+    
+    def upload(self, employee, content, name="photo.jpg"):
+        with patch("employee.signals.schedule_thumbnails"):
+            return EmployeeImage.objects.create(employee=employee, image=SimpleUploadedFile(name, content))
+    
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.media_root)
+            for root, _, names in os.walk(self.media_root) for name in names
+        )
+    
+    def test_identical_uploads_stored_once(self):
+        first = self.upload(self.first, self.jpeg(), "a.jpg")
+        second = self.upload(self.second, self.jpeg(), "b.JPEG")
+        other = self.upload(self.second, self.jpeg((200, 0, 0)))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        self.assertRegex(first.image.name, CONTENT_ADDRESSED_NAME)
+        self.assertEqual(len(self.stored_files()), 2)
+    
+    def test_file_deleted_with_last_reference(self):
+        first = self.upload(self.first, self.jpeg())
+        second = self.upload(self.second, self.jpeg())
+        name = first.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(default_storage.exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(default_storage.exists(name))
+    
+    def test_file_deleted_by_concurrent_cleanup_restored_on_commit(self):
+        first = self.upload(self.first, self.jpeg())
+        name = first.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            second = self.upload(self.second, self.jpeg())
+            # Другой процесс удалил последнюю зафиксированную ссылку и файл, пока
+            # новая запись с тем же содержимым ещё не зафиксирована
+            EmployeeImage.objects.filter(pk=first.pk).delete()
+            default_storage.delete(name)
+            self.assertFalse(default_storage.exists(name))
+        self.assertEqual(second.image.name, name)
+        self.assertTrue(default_storage.exists(name))
+        with default_storage.open(name) as stored:
+            self.assertEqual(stored.read(), self.jpeg())
+    
+    def test_replaced_file_kept_while_referenced(self):
+        first = self.upload(self.first, self.jpeg())
+        self.upload(self.second, self.jpeg())
+        name = first.image.name
+        with self.captureOnCommitCallbacks(execute=True), patch("employee.signals.schedule_thumbnails"):
+            first.image = SimpleUploadedFile("new.jpg", self.jpeg((0, 200, 0)))
+            first.save()
+        self.assertNotEqual(first.image.name, name)
+        self.assertTrue(default_storage.exists(name))
+    
+    def test_media_view_immutable_headers(self):
+        photo = self.upload(self.first, self.jpeg())
+        factory = RequestFactory()
+        response = media_file(factory.get("/media/"), photo.image.name)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("immutable", response["Cache-Control"])
+        etag = response["ETag"]
+        self.assertFalse(etag.startswith("W/"))
+        
+        response = media_file(factory.get("/media/", HTTP_IF_NONE_MATCH=etag), photo.image.name)
+        self.assertEqual(response.status_code, 304)
+        
+        default_storage.save("employees/legacy.jpg", ContentFile(self.jpeg()))
+        response = media_file(factory.get("/media/"), "employees/legacy.jpg")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertNotIn("immutable", response["Cache-Control"])
+    
+    def test_dedupe_legacy_images(self):
+        for name, employee in [("employees/old1.jpg", self.first), ("employees/old2.jpg", self.second)]:
+            default_storage.save(name, ContentFile(self.jpeg()))
+            EmployeeImage.objects.bulk_create([EmployeeImage(employee=employee, image=name)])
+        out = StringIO()
+        call_command("dedupe_images", stdout=out)
+        self.assertIn("Перенесено фото: 2, удалено старых файлов: 2", out.getvalue())
+        names = set(EmployeeImage.objects.values_list("image", flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertRegex(names.pop(), CONTENT_ADDRESSED_NAME)
+        self.assertFalse(default_storage.exists("employees/old1.jpg"))
+        self.first.refresh_from_db()
+        self.assertTrue(self.first.main_photo_thumbnails)
+        self.assertRegex(self.first.main_photo, CONTENT_ADDRESSED_NAME)
+
+
+# 24. Тесты отдачи статики и media
+class FileServingTest(TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.media_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(STATIC_ROOT=cls.static_root, MEDIA_ROOT=cls.media_root)
+        cls.settings_override.enable()
+        call_command("collectstatic", interactive=False, verbosity=0)
+        with open(os.path.join(cls.media_root, "video.bin"), "wb") as target:
+            target.write(bytes(range(256)) * 4)
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.static_root, ignore_errors=True)
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+    
+    def test_collectstatic_precompresses(self):
+        path = os.path.join(self.static_root, "css", "styles.css")
+        with open(path, "rb") as source, gzip.open(path + ".gz") as compressed:
+            self.assertEqual(compressed.read(), source.read())
+    
+    def test_precompressed_variant_served(self):
+        response = self.client.get("/static/css/styles.css", HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        body = gzip.decompress(b"".join(response.streaming_content))
+        self.assertIn(b".employee-card", body)
+        
+        plain = self.client.get("/static/css/styles.css")
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        self.assertNotEqual(plain["ETag"], response["ETag"])
+    
+    def test_conditional_requests_without_file_reads(self):
+        response = self.client.get("/static/css/styles.css")
+        with patch("employee.serving.open", side_effect=AssertionError("файл не должен читаться"), create=True):
+            by_etag = self.client.get("/static/css/styles.css", HTTP_IF_NONE_MATCH=response["ETag"])
+            by_date = self.client.get("/static/css/styles.css", HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual((by_etag.status_code, by_date.status_code), (304, 304))
+        self.assertEqual(by_etag["ETag"], response["ETag"])
+    
+    def test_byte_ranges(self):
+        response = self.client.get("/media/video.bin", HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 10-19/1024")
+        self.assertEqual(b"".join(response.streaming_content), bytes(range(10, 20)))
+        
+        response = self.client.get("/media/video.bin", HTTP_RANGE="bytes=-4")
+        self.assertEqual(b"".join(response.streaming_content), bytes(range(252, 256)))
+        
+        response = self.client.get("/media/video.bin", HTTP_RANGE="bytes=5000-")
+        self.assertEqual((response.status_code, response["Content-Range"]), (416, "bytes */1024"))
+        
+        # Устаревший If-Range - отдаётся весь файл
+        response = self.client.get("/media/video.bin", HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')
+        self.assertEqual((response.status_code, response["Content-Length"]), (200, "1024"))
+    
+    def test_missing_and_outside_files(self):
+        self.assertEqual(self.client.get("/media/missing.jpg").status_code, 404)
+        self.assertEqual(self.client.get("/media/../office/settings.py").status_code, 404)
+        self.assertEqual(self.client.post("/media/video.bin").status_code, 405)
+    
+    def test_templates_link_static_stylesheet(self):
+        cache.clear()
+        response = self.client.get("/employees/")
+        self.assertContains(response, "/static/css/styles.css")
+        self.assertNotContains(response, "<style>")
+
+
+# 25. Тесты кэша страниц и карточек
+class PageCacheTest(TestCase):
+    
+    def setUp(self):
+        cache.clear()
+        reset_cache_stats()
+        self.employees = [
+            Employee.objects.create(first_name=f"Имя{i}", last_name="Фамилия", position="manager", desk_number=i * 2)
+            for i in range(3)
+        ]
+        self.skill = Skill.objects.create(name="Python")
+    
+    def change(self, func):
+        with self.captureOnCommitCallbacks(execute=True):
+            func()
+    
+    def test_home_cached_until_employee_changes(self):
+        self.client.get("/")
+        with self.assertNumQueries(0):
+            response = self.client.get("/")
+        self.assertContains(response, "Имя0")
+        
+        employee = self.employees[0]
+        employee.first_name = "Пётр"
+        self.change(employee.save)
+        response = self.client.get("/")
+        self.assertContains(response, "Пётр")
+        self.assertEqual(cache_stats()["home"], {"hits": 1, "misses": 2})
+    
+    def test_home_invalidated_by_gallery_change(self):
+        self.client.get("/")
+        self.change(lambda: EmployeeImage.objects.create(employee=self.employees[1], image="employees/new.jpg"))
+        self.assertContains(self.client.get("/"), "employees/new.jpg")
+    
+    def test_detail_cached_per_employee(self):
+        employee = self.employees[0]
+        self.client.get(f"/employees/{employee.pk}/")
+        with self.assertNumQueries(0):
+            self.client.get(f"/employees/{employee.pk}/")
+        
+        self.change(lambda: EmployeeSkill.objects.create(employee=employee, skill=self.skill, level=2))
+        self.assertContains(self.client.get(f"/employees/{employee.pk}/"), "Python")
+        # Изменение другого сотрудника не трогает эту страницу
+        self.change(lambda: EmployeeSkill.objects.create(employee=self.employees[1], skill=self.skill, level=2))
+        with self.assertNumQueries(0):
+            self.client.get(f"/employees/{employee.pk}/")
+        
+        self.change(employee.delete)
+        self.assertEqual(self.client.get(f"/employees/{employee.pk}/").status_code, 404)
+    
+    def test_list_renders_only_changed_cards(self):
+        self.client.get("/employees/")
+        self.assertEqual(cache_stats()["employee_card"], {"hits": 0, "misses": 3})
+        
+        self.change(lambda: apply_seating_plan([(self.employees[2], 40)]))
+        response = self.client.get("/employees/")
+        self.assertContains(response, "<strong>Стол:</strong> 40")
+        self.assertEqual(cache_stats()["employee_card"], {"hits": 2, "misses": 4})
+    
+    def test_new_day_renders_again(self):
+        self.client.get("/")
+        with patch("employee.caching._today", return_value="2099-01-01"):
+            self.client.get("/")
+        self.assertEqual(cache_stats()["home"]["misses"], 2)
+    
+    def test_stats_endpoint(self):
+        self.client.get("/")
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="viewer"))
+        self.assertEqual(client.get("/api/cache-stats/").status_code, 403)
+        client.force_authenticate(User.objects.create_user(username="admin", is_staff=True))
+        response = client.get("/api/cache-stats/")
+        self.assertEqual(response.data["home"], {"hits": 0, "misses": 1})
+
+
+# 26. Тесты условного GET в API
+class ConditionalGetAPITest(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="viewer", password="testpass123")
+        cls.desks = Desk.objects.bulk_create([Desk(number=f"C{i}") for i in range(5)])
+        cls.employees = Employee.objects.bulk_create([
+            Employee(first_name=f"Имя{i}", last_name="Фамилия", position="manager", desk_number=i * 2)
+            for i in range(5)
+        ])
+        Reservation.objects.bulk_create([
+            Reservation(user=cls.user, desk=desk, date="2024-01-15") for desk in cls.desks
+        ])
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def revalidate(self, url, response, **params):
+        return self.client.get(url, params, HTTP_IF_NONE_MATCH=response["ETag"])
+    
+    def test_unchanged_data_costs_one_query_without_serialization(self):
+        for url in ["/api/employees/", f"/api/employees/{self.employees[0].pk}/", "/api/desks/", "/api/reservations/"]:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                with self.assertNumQueries(1), patch.multiple(
+                    "rest_framework.serializers.Serializer",
+                    to_representation=lambda *args: self.fail("сериализация при 304"),
+                ):
+                    cached = self.revalidate(url, response)
+                self.assertEqual(cached.status_code, 304)
+                self.assertEqual(cached["ETag"], response["ETag"])
+    
+    def test_etag_changes_with_data(self):
+        url = "/api/employees/"
+        response = self.client.get(url)
+        
+        employee = self.employees[1]
+        employee.first_name = "Пётр"
+        employee.save()
+        changed = self.revalidate(url, response)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], response["ETag"])
+        
+        # Сводка и пересадка пишутся в обход save() - версия всё равно меняется
+        EmployeeSkill.objects.create(employee=employee, skill=Skill.objects.create(name="Go"), level=1)
+        self.assertEqual(self.revalidate(url, changed).status_code, 200)
+        response = self.client.get(url)
+        apply_seating_plan([(self.employees[4], 20)])
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+        
+        # Удаление не сдвигает MAX(updated_at), но меняет COUNT
+        response = self.client.get(url)
+        self.employees[0].delete()
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+    
+    def test_etag_depends_on_query_and_date(self):
+        response = self.client.get("/api/employees/", {"page_size": 2})
+        self.assertEqual(self.revalidate("/api/employees/", response, page_size=3).status_code, 200)
+        self.assertEqual(self.revalidate("/api/employees/", response, page_size=2).status_code, 304)
+        with patch("employee.conditional.timezone.localdate", return_value=date(2099, 1, 1)):
+            self.assertEqual(self.revalidate("/api/employees/", response, page_size=2).status_code, 200)
+    
+    def test_reservations_follow_desk_changes(self):
+        response = self.client.get("/api/reservations/")
+        desk = self.desks[0]
+        desk.number = "C99"
+        desk.save()
+        changed = self.revalidate("/api/reservations/", response)
+        self.assertEqual(changed.status_code, 200)
+        self.assertIn("C99", [item["desk_number"] for item in changed.data["results"]])
+    
+    def test_detail_last_modified(self):
+        url = f"/api/desks/{self.desks[0].pk}/"
+        response = self.client.get(url)
+        self.assertIn("Last-Modified", response)
+        cached = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(cached.status_code, 304)
+        self.assertNotIn("Last-Modified", self.client.get("/api/desks/"))
+        self.assertEqual(self.client.get("/api/desks/999/").status_code, 404)
+        self.assertEqual(self.client.get("/api/desks/abc/").status_code, 404)
+
+
+# 27. Тесты быстрого пути сериализации списка сотрудников
+@override_settings(ALLOWED_HOSTS=["testserver"])
+class EmployeeListFastSerializerTest(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        skill = Skill.objects.create(name="Python")
+        names = ["employees/ab/" + "ab" * 32 + ".jpg", "employees/Фото сотрудника.jpg", ""]
+        for i, name in enumerate(names * 2):
+            employee = Employee.objects.create(
+                first_name=f"Имя{i}", last_name="Фамилия", position="designer", desk_number=i * 2,
+                hire_date=date(2020, 1, 1) + timedelta(days=i),
+            )
+            EmployeeSkill.objects.create(employee=employee, skill=skill, level=1)
+            if name:
+                EmployeeImage.objects.create(employee=employee, image=name, has_thumbnails=i % 2 == 0)
+        refresh_employee_summaries(Employee.objects.values_list("id", flat=True))
+    
+    def render(self, serializer):
+        return JSONRenderer().render(serializer.data)
+    
+    def test_output_is_byte_identical(self):
+        queryset = Employee.objects.order_by("id")
+        instances = list(queryset)
+        rows = list(queryset.values())
+        for context in [{}, {"request": APIRequestFactory().get("/api/employees/")}]:
+            with self.subTest(request=bool(context)):
+                expected = self.render(ListSerializer(child=EmployeeListSerializer(), instance=instances, context=context))
+                for data in [queryset, instances, rows]:
+                    self.assertEqual(self.render(EmployeeListSerializer(data, many=True, context=context)), expected)
+        self.assertIn("thumbnails/v1/50/employees/ab/".encode(), expected)
+        self.assertIn("%D0%A4%D0%BE%D1%82%D0%BE".encode(), expected)
+    
+    def test_api_list_reads_values_once(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="viewer"))
+        with self.assertNumQueries(3), patch.object(
+            EmployeeListSerializer, "to_representation", side_effect=AssertionError("поле за полем")
+        ):
+            response = client.get("/api/employees/")
+        self.assertEqual(len(response.data["results"]), 6)
+        self.assertEqual(response.data["results"][0]["position_display"], "Дизайнер")
+
+
+# 28. Тесты потоковой выгрузки
+@override_settings(ALLOWED_HOSTS=["testserver"])
+class ExportTest(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="viewer", first_name="Анна")
+        python = Skill.objects.create(name="Python")
+        cls.testers = []
+        for i in range(5):
+            employee = Employee.objects.create(
+                first_name=f"Имя{i}", last_name="Фамилия", position="tester" if i % 2 else "manager", desk_number=i * 3,
+            )
+            EmployeeSkill.objects.create(employee=employee, skill=python, level=i % 4 + 1)
+            if i % 2:
+                cls.testers.append(employee)
+        desk = Desk.objects.create(number="E1")
+        Reservation.objects.create(user=cls.user, desk=desk, date=date(2024, 1, 15))
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def export(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content)
+    
+    def test_ndjson_matches_api_list(self):
+        lines = self.export("/api/export/employees.ndjson", page_size=1).decode().splitlines()
+        self.assertEqual(len(lines), 5)
+        api = self.client.get("/api/employees/", {"page_size": 10}).data["results"]
+        self.assertEqual([json.loads(line) for line in lines], json.loads(JSONRenderer().render(sorted(api, key=lambda row: row["id"]))))
+    
+    def test_csv_honors_employee_filter(self):
+        content = self.export("/api/export/skills.csv", position="tester").decode("utf-8-sig")
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual([int(row["employee"]) for row in rows], [employee.pk for employee in self.testers])
+        self.assertEqual(rows[0]["skill_name"], "Python")
+        
+        content = self.export("/api/export/employees.csv", position="tester").decode("utf-8-sig")
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual({row["position_display"] for row in rows}, {"Тестировщик"})
+        self.assertEqual(rows[0]["skills"], "Python")
+    
+    def test_reads_in_chunks(self):
+        with CaptureQueriesContext(connection) as queries:
+            stream, _ = export_stream("employees", "ndjson", {}, chunk_size=2)
+            self.assertEqual(len(b"".join(stream).splitlines()), 5)
+        self.assertEqual(len(queries), 1)
+    
+    def test_reservations_and_errors(self):
+        content = self.export("/api/export/reservations.csv").decode("utf-8-sig")
+        self.assertIn("viewer,", content)
+        self.assertIn("2024-01-15", content)
+        self.assertEqual(self.client.get("/api/export/desks.csv").status_code, 400)
+        self.assertEqual(self.client.get("/api/export/employees.pdf").status_code, 400)
+        self.assertEqual(self.client.get("/api/export/employees.csv", {"position": "cto"}).status_code, 400)
+        self.assertEqual(APIClient().get("/api/export/employees.csv").status_code, 401)
+    
+    @skipIf(openpyxl is None, "openpyxl не установлен")
+    def test_xlsx(self):
+        content = self.export("/api/export/employees.xlsx")
+        sheet = openpyxl.load_workbook(BytesIO(content)).active
+        self.assertEqual(sheet.max_row, 6)
+    
+    def test_command(self):
+        out = StringIO()
+        call_command("export_data", "employees", "--filter", "position=tester", stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), len(self.testers))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "skills.csv")
+            call_command("export_data", "skills", "--format", "csv", "-o", path, stderr=StringIO())
+            with open(path, encoding="utf-8-sig") as source:
+                self.assertEqual(len(list(csv.DictReader(source))), 5)
+
+
+# 29. Тесты массового импорта сотрудников
+class EmployeeImportTest(TestCase):
+    
+    HEADER = "first_name,last_name,position,desk_number,hire_date,skills\n"
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username="admin", is_staff=True)
+        cls.python = Skill.objects.create(name="Python")
+        Employee.objects.create(first_name="Есть", last_name="Уже", position="tester", desk_number=100)
+    
+    def dataset(self, rows):
+        return load_dataset(BytesIO(("\ufeff" + self.HEADER + rows).encode()), "employees.csv")
+    
+    def test_imports_batch_with_constant_queries(self):
+        rows = "".join(f"Имя{i},Фамилия,backend,{i * 2},2020-01-0{i % 9 + 1},python:3; Python\n" for i in range(50))
+        with CaptureQueriesContext(connection) as queries:
+            result = import_employees(self.dataset(rows), chunk_size=20)
+        statements = [query["sql"].split()[0] for query in queries.captured_queries]
+        # Справочник навыков и соседи, затем на каждый из трёх кусков - сотрудники и их навыки;
+        # счётчики аналитики - по строке на новый ключ (здесь один месяц приёма и один навык)
+        self.assertEqual(statements.count("SELECT"), 2)
+        self.assertEqual(statements.count("INSERT"), 8)
+        self.assertEqual((result.created, result.errors), (50, []))
+        employee = Employee.objects.get(first_name="Имя7")
+        self.assertEqual(employee.hire_date, date(2020, 1, 8))
+        self.assertEqual(employee.skill_names, ["Python"])
+        self.assertEqual(list(employee.employeeskill_set.values_list("skill", "level")), [(self.python.pk, 1)])
+    
+    def test_row_errors(self):
+        rows = (
+            "Анна,Иванова,Тестировщик,1,,\n"           # подпись должности вместо значения
+            "Борис,Петров,backend,2,,\n"               # сосед тестировщика из этого же файла
+            "Вера,Сидорова,cto,5,,\n"                  # неизвестная должность
+            "Глеб,Орлов,frontend,99,,\n"               # сосед тестировщика из БД
+            ",Без имени,manager,7,,\n"
+            "Дина,Смирнова,manager,9,,Go:2\n"
+            "Егор,Козлов,manager,11,,Python:7\n"
+        )
+        result = import_employees(self.dataset(rows))
+        self.assertEqual(result.created, 1)
+        self.assertEqual([error["row"] for error in result.errors], [3, 4, 5, 6, 7, 8])
+        errors = {error["row"]: error["errors"] for error in result.errors}
+        self.assertIn("desk_number", errors[3])
+        self.assertIn("position", errors[4])
+        self.assertIn("Глеб", errors[5]["desk_number"][0] + "Глеб")
+        self.assertEqual(errors[6], {"first_name": ["Обязательное поле"]})
+        self.assertIn("Go", errors[7]["skills"][0])
+        self.assertEqual(Employee.objects.get(first_name="Анна").position, "tester")
+    
+    def test_seating_chain_checked_in_file_order(self):
+        # A-B-C за соседними столами: B отклонена из-за A, C мешала только отклонённая B
+        rows = (
+            "Анна,Иванова,tester,20,,\n"
+            "Борис,Петров,backend,21,,\n"
+            "Вера,Сидорова,tester,22,,\n"
+        )
+        result = import_employees(self.dataset(rows))
+        self.assertEqual(result.created, 2)
+        self.assertEqual([error["row"] for error in result.errors], [3])
+        self.assertIn("Анна", result.errors[0]["errors"]["desk_number"][0])
+        self.assertEqual(
+            set(Employee.objects.filter(desk_number__in=[20, 21, 22]).values_list("first_name", flat=True)),
+            {"Анна", "Вера"},
+        )
+    
+    def test_atomic_and_create_skills(self):
+        rows = "Дина,Смирнова,manager,9,,Go:2\nВера,Сидорова,cto,5,,\n"
+        result = import_employees(self.dataset(rows), atomic=True, create_skills=True)
+        self.assertEqual(result.created, 0)
+        self.assertFalse(Skill.objects.filter(name="Go").exists())
+        
+        result = import_employees(self.dataset("Дина,Смирнова,manager,9,,Go:2\n"), create_skills=True)
+        self.assertEqual((result.created, result.skills_created), (1, 1))
+        self.assertEqual(Employee.objects.get(first_name="Дина").skill_names, ["Go"])
+    
+    def test_export_round_trip(self):
+        employee = Employee.objects.get(first_name="Есть")
+        EmployeeSkill.objects.create(employee=employee, skill=self.python, level=2)
+        stream, _ = export_stream("employees", "csv", {})
+        content = b"".join(stream)
+        employee.delete()
+        result = import_employees(load_dataset(BytesIO(content), "employees.csv"))
+        self.assertEqual((result.created, result.errors), (1, []))
+        self.assertEqual(Employee.objects.get(first_name="Есть").skill_names, ["Python"])
+    
+    def test_api_and_command(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        upload = SimpleUploadedFile("staff.csv", (self.HEADER + "Анна,Иванова,manager,3,,Python\n").encode())
+        response = client.post("/api/employees/import/", {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 1)
+        
+        upload = SimpleUploadedFile("staff.txt", b"x")
+        self.assertEqual(client.post("/api/employees/import/", {"file": upload}, format="multipart").status_code, 400)
+        upload = SimpleUploadedFile("staff.csv", (self.HEADER + "Вера,Сидорова,cto,5,,\n").encode())
+        response = client.post("/api/employees/import/", {"file": upload, "atomic": True}, format="multipart")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["errors"][0]["row"], 2)
+        
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", encoding="utf-8") as source:
+            source.write(self.HEADER + "Борис,Петров,manager,13,,\n")
+            source.flush()
+            out = StringIO()
+            call_command("import_employees", source.name, stdout=out, stderr=StringIO())
+        self.assertIn("Создано сотрудников: 1", out.getvalue())
+
+
+# 30. Тесты поискового индекса сотрудников
+class EmployeeSearchTest(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.python = Skill.objects.create(name="Python")
+        cls.petrov = Employee.objects.create(first_name="Семён", last_name="Петров", position="backend", desk_number=1)
+        cls.ivanova = Employee.objects.create(first_name="Анна", last_name="Иванова", position="designer", desk_number=5)
+        cls.tester = Employee.objects.create(first_name="Олег", last_name="Python", position="tester", desk_number=9)
+        EmployeeSkill.objects.create(employee=cls.ivanova, skill=cls.python, level=3)
+    
+    def search(self, query, **kwargs):
+        return set(search_employees(Employee.objects.all(), query, **kwargs))
+    
+    def check_matching(self):
+        self.assertEqual(self.search("пет"), {self.petrov})
+        self.assertEqual(self.search("СЕМЕН петров"), {self.petrov})
+        self.assertEqual(self.search("Петрво"), {self.petrov})          # перестановка букв
+        self.assertEqual(self.search("Иваова"), {self.ivanova})         # пропущенная буква
+        self.assertEqual(self.search("gtnhjd"), {self.petrov})          # английская раскладка
+        self.assertEqual(self.search("тестировщ"), {self.tester})       # подпись должности
+        self.assertEqual(self.search("pyth"), {self.ivanova, self.tester})
+        self.assertEqual(self.search("pyth", columns=("skills",)), {self.ivanova})
+        self.assertEqual(self.search("петров анна"), set())
+        self.assertEqual(self.search("xyz"), set())
+    
+    def test_fts5_matching(self):
+        self.check_matching()
+    
+    def test_local_fallback_matching(self):
+        invalidate_local_index()
+        with patch("employee.search.fts5_available", return_value=False):
+            self.check_matching()
+        invalidate_local_index()
+    
+    def test_local_index_rebuilt_when_shared_version_changes(self):
+        invalidate_local_index()
+        self.addCleanup(invalidate_local_index)
+        with patch("employee.search.fts5_available", return_value=False):
+            self.assertEqual(self.search("петров"), {self.petrov})
+            # Сотрудника переименовал другой процесс: локальный индекс не сброшен, но версия в кэше новая
+            Employee.objects.filter(pk=self.petrov.pk).update(last_name="Сидоров")
+            self.assertEqual(self.search("петров"), {self.petrov})
+            with self.captureOnCommitCallbacks(execute=True):
+                bump_search_index()
+            self.assertEqual(self.search("петров"), set())
+            self.assertEqual(self.search("сидор"), {self.petrov})
+    
+    def test_index_follows_changes(self):
+        self.petrov.last_name = "Сидоров"
+        self.petrov.save()
+        self.assertEqual(self.search("петров"), set())
+        self.assertEqual(self.search("сидор"), {self.petrov})
+        
+        EmployeeSkill.objects.create(employee=self.petrov, skill=Skill.objects.create(name="Kotlin"), level=1)
+        self.assertEqual(self.search("kotlin", columns=("skills",)), {self.petrov})
+        
+        self.petrov.delete()
+        self.assertEqual(self.search("сидор"), set())
+        
+        import_employees(load_dataset(BytesIO("first_name,last_name,position,desk_number,skills\nЖанна,Орлова,manager,40,Python\n".encode()), "new.csv"))
+        self.assertEqual({employee.last_name for employee in self.search("орл")}, {"Орлова"})
+    
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance("петров", "петрво", 2), 1)
+        self.assertEqual(edit_distance("петров", "иванов", 1), 2)
+    
+    def test_api_filter_and_admin_use_index(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="viewer"))
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get("/api/employees/", {"search": "петрв", "page_size": 10})
+        self.assertEqual([row["id"] for row in response.data["results"]], [self.petrov.pk])
+        self.assertFalse(any("LIKE" in query["sql"] for query in queries.captured_queries))
+        response = client.get("/api/employees/", {"skills": "pyth"})
+        self.assertEqual([row["id"] for row in response.data["results"]], [self.ivanova.pk])
+        
+        admin = User.objects.create_superuser(username="admin", password="admin123")
+        self.client.force_login(admin)
+        response = self.client.get("/admin/employee/employee/", {"q": "иванва"})
+        self.assertContains(response, "Иванова")
+        self.assertNotContains(response, "Петров")
+
+
+# 31. Тесты фильтров сотрудников: EXISTS по навыкам и планы запросов
+class EmployeeFilterTest(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.python = Skill.objects.create(name="Python")
+        cls.django = Skill.objects.create(name="Django")
+        cls.go = Skill.objects.create(name="Go")
+        today = date.today()
+        cls.senior = Employee.objects.create(first_name="Анна", last_name="Иванова", position="backend", gender="female", desk_number=1, hire_date=today - timedelta(days=900))
+        cls.junior = Employee.objects.create(first_name="Борис", last_name="Петров", position="backend", desk_number=3, hire_date=today - timedelta(days=10))
+        cls.designer = Employee.objects.create(first_name="Вера", last_name="Сидорова", position="designer", gender="female", desk_number=5, hire_date=today - timedelta(days=400))
+        for employee, skill, level in [
+            (cls.senior, cls.python, 4), (cls.senior, cls.django, 3), (cls.senior, cls.go, 2),
+            (cls.junior, cls.python, 1), (cls.junior, cls.django, 1), (cls.designer, cls.go, 3),
+        ]:
+            EmployeeSkill.objects.create(employee=employee, skill=skill, level=level)
+    
+    def filtered(self, **params):
+        filterset = EmployeeFilter(params, queryset=Employee.objects.order_by("-hire_date", "-id"))
+        self.assertTrue(filterset.is_valid(), filterset.errors)
+        return filterset.qs
+    
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(f"SEARCH employee_employee USING INDEX {index}", plan)
+        self.assertNotIn("SCAN employee_employee\n", plan + "\n")
+    
+    def test_skills_all_listed_without_duplicates(self):
+        queryset = self.filtered(skills="python,django")
+        self.assertEqual(list(queryset), [self.junior, self.senior])
+        self.assertNotIn("JOIN", str(queryset.query))
+        self.assertEqual(list(self.filtered(skills="python")), [self.junior, self.senior])
+        self.assertEqual(list(self.filtered(skills="PYTH, go")), [self.senior])
+        self.assertEqual(list(self.filtered(skills="rust")), [])
+    
+    def test_skill_names_match_exactly_then_by_substring(self):
+        javascript = Skill.objects.create(name="JavaScript")
+        EmployeeSkill.objects.create(employee=self.designer, skill=javascript, level=2)
+        self.assertEqual(list(self.filtered(skills="script")), [self.designer])
+        self.assertEqual(list(self.filtered(skills="ango")), [self.junior, self.senior])
+        # Точное совпадение важнее вхождения: go - только Go, а не Django
+        self.assertEqual(list(self.filtered(skills="go")), [self.designer, self.senior])
+    
+    def test_min_skill_level(self):
+        self.assertEqual(list(self.filtered(skills="python,django", min_skill_level=3)), [self.senior])
+        self.assertEqual(list(self.filtered(skills="go", min_skill_level=3)), [self.designer])
+        self.assertEqual(list(self.filtered(min_skill_level=3)), [self.designer, self.senior])
+        self.assertFalse(EmployeeFilter({"min_skill_level": 7}, queryset=Employee.objects.all()).is_valid())
+    
+    def test_multi_value_choices(self):
+        self.assertEqual(set(self.filtered(position="backend,designer")), {self.senior, self.junior, self.designer})
+        self.assertEqual(list(self.filtered(gender="female", position="designer")), [self.designer])
+        self.assertEqual(set(self.filtered(desk_number="1,5")), {self.senior, self.designer})
+        self.assertFalse(EmployeeFilter({"position": "backend,cto"}, queryset=Employee.objects.all()).is_valid())
+    
+    def test_experience_range(self):
+        self.assertEqual(list(self.filtered(min_experience_days=100, max_experience_days=500)), [self.designer])
+    
+    def test_query_plans_use_indexes(self):
+        self.assertUsesIndex(self.filtered(position="backend"), "employee_position_hire_idx (position=?)")
+        self.assertUsesIndex(self.filtered(gender="female"), "employee_gender_hire_idx (gender=?)")
+        self.assertUsesIndex(self.filtered(desk_number="5"), "employee_desk_position_idx (desk_number=?)")
+        self.assertUsesIndex(self.filtered(min_experience_days=30), "employee_hire_date_id_idx (hire_date<?)")
+        self.assertUsesIndex(
+            self.filtered(position="backend", max_experience_days=30),
+            "employee_position_hire_idx (position=? AND hire_date>?)",
+        )
+        # Список уже отсортирован индексом - без временного B-дерева
+        self.assertNotIn("TEMP B-TREE", self.filtered(position="backend").explain())
+        
+        plan = self.filtered(skills="python,django", min_skill_level=2).explain()
+        self.assertNotIn("SCAN employee_employee\n", plan + "\n")
+        self.assertEqual(plan.count("USING COVERING INDEX employeeskill_emp_skill_idx (employee_id=? AND skill_id=? AND level>?)"), 2)
+    
+    def test_api(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="viewer"))
+        response = client.get("/api/employees/", {"skills": "python,django", "min_skill_level": 3})
+        self.assertEqual([row["id"] for row in response.data["results"]], [self.senior.pk])
+        self.assertEqual(client.get("/api/employees/", {"desk_number": "x"}).status_code, 400)
+
+
+# 32. Тесты материализованной аналитики
+class AnalyticsTest(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.python = Skill.objects.create(name="Python")
+        cls.go = Skill.objects.create(name="Go")
+        cls.anna = Employee.objects.create(first_name="Анна", last_name="Иванова", position="backend", gender="female", desk_number=1, hire_date=date(2024, 1, 15))
+        cls.boris = Employee.objects.create(first_name="Борис", last_name="Петров", position="backend", desk_number=3, hire_date=date(2024, 1, 20))
+        cls.vera = Employee.objects.create(first_name="Вера", last_name="Сидорова", position="designer", gender="female", desk_number=5, hire_date=date(2025, 3, 1))
+        EmployeeSkill.objects.create(employee=cls.anna, skill=cls.python, level=4)
+        EmployeeSkill.objects.create(employee=cls.boris, skill=cls.python, level=2)
+        EmployeeSkill.objects.create(employee=cls.vera, skill=cls.go, level=3)
+    
+    def snapshot(self):
+        return (
+            set(HeadcountStat.objects.values_list("position", "gender", "cohort", "count")),
+            set(SkillLevelStat.objects.values_list("skill_id", "level", "position", "count")),
+        )
+    
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        rebuild_analytics()
+        self.assertEqual(incremental, self.snapshot())
+    
+    def test_signals_keep_counters_incremental(self):
+        self.assertIn(("backend", "female", date(2024, 1, 1), 1), self.snapshot()[0])
+        self.assertMatchesRebuild()
+        
+        self.boris.position = "manager"
+        self.boris.hire_date = date(2023, 6, 6)
+        self.boris.save()
+        self.assertIn((self.python.pk, 2, "manager", 1), self.snapshot()[1])
+        skill = EmployeeSkill.objects.get(employee=self.vera)
+        skill.level = 1
+        skill.save()
+        self.assertMatchesRebuild()
+        
+        self.anna.delete()
+        self.assertMatchesRebuild()
+        self.go.delete()
+        self.assertMatchesRebuild()
+        self.assertFalse(HeadcountStat.objects.filter(count__lte=0).exists())
+    
+    def test_import_updates_counters(self):
+        import_employees(load_dataset(BytesIO(
+            "first_name,last_name,position,desk_number,hire_date,skills\nГлеб,Орлов,manager,40,2024-01-05,Python:3\n".encode()
+        ), "new.csv"))
+        self.assertIn((self.python.pk, 3, "manager", 1), self.snapshot()[1])
+        self.assertMatchesRebuild()
+    
+    def test_api(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="viewer"))
+        with self.assertNumQueries(2):
+            response = client.get("/api/analytics/", {"min_level": 2, "period": "year"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["total"], 3)
+        self.assertEqual(response.data["hire_cohorts"], [{"cohort": "2024", "count": 2}, {"cohort": "2025", "count": 1}])
+        self.assertIn({"position": "backend", "position_display": "Бекенд-разработчик", "gender": "female", "count": 1}, response.data["headcount"])
+        self.assertEqual(
+            [(row["skill_name"], row["position"], row["count"]) for row in response.data["skills"]],
+            [("Go", "designer", 1), ("Python", "backend", 2)],
+        )
+        response = client.get("/api/analytics/", {"min_level": 3})
+        self.assertEqual([(row["skill_name"], row["count"]) for row in response.data["skills"]], [("Go", 1), ("Python", 1)])
+        response = client.get("/api/analytics/")
+        self.assertEqual(len(response.data["hire_cohorts"]), 2)
+        self.assertEqual({row["level"] for row in response.data["skills"]}, {2, 3, 4})
+        self.assertEqual(client.get("/api/analytics/", {"min_level": 9}).status_code, 400)
+        
+        out = StringIO()
+        call_command("refresh_analytics", stdout=out)
+        self.assertIn("Счётчики пересчитаны", out.getvalue())
+
+
+# 33. Тесты подбора сотрудников по матрице навыков
+class StaffingMatchTest(TestCase):
+    
+    def random_matrix(self, use_numpy=False, seed=0):
+        rng = random.Random(seed)
+        desks = [(number, number % 10, number // 10) for number in range(60)]
+        employees = [(pk, rng.choice(["backend", "tester", "designer"]), rng.randrange(80)) for pk in range(1, 301)]
+        skills = [(pk, skill, rng.randint(1, 4)) for pk, _, _ in employees for skill in rng.sample(range(8), 3)]
+        return employees, skills, desks
+    
+    def brute_force(self, employees, skills, desks, requirements, k, positions=(), near=None, weight=0.0, require_all=False):
+        coordinates = {str(number): (x, y) for number, x, y in desks}
+        levels = {}
+        for pk, skill, level in skills:
+            levels[pk, skill] = max(level, levels.get((pk, skill), 0))
+        scored = []
+        for pk, position, desk_number in employees:
+            taken = [levels.get((pk, skill), 0) for skill in requirements]
+            skill_score = sum(min(level, need) / need for level, need in zip(taken, requirements.values())) / len(requirements)
+            meets_all = all(level >= need for level, need in zip(taken, requirements.values()))
+            if not skill_score or (positions and position not in positions) or (require_all and not meets_all):
+                continue
+            score = skill_score
+            if near is not None and weight:
+                desk = coordinates.get(str(desk_number))
+                proximity = 1 / (1 + math.hypot(desk[0] - near[0], desk[1] - near[1]) / 1.5) if desk else 0.0
+                score = (1 - weight) * skill_score + weight * proximity
+            scored.append((-round(score, 9), pk))
+        return [pk for _, pk in sorted(scored)[:k]]
+    
+    def test_matches_brute_force(self):
+        data = self.random_matrix()
+        matrix = SkillMatrix(*data, use_numpy=False)
+        queries = [
+            ({0: 3, 1: 2}, {}),
+            ({2: 4, 5: 1, 7: 2}, {"require_all": True}),
+            ({3: 2}, {"positions": {"tester"}}),
+            ({0: 3, 4: 3}, {"near": (4, 3), "weight": 0.4}),
+            ({1: 1, 6: 4}, {"near": (0, 0), "weight": 1.0, "positions": {"backend", "designer"}}),
+        ]
+        for requirements, options in queries:
+            for k in (1, 7, 500):
+                kwargs = dict(options)
+                weight = kwargs.pop("weight", 0.0)
+                found = matrix.match(requirements, k=k, proximity_weight=weight, **kwargs)
+                self.assertEqual([match.employee for match in found], self.brute_force(*data, requirements, k, weight=weight, **kwargs))
+    
+    def test_match_details(self):
+        matrix = SkillMatrix(
+            [(1, "backend", 1), (2, "backend", 99), (3, "tester", 2)],
+            [(1, 10, 4), (1, 11, 1), (2, 10, 3), (2, 11, 2), (3, 11, 4)],
+            [("1", 0, 0), ("2", 3, 4)],
+        )
+        best, second, third = matrix.match({10: 3, 11: 2}, near=(0, 0))
+        self.assertEqual((best.employee, best.score, best.meets_all, best.levels, best.distance), (2, 1.0, True, [3, 2], None))
+        self.assertEqual((second.employee, second.score, second.levels, second.distance), (1, 0.75, [4, 1], 0.0))
+        self.assertEqual((third.employee, third.skill_score, third.distance), (3, 0.5, 5.0))
+        self.assertEqual([match.employee for match in matrix.match({10: 3, 11: 2}, near=(0, 0), proximity_weight=0.5)], [1, 2, 3])
+        self.assertEqual(matrix.match({12: 1}), [])
+        self.assertEqual(matrix.match({10: 3, 12: 1}, require_all=True), [])
+    
+    @skipIf(numpy is None, "NumPy не установлен")
+    def test_numpy_matches_python(self):
+        data = self.random_matrix(seed=1)
+        python, vectorized = SkillMatrix(*data, use_numpy=False), SkillMatrix(*data, use_numpy=True)
+        for kwargs in ({}, {"require_all": True}, {"near": (5, 2), "proximity_weight": 0.3, "positions": ["tester"]}):
+            self.assertEqual(
+                [(match.employee, round(match.score, 9), match.meets_all, match.levels) for match in python.match({0: 3, 2: 2}, k=20, **kwargs)],
+                [(match.employee, round(match.score, 9), match.meets_all, match.levels) for match in vectorized.match({0: 3, 2: 2}, k=20, **kwargs)],
+            )
+    
+    def test_cached_until_skills_change(self):
+        invalidate_skill_matrix()
+        self.addCleanup(invalidate_skill_matrix)
+        python = Skill.objects.create(name="Python")
+        employee = Employee.objects.create(first_name="Анна", last_name="Иванова", position="backend", desk_number=1)
+        matrix = get_skill_matrix()
+        self.assertIs(get_skill_matrix(), matrix)
+        self.assertEqual(matrix.match({python.pk: 2}), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            EmployeeSkill.objects.create(employee=employee, skill=python, level=3)
+        self.assertEqual([match.employee for match in get_skill_matrix().match({python.pk: 2})], [employee.pk])
+    
+    def test_api(self):
+        invalidate_skill_matrix()
+        self.addCleanup(invalidate_skill_matrix)
+        python = Skill.objects.create(name="Python")
+        django = Skill.objects.create(name="Django")
+        Desk.objects.create(number="1", coordinates_x=0, coordinates_y=0)
+        Desk.objects.create(number="7", coordinates_x=6, coordinates_y=0)
+        near = Employee.objects.create(first_name="Анна", last_name="Иванова", position="backend", desk_number=1)
+        far = Employee.objects.create(first_name="Борис", last_name="Петров", position="backend", desk_number=7)
+        for employee, level in ((near, 2), (far, 3)):
+            EmployeeSkill.objects.create(employee=employee, skill=python, level=level)
+            EmployeeSkill.objects.create(employee=employee, skill=django, level=2)
+        
+        client = APIClient()
+        self.assertEqual(client.post("/api/employees/match/", {"skills": {"python": 3}}, format="json").status_code, 401)
+        client.force_authenticate(User.objects.create_user(username="viewer"))
+        response = client.post("/api/employees/match/", {"skills": {"python": 3, str(django.pk): 2}}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["id"] for row in response.data["results"]], [far.pk, near.pk])
+        self.assertEqual(response.data["results"][1]["skills"][0], {"skill": python.pk, "level": 2, "required": 3})
+        self.assertEqual(response.data["results"][1]["score"], 0.8333)
+        
+        response = client.post(
+            "/api/employees/match/", {"skills": {"Python": 3, "Django": 2}, "near_desk": "1", "proximity_weight": 0.5, "k": 1}, format="json",
+        )
+        self.assertEqual([(row["id"], row["distance"]) for row in response.data["results"]], [(near.pk, 0.0)])
+        
+        response = client.post("/api/employees/match/", {"skills": {"Rust": 2}, "near_desk": "99"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {"skills", "near_desk"})
+        self.assertEqual(client.post("/api/employees/match/", {"skills": {}}, format="json").status_code, 400)
+
+
+# 34. Тесты кэша ролей пользователей
+class RoleCacheTest(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.keepers = Group.objects.create(name=KEEPER_GROUP)
+        cls.user = User.objects.create_user(username="keeper")
+        cls.user.groups.add(cls.keepers)
+    
+    def setUp(self):
+        # Роли кэшируются между запросами только в общем для процессов кэше
+        cache_dir = tempfile.mkdtemp()
+        settings_override = override_settings(CACHES={"default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": cache_dir,
+        }})
+        settings_override.enable()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        self.addCleanup(settings_override.disable)
+    
+    def request(self, user=None):
+        # Пользователь заново из БД, как при аутентификации каждого запроса
+        return SimpleNamespace(user=User.objects.get(pk=(user or self.user).pk), method="GET")
+    
+    def test_keeper_resolved_once_then_cached(self):
+        request = self.request()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(IsKeeper().has_permission(request, None))
+        self.assertTrue(queries.captured_queries)
+        with self.assertNumQueries(0):
+            self.assertTrue(IsKeeper().has_permission(request, None))
+            self.assertTrue(IsViewer().has_permission(request, None))
+            self.assertFalse(IsAdmin().has_permission(request, None))
+        request = self.request()
+        with self.assertNumQueries(0):
+            self.assertTrue(IsKeeper().has_permission(request, None))
+    
+    def test_membership_and_group_permissions_invalidate(self):
+        self.assertTrue(IsKeeper().has_permission(self.request(), None))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.remove(self.keepers)
+        self.assertFalse(IsKeeper().has_permission(self.request(), None))
+        
+        # Право на перемещение через любую группу (метка приложения - employee)
+        permission = Permission.objects.create(
+            codename="can_move_employees", name="Может перемещать сотрудников",
+            content_type=ContentType.objects.get_for_model(Employee),
+        )
+        movers = Group.objects.create(name="Перемещающие")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.add(movers)
+        self.assertFalse(IsKeeper().has_permission(self.request(), None))
+        with self.captureOnCommitCallbacks(execute=True):
+            movers.permissions.add(permission)
+        self.assertTrue(IsKeeper().has_permission(self.request(), None))
+        with self.captureOnCommitCallbacks(execute=True):
+            movers.permissions.clear()
+        self.assertFalse(IsKeeper().has_permission(self.request(), None))
+    
+    def test_staff_and_anonymous_without_queries(self):
+        admin = User.objects.create_user(username="admin", is_staff=True)
+        request = self.request(admin)
+        with self.assertNumQueries(0):
+            self.assertTrue(IsAdmin().has_permission(request, None))
+            self.assertTrue(IsKeeper().has_permission(request, None))
+            self.assertFalse(IsViewer().has_permission(SimpleNamespace(user=AnonymousUser()), None))
+    
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_process_local_cache_keeps_roles_per_request(self):
+        # Отзыв прав в другом воркере не виден через LocMemCache - роли не переживают запрос
+        request = self.request()
+        self.assertTrue(IsKeeper().has_permission(request, None))
+        with self.assertNumQueries(0):
+            self.assertTrue(IsKeeper().has_permission(request, None))
+        request = self.request()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(IsKeeper().has_permission(request, None))
+        self.assertTrue(queries.captured_queries)
@@ -0,0 +1,151 @@
+import logging
+import posixpath
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Версия входит в путь: при смене размеров или качества URL меняются,
+# поэтому renditions можно отдавать с долгим Cache-Control
+RENDITION_VERSION = 1
+THUMBNAIL_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+def thumbnail_sizes():
+    return tuple(settings.THUMBNAIL_SIZES)
+
+def thumbnail_name(name, size, fmt='jpeg'):
+    """
+    Детерминированное имя rendition: thumbnails/v1/<size>/<путь исходника>.<fmt>.
+    Исходники хранятся под хэшем содержимого (см. storage.py), поэтому имя rendition
+    однозначно определяется содержимым и не требует обращения к хранилищу.
+    """
+    stem = posixpath.splitext(name)[0]
+    return f'thumbnails/v{RENDITION_VERSION}/{size}/{stem}.{fmt}'
+
+def thumbnail_names(name):
+    return [thumbnail_name(name, size, fmt) for size in thumbnail_sizes() for fmt in THUMBNAIL_FORMATS]
+
+def thumbnail_url(name, size, fmt='jpeg', ready=True, storage=default_storage):
+    """URL rendition; пока renditions не готовы (ready=False) - URL исходника"""
+    if not name:
+        return ''
+    if not ready:
+        return storage.url(name)
+    size = min((s for s in thumbnail_sizes() if s >= int(size)), default=max(thumbnail_sizes()))
+    return storage.url(thumbnail_name(name, size, fmt))
+
+def _resize(image, size):
+    """Уменьшает так, чтобы короткая сторона стала size (под object-fit: cover), без увеличения"""
+    scale = size / min(image.size)
+    if scale >= 1:
+        return image.copy()
+    return image.resize(
+        (max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+        Image.Resampling.LANCZOS,
+        reducing_gap=3.0,
+    )
+
+# Одинаковые фото разных сотрудников - один файл: генерацию по одному имени
+# сериализуем, иначе параллельные воркеры пишут одни и те же renditions
+LOCK_STRIPES = 16
+_name_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+def generate_thumbnails(name, storage=default_storage, force=False):
+    """
+    Строит все renditions для файла name: каждый размер из THUMBNAIL_SIZES
+    в WebP и JPEG. Исходник декодируется один раз, размеры строятся от большего
+    к меньшему. Без force существующие renditions не перезаписываются.
+    Возвращает список записанных имён.
+    """
+    with _name_locks[zlib.crc32(name.encode()) % LOCK_STRIPES]:
+        return _generate_thumbnails(name, storage, force)
+
+def _generate_thumbnails(name, storage, force):
+    targets = {
+        (size, fmt): thumbnail_name(name, size, fmt)
+        for size in thumbnail_sizes() for fmt in THUMBNAIL_FORMATS
+    }
+    if not force:
+        targets = {key: target for key, target in targets.items() if not storage.exists(target)}
+    if not targets:
+        return []
+
+    with storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        # JPEG умеет декодироваться сразу в уменьшенном масштабе
+        image.draft('RGB', (max(thumbnail_sizes()) * 2,) * 2)
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGB')
+
+    written = []
+    for size in sorted({size for size, _ in targets}, reverse=True):
+        image = _resize(image, size)
+        for fmt, (pil_format, options) in THUMBNAIL_FORMATS.items():
+            target = targets.get((size, fmt))
+            if target is None:
+                continue
+            buffer = BytesIO()
+            image.save(buffer, pil_format, **options)
+            if storage.exists(target):
+                storage.delete(target)
+            written.append(storage.save(target, ContentFile(buffer.getvalue())))
+    return written
+
+def delete_thumbnails(name, storage=default_storage):
+    for target in thumbnail_names(name):
+        storage.delete(target)
+
+def process_image(image_id):
+    """
+    Генерирует renditions для EmployeeImage и отмечает их готовность.
+    Если файл успели заменить, пока задача ждала в очереди, отметка не ставится.
+    """
+    from .models import EmployeeImage
+    from .summary import refresh_employee_summaries
+
+    image = EmployeeImage.objects.filter(pk=image_id).values_list('employee_id', 'image').first()
+    if image is None:
+        return False
+    employee_id, name = image
+    try:
+        generate_thumbnails(name)
+    except (OSError, ValueError):
+        logger.exception('Не удалось построить миниатюры для %s', name)
+        return False
+    if EmployeeImage.objects.filter(pk=image_id, image=name).update(has_thumbnails=True):
+        refresh_employee_summaries([employee_id])
+    return True
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    """Общий пул воркеров; Pillow отпускает GIL при декодировании, ресайзе и кодировании"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS, thread_name_prefix='thumbnails'
+            )
+        return _executor
+
+def _run_in_worker(image_id):
+    from django.db import close_old_connections
+    try:
+        return process_image(image_id)
+    finally:
+        # У потока воркера своё соединение с БД - не оставляем его открытым
+        close_old_connections()
+
+def schedule_thumbnails(image_id):
+    """Ставит генерацию в пул воркеров, не задерживая ответ на загрузку"""
+    return get_executor().submit(_run_in_worker, image_id)
@@ -0,0 +1,85 @@
+import warnings
+from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import transaction
+from PIL import Image
+from .models import EmployeeImage
+from .summary import refresh_employee_summaries
+from .thumbnails import schedule_thumbnails
+
+# Форматы, которые умеет разбирать конвейер миниатюр (см. thumbnails.py)
+ALLOWED_IMAGE_FORMATS = ('JPEG', 'PNG', 'WEBP', 'GIF')
+
+class ChunkedImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Пишет загружаемый файл во временный файл на диске кусками по chunk_size,
+    без буферизации в памяти, как бы велик ни был файл.
+    """
+    chunk_size = 64 * 2 ** 10
+
+def inspect_image(file):
+    """
+    Проверяет изображение по заголовку, не декодируя растр: формат из
+    ALLOWED_IMAGE_FORMATS, размер файла и число пикселей в пределах настроек.
+    Возвращает (format, width, height), при нарушении бросает ValidationError.
+    """
+    if file.size > settings.IMAGE_UPLOAD_MAX_SIZE:
+        raise ValidationError(
+            f'Файл больше {settings.IMAGE_UPLOAD_MAX_SIZE // 2 ** 20} МБ', code='file_too_large'
+        )
+    # Временный файл открываем по пути, иначе Pillow читает из уже открытого объекта
+    source = file.temporary_file_path() if hasattr(file, 'temporary_file_path') else file
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            # Image.open читает только заголовок; растр декодируется лишь при load()
+            with Image.open(source) as image:
+                image_format, (width, height) = image.format, image.size
+    except (OSError, ValueError, SyntaxError, Image.DecompressionBombWarning, Image.DecompressionBombError):
+        raise ValidationError('Загрузите корректное изображение', code='invalid_image')
+    finally:
+        if hasattr(file, 'seek'):
+            file.seek(0)
+    if image_format not in ALLOWED_IMAGE_FORMATS:
+        raise ValidationError(
+            f'Формат {image_format} не поддерживается, допустимы: {", ".join(ALLOWED_IMAGE_FORMATS)}',
+            code='invalid_format',
+        )
+    if width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+        raise ValidationError(
+            f'Изображение {width}x{height} слишком большое '
+            f'(не больше {settings.IMAGE_UPLOAD_MAX_PIXELS // 10 ** 6} Мп)',
+            code='too_many_pixels',
+        )
+    file.content_type = Image.MIME.get(image_format)
+    return image_format, width, height
+
+class HeaderImageFormField(forms.FileField):
+    """ImageField для форм (админка) с проверкой по заголовку вместо image.verify()"""
+
+    def to_python(self, data):
+        f = super().to_python(data)
+        if f is None:
+            return None
+        inspect_image(f)
+        return f
+
+def create_gallery_images(employee, files):
+    """
+    Сохраняет несколько фото сотрудника одним INSERT. Файлы переносятся из
+    временных в хранилище без чтения в память. bulk_create не отправляет
+    сигналы - сводку обновляем и миниатюры ставим в очередь явно.
+    """
+    with transaction.atomic():
+        images = EmployeeImage.objects.bulk_create([
+            EmployeeImage(employee=employee, image=file) for file in files
+        ])
+        refresh_employee_summaries([employee.pk])
+        
+        def schedule():
+            for image in images:
+                schedule_thumbnails(image.pk)
+        transaction.on_commit(schedule)
+    return images
@@ -13,4 +13,7 @@ urlpatterns = [
     path('', include(router.urls)),
     path('auth/register/', views.UserRegistrationView.as_view(), name='register'),
     path('auth/me/', views.CurrentUserView.as_view(), name='current-user'),
+    path('export/<slug:dataset>.<slug:fmt>', views.ExportView.as_view(), name='export'),
+    path('analytics/', views.AnalyticsView.as_view(), name='analytics'),
+    path('cache-stats/', views.CacheStatsView.as_view(), name='cache-stats'),
 ]
\ No newline at end of file
@@ -1,24 +1,89 @@
+from collections import defaultdict, namedtuple
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from .models import Desk, Reservation
+from .models import Reservation
+from .spatial import geometric_adjacency, get_desk_index
+
+class ReservationConflict(namedtuple('ReservationConflict', 'reservation neighbor_desk_number')):
+    """Бронирование reservation конфликтует с бронью соседнего стола на ту же дату"""
+
+    @property
+    def message(self):
+        return (
+            f'Нельзя забронировать стол {self.reservation.desk.number} на дату {self.reservation.date}, '
+            f'так как соседний стол {self.neighbor_desk_number} уже забронирован'
+        )
 
 class NeighborDeskValidator:
+    """
+    Запрещает бронировать стол, если соседний стол занят в ту же дату.
+    Соседи определяются по номеру (N ± 1) или по координатам (DESK_ADJACENCY = 'geometry').
+    """
+
+    def neighbor_numbers(self, desk):
+        """Номера соседних столов (строками, как Desk.number)"""
+        if geometric_adjacency():
+            neighbors = get_desk_index().neighbors(desk.number, settings.DESK_NEIGHBOR_RADIUS) or []
+            return [entry[1] for entry in neighbors]
+        if not desk.number.isdigit():
+            # Если номер стола не число, соседей по номеру нет
+            return []
+        desk_number = int(desk.number)
+        return [str(desk_number - 1), str(desk_number + 1)]
+
+    def neighbors_by_desk(self, reservations):
+        """{desk_id: номера соседних столов} для столов из списка бронирований"""
+        neighbors = {}
+        for reservation in reservations:
+            if reservation.desk_id not in neighbors:
+                neighbors[reservation.desk_id] = self.neighbor_numbers(reservation.desk)
+        return neighbors
+
+    def booked_numbers(self, reservations, numbers):
+        """
+        Какие из столов numbers уже забронированы на даты из reservations: {дата: {номера}}.
+        Один запрос по индексу (date, desk), независимо от числа дат и столов.
+        """
+        booked = defaultdict(set)
+        if not numbers:
+            return booked
+        dates = {reservation.date for reservation in reservations}
+        existing = Reservation.objects.filter(date__in=dates, desk__number__in=numbers)
+        pks = [reservation.pk for reservation in reservations if reservation.pk is not None]
+        if pks:
+            existing = existing.exclude(pk__in=pks)
+        for booked_date, number in existing.values_list('date', 'desk__number'):
+            booked[str(booked_date)].add(number)
+        return booked
+
+    def find_conflicts(self, reservations):
+        """Все конфликты для списка бронирований (в том числе между собой) за один запрос"""
+        reservations = list(reservations)
+        neighbors = self.neighbors_by_desk(reservations)
+        numbers = {number for desk_numbers in neighbors.values() for number in desk_numbers}
+        if not numbers:
+            return []
+
+        booked = self.booked_numbers(reservations, numbers)
+        # Бронирования из самого списка тоже занимают столы
+        for reservation in reservations:
+            booked[str(reservation.date)].add(reservation.desk.number)
+
+        conflicts = []
+        for reservation in reservations:
+            taken = booked[str(reservation.date)]
+            for number in neighbors[reservation.desk_id]:
+                if number in taken:
+                    conflicts.append(ReservationConflict(reservation, number))
+        return conflicts
+
     def validate(self, reservation):
-        desk = reservation.desk
-        date = reservation.date
-        
-        # Преобразуем номер стола в число для проверки соседних столов
-        try:
-            desk_number = int(desk.number)
-        except ValueError:
-            # Если номер стола не число, пропускаем проверку
-            return
-        
-        adjacent_desks_numbers = [desk_number - 1, desk_number + 1]
-        adjacent_desks = Desk.objects.filter(number__in=[str(num) for num in adjacent_desks_numbers])
-        
-        for adj_desk in adjacent_desks:
-            if Reservation.objects.filter(desk=adj_desk, date=date).exists():
-                raise ValidationError(
-                    f'Нельзя забронировать стол {desk.number} на дату {date}, '
-                    f'так как соседний стол {adj_desk.number} уже забронирован'
-                )
\ No newline at end of file
+        conflicts = self.find_conflicts([reservation])
+        if conflicts:
+            raise ValidationError(conflicts[0].message)
+
+    def validate_many(self, reservations):
+        """Пакетная проверка: ValidationError со всеми конфликтами сразу"""
+        conflicts = self.find_conflicts(reservations)
+        if conflicts:
+            raise ValidationError([conflict.message for conflict in conflicts])
@@ -1,33 +1,513 @@
+import os
+from datetime import timedelta
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404
 from django.core.paginator import Paginator
-from .models import Employee
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.contrib.staticfiles import finders
+from django.views.decorators.http import require_safe
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.contrib.auth.models import User
+from django.db.models import Prefetch
+from rest_framework import viewsets, generics, permissions, serializers, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django_filters.rest_framework import DjangoFilterBackend
+from .models import Employee, Skill, Desk, EmployeeSkill, EmployeeImage, Reservation
+from .serializers import (
+    SkillSerializer, DeskSerializer, EmployeeImageSerializer, EmployeeImageBulkSerializer,
+    EmployeeListSerializer, EmployeeListFastSerializer,
+    EmployeeDetailSerializer, EmployeeCreateUpdateSerializer, EmployeeMoveSerializer,
+    EmployeeBulkMoveSerializer, EmployeeImportSerializer, SeatingOptimizeSerializer, AnalyticsQuerySerializer,
+    StaffingMatchSerializer,
+    ReservationSerializer, BulkReservationSerializer, UserSerializer, UserRegistrationSerializer,
+)
+from .permissions import IsViewer, IsKeeper, IsAdmin
+from .filters import EmployeeFilter
+from .booking import save_reservation, save_reservations, BookingConflict
+from .pagination import KeysetPaginator, InvalidCursor
+from .availability import availability_calendar
+from .seating import apply_seating_plan, optimize_seating, SeatingConflictError
+from .uploads import create_gallery_images
+from .serving import serve_file
+from .conditional import ConditionalGetMixin
+from .exports import export_stream, ExportError
+from .imports import load_dataset, import_employees, EmployeeImportError
+from .analytics import analytics_report
+from .staffing import get_skill_matrix
+from .caching import (
+    cached_fragments, get_cached_page, set_cached_page, collection_version, employee_versions, cache_stats,
+)
 
 def home(request):
+    # Страница целиком из кэша: без запросов к БД, пока не изменились сотрудники
+    version = collection_version()
+    content = get_cached_page('home', version)
+    if content is not None:
+        return HttpResponse(content)
+    
     total_employees = Employee.objects.count()
-    latest_employees = Employee.objects.order_by('-hire_date')[:4]
+    latest_employees = list(Employee.objects.order_by('-hire_date')[:4])
+    versions = employee_versions([employee.pk for employee in latest_employees])
     
     context = {
         'total_employees': total_employees,
         'latest_employees': latest_employees,
     }
-    return render(request, 'employees/home.html', context)
+    response = render(request, 'employees/home.html', context)
+    set_cached_page('home', version, response.content, versions)
+    return response
 
 def employee_list(request):
-    employees_list = Employee.objects.all().prefetch_related('images', 'skills').order_by('-hire_date')
+    # Карточки берут навыки и фото из сводки на строке сотрудника - без prefetch
+    employees_list = Employee.objects.all().order_by('-hire_date', '-id')
+    
+    if settings.KEYSET_PAGINATION:
+        paginator = KeysetPaginator(employees_list, 10, ordering=('-hire_date', '-id'))
+        try:
+            page_obj = paginator.get_page(request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404('Неверный курсор')
+    else:
+        paginator = Paginator(employees_list, 10)
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
     
-    paginator = Paginator(employees_list, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Карточки кэшируются по версии сотрудника, отрисовываются только изменившиеся
+    cards = cached_fragments(
+        'employee_card', page_obj,
+        lambda employee: render_to_string('includes/employee_card.html', {'employee': employee}),
+    )
     
     context = {
         'page_obj': page_obj,
+        'cards': [mark_safe(card) for card in cards],
+        'keyset_pagination': settings.KEYSET_PAGINATION,
     }
     return render(request, 'employees/employee_list.html', context)
 
 def employee_detail(request, pk):
+    # Версия известна до запроса к БД: попадание в кэш не трогает БД вовсе
+    version = employee_versions([pk])[pk]
+    content = get_cached_page(f'employee_detail:{pk}', version, stat='employee_detail')
+    if content is not None:
+        return HttpResponse(content)
+    
     employee = get_object_or_404(Employee, pk=pk)
     
     context = {
         'employee': employee,
     }
-    return render(request, 'employees/employee_detail.html', context)
\ No newline at end of file
+    response = render(request, 'employees/employee_detail.html', context)
+    set_cached_page(f'employee_detail:{pk}', version, response.content, {pk: version})
+    return response
+
+@require_safe
+def media_file(request, path):
+    """
+    Отдача MEDIA_ROOT: conditional GET, Range и неизменяемый Cache-Control
+    для content-addressed файлов (см. serving.serve_file).
+    """
+    return serve_file(request, settings.MEDIA_ROOT, path)
+
+@require_safe
+def static_file(request, path):
+    """
+    Отдача собранной статики из STATIC_ROOT с предсжатыми .br/.gz вариантами.
+    В режиме DEBUG файлы, которых нет в STATIC_ROOT, ищутся в STATICFILES_DIRS.
+    """
+    if settings.DEBUG and settings.STATIC_ROOT and not os.path.isfile(os.path.join(settings.STATIC_ROOT, path)):
+        found = finders.find(path)
+        if found:
+            return serve_file(request, os.path.dirname(found), os.path.basename(found), precompressed=True)
+    if not settings.STATIC_ROOT:
+        raise Http404(path)
+    return serve_file(request, settings.STATIC_ROOT, path, precompressed=True)
+
+class Conflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Стол или соседний стол уже забронирован'
+    default_code = 'conflict'
+
+def save_or_400(serializer, **kwargs):
+    """Сохраняет сериализатор, превращая ошибки full_clean() модели в ответ 400"""
+    try:
+        return serializer.save(**kwargs)
+    except DjangoValidationError as e:
+        raise serializers.ValidationError(e.messages)
+
+class EmployeeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    """
+    API сотрудников.
+    Для каждого действия заранее спланированы select_related/prefetch_related,
+    поэтому число запросов не зависит от размера страницы.
+    """
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = EmployeeFilter
+    keyset_ordering = ('-hire_date', '-id')
+    # Навыки и фото попадают в updated_at через сводку; стаж в днях меняется ежедневно
+    etag_daily = True
+    
+    def get_queryset(self):
+        queryset = Employee.objects.order_by('-hire_date', '-id')
+        if self.action == 'list':
+            # EmployeeListSerializer читает сводку skill_names/main_photo с самой строки;
+            # быстрый путь сериализации берёт словари из .values() без создания моделей
+            return queryset.values(*EmployeeListFastSerializer.VALUE_FIELDS)
+        if self.action == 'retrieve':
+            # EmployeeDetailSerializer: employeeskill_set__skill и images
+            return queryset.prefetch_related(
+                Prefetch('employeeskill_set', queryset=EmployeeSkill.objects.select_related('skill')),
+                'images',
+            )
+        return queryset
+    
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return EmployeeListSerializer
+        if self.action == 'retrieve':
+            return EmployeeDetailSerializer
+        if self.action == 'move':
+            return EmployeeMoveSerializer
+        if self.action == 'bulk_move':
+            return EmployeeBulkMoveSerializer
+        if self.action == 'optimize_seating':
+            return SeatingOptimizeSerializer
+        if self.action == 'import_file':
+            return EmployeeImportSerializer
+        if self.action == 'match':
+            return StaffingMatchSerializer
+        return EmployeeCreateUpdateSerializer
+    
+    def get_permissions(self):
+        if self.action in ['list', 'retrieve', 'match']:
+            return [IsViewer()]
+        if self.action in ['move', 'bulk_move', 'optimize_seating']:
+            return [IsKeeper()]
+        return [IsAdmin()]
+    
+    def perform_create(self, serializer):
+        save_or_400(serializer)
+    
+    def perform_update(self, serializer):
+        save_or_400(serializer)
+    
+    @action(detail=True, methods=['post'])
+    def move(self, request, pk=None):
+        """Перемещение сотрудника за другой стол"""
+        employee = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        employee.desk_number = serializer.validated_data['desk_number']
+        try:
+            employee.save()
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        return Response(EmployeeListSerializer(employee).data)
+    
+    @action(detail=False, methods=['post'], url_path='bulk-move')
+    def bulk_move(self, request):
+        """
+        Пересадка многих сотрудников за один запрос.
+        Проверяется итоговое состояние целиком (возможны обмены тестировщиков и
+        разработчиков), изменения применяются bulk_update в одной транзакции.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        plan = serializer.validated_data['moves']
+        
+        try:
+            apply_seating_plan(plan)
+        except SeatingConflictError as e:
+            return Response({'conflicts': [
+                {
+                    'employee': conflict.employee.pk,
+                    'desk_number': conflict.desk_number,
+                    'neighbor': conflict.neighbor.pk,
+                    'neighbor_desk_number': conflict.neighbor_desk_number,
+                    'message': conflict.message,
+                }
+                for conflict in e.conflicts
+            ]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'moved': len(plan)})
+    
+    @action(detail=False, methods=['post'])
+    def match(self, request):
+        """
+        Подбор k лучших сотрудников под требования к навыкам по матрице в памяти
+        (staffing.py); с near_desk оценка учитывает близость стола сотрудника.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        requirements = data['skills']
+        matches = get_skill_matrix().match(
+            requirements,
+            k=data['k'],
+            positions=data['positions'],
+            near=data.get('near_desk'),
+            proximity_weight=data['proximity_weight'],
+            require_all=data['require_all'],
+        )
+        employees = Employee.objects.only(
+            'first_name', 'last_name', 'position', 'desk_number',
+        ).in_bulk([match.employee for match in matches])
+        results = []
+        for match in matches:
+            employee = employees.get(match.employee)
+            if employee is None:
+                continue
+            results.append({
+                'id': employee.pk,
+                'first_name': employee.first_name,
+                'last_name': employee.last_name,
+                'position': employee.position,
+                'desk_number': employee.desk_number,
+                'score': round(match.score, 4),
+                'skill_score': round(match.skill_score, 4),
+                'distance': None if match.distance is None else round(match.distance, 2),
+                'meets_all': match.meets_all,
+                'skills': [
+                    {'skill': skill_id, 'level': level, 'required': requirements[skill_id]}
+                    for skill_id, level in zip(requirements, match.levels)
+                ],
+            })
+        return Response({'results': results})
+    
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_file(self, request):
+        """
+        Массовый импорт из CSV/XLSX: пакет проверяется в памяти целиком,
+        запись - bulk_create кусками. Ошибки - по номерам строк файла.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        file = serializer.validated_data['file']
+        try:
+            result = import_employees(
+                load_dataset(file, file.name),
+                atomic=serializer.validated_data['atomic'],
+                create_skills=serializer.validated_data['create_skills'],
+            )
+        except EmployeeImportError as e:
+            raise serializers.ValidationError({'file': [str(e)]})
+        return Response(
+            result._asdict(),
+            status=status.HTTP_400_BAD_REQUEST if serializer.validated_data['atomic'] and result.errors else status.HTTP_200_OK,
+        )
+    
+    @action(detail=False, methods=['post'], url_path='optimize-seating')
+    def optimize_seating(self, request):
+        """Предлагаемая рассадка (dry-run): только разница с текущим планом, без записи в БД"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        solution = optimize_seating(
+            serializer.validated_data['employees'],
+            time_budget=serializer.validated_data['time_budget'],
+        )
+        return Response({
+            'moves': [move._asdict() for move in solution.moves],
+            'unplaced': solution.unplaced,
+            'timed_out': solution.timed_out,
+        })
+
+class SkillViewSet(viewsets.ModelViewSet):
+    queryset = Skill.objects.order_by('name', 'id')
+    serializer_class = SkillSerializer
+    
+    def get_permissions(self):
+        if self.action in ['list', 'retrieve']:
+            return [IsViewer()]
+        return [IsAdmin()]
+
+class DeskViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Desk.objects.order_by('number')
+    serializer_class = DeskSerializer
+    
+    # Максимальная длина окна календаря занятости в днях
+    MAX_AVAILABILITY_DAYS = 366
+    
+    def get_permissions(self):
+        if self.action in ['list', 'retrieve', 'availability']:
+            return [IsViewer()]
+        return [IsAdmin()]
+    
+    @action(detail=False, methods=['get'])
+    def availability(self, request):
+        """
+        Календарь свободных столов: ?from=YYYY-MM-DD&to=YYYY-MM-DD (по умолчанию 30 дней с сегодня).
+        Отвечает из кэша битовых масок занятости по датам.
+        """
+        try:
+            start = parse_date(request.query_params.get('from') or timezone.now().date().isoformat())
+            end = request.query_params.get('to')
+            end = parse_date(end) if end else start and start + timedelta(days=29)
+        except ValueError:
+            start = end = None
+        if start is None or end is None:
+            raise serializers.ValidationError('Даты указываются в формате YYYY-MM-DD')
+        if end < start:
+            raise serializers.ValidationError('Дата "to" раньше даты "from"')
+        if (end - start).days >= self.MAX_AVAILABILITY_DAYS:
+            raise serializers.ValidationError(f'Окно не может быть больше {self.MAX_AVAILABILITY_DAYS} дней')
+        return Response(availability_calendar(start, end))
+
+class EmployeeImageViewSet(viewsets.ModelViewSet):
+    queryset = EmployeeImage.objects.order_by('uploaded_at', 'id')
+    serializer_class = EmployeeImageSerializer
+    
+    def get_serializer_class(self):
+        if self.action == 'bulk':
+            return EmployeeImageBulkSerializer
+        return EmployeeImageSerializer
+    
+    def get_permissions(self):
+        if self.action in ['list', 'retrieve']:
+            return [IsViewer()]
+        return [IsAdmin()]
+    
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Загрузка галереи: multipart с employee и несколькими файлами в поле images"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        images = create_gallery_images(serializer.validated_data['employee'], serializer.validated_data['images'])
+        return Response(
+            EmployeeImageSerializer(images, many=True, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+class ReservationViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    permission_classes = [IsViewer]
+    # В ответе номер стола - его изменение тоже меняет версию
+    etag_fields = ('updated_at', 'desk__updated_at')
+    
+    def get_queryset(self):
+        # desk и user нужны сериализатору (desk_number, user_name)
+        queryset = Reservation.objects.select_related('desk', 'user').order_by('date', 'id')
+        if self.action in ['update', 'partial_update', 'destroy'] and not self.request.user.is_staff:
+            # Изменять и отменять можно только свои бронирования
+            queryset = queryset.filter(user=self.request.user)
+        return queryset
+    
+    def get_permissions(self):
+        if self.action in ['update', 'partial_update', 'destroy']:
+            return [permissions.IsAuthenticated()]
+        return [IsViewer()]
+    
+    def get_serializer_class(self):
+        if self.action == 'bulk':
+            return BulkReservationSerializer
+        return ReservationSerializer
+    
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Повторяющиеся и пакетные бронирования: результат по каждой брони (created/conflict).
+        Проверка всех дат - постоянное число запросов, вставка - bulk_create.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = save_reservations(
+            [Reservation(user=request.user, desk=desk, date=day)
+             for desk, day in serializer.validated_data['occurrences']],
+            atomic=serializer.validated_data['atomic'],
+        )
+        created = sum(1 for result in results if result.message is None)
+        return Response({
+            'created': created,
+            'conflicts': len(results) - created,
+            'results': [
+                {
+                    'desk': result.reservation.desk_id,
+                    'date': result.reservation.date,
+                    'status': 'conflict' if result.message else 'created',
+                    'id': result.reservation.pk,
+                    'message': result.message,
+                }
+                for result in results
+            ],
+        }, status=status.HTTP_409_CONFLICT if serializer.validated_data['atomic'] and created == 0 else status.HTTP_200_OK)
+    
+    def perform_create(self, serializer):
+        reservation = Reservation(user=self.request.user, **serializer.validated_data)
+        self.save_reservation(reservation)
+        serializer.instance = reservation
+    
+    def perform_update(self, serializer):
+        reservation = serializer.instance
+        for attr, value in serializer.validated_data.items():
+            setattr(reservation, attr, value)
+        self.save_reservation(reservation)
+    
+    def save_reservation(self, reservation):
+        try:
+            save_reservation(reservation)
+        except BookingConflict as e:
+            raise Conflict(e.messages)
+
+class IgnoreClientContentNegotiation(BaseContentNegotiation):
+    """Формат тела задаёт сам view, Accept клиента не учитывается (ошибки - в JSON)"""
+    
+    def select_parser(self, request, parsers):
+        return parsers[0]
+    
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+class ExportView(APIView):
+    """
+    Потоковая выгрузка: /api/export/<employees|skills|reservations>.<ndjson|csv|xlsx>
+    с параметрами EmployeeFilter. Строки читаются из БД кусками, ответ не копится в памяти.
+    """
+    permission_classes = [IsViewer]
+    content_negotiation_class = IgnoreClientContentNegotiation
+    
+    def get(self, request, dataset, fmt):
+        try:
+            stream, content_type = export_stream(dataset, fmt, request.query_params, {'request': request})
+        except ExportError as e:
+            raise serializers.ValidationError(e.args[0])
+        response = StreamingHttpResponse(stream, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{dataset}-{timezone.localdate()}.{fmt}"'
+        return response
+
+class AnalyticsView(APIView):
+    """
+    Матрица навыков (навык x уровень x должность; ?min_level=3 - уровни не ниже),
+    численность по должности и полу, гистограмма приёма (?period=month|year).
+    Читается из счётчиков analytics.py - два запроса при любом числе сотрудников.
+    """
+    permission_classes = [IsViewer]
+    
+    def get(self, request):
+        params = AnalyticsQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return Response(analytics_report(params.validated_data.get('min_level'), params.validated_data['period']))
+
+class CacheStatsView(APIView):
+    """Счётчики попаданий/промахов кэша страниц и карточек для мониторинга"""
+    permission_classes = [IsAdmin]
+    
+    def get(self, request):
+        return Response(cache_stats())
+
+class UserRegistrationView(generics.CreateAPIView):
+    queryset = User.objects.all()
+    serializer_class = UserRegistrationSerializer
+    permission_classes = [permissions.AllowAny]
+
+class CurrentUserView(generics.RetrieveAPIView):
+    serializer_class = UserSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_object(self):
+        return self.request.user
@@ -84,6 +84,9 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # BEGIN IMMEDIATE: транзакция сразу берёт блокировку записи, поэтому
+        # проверка и вставка брони не перемежаются с другими писателями
+        "OPTIONS": {"transaction_mode": "IMMEDIATE", "timeout": 20},
     }
 }
 
@@ -136,6 +139,14 @@ STATICFILES_DIRS = [
 MEDIA_URL = 'media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# collectstatic кладёт рядом с текстовыми ассетами .gz/.br (brotli - если установлен)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'employee.storage.CompressedStaticFilesStorage'},
+}
+# Cache-Control для статики и media без хэша в имени (content-addressed - год, immutable)
+STATIC_CACHE_MAX_AGE = 60 * 60
+
 
 TEST_RUNNER = 'django.test.runner.DiscoverRunner'
 
@@ -146,9 +157,52 @@ if 'test' in sys.argv:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': ':memory:',
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 20},
+            # Тестовая БД в файле, а не в общей памяти процесса: только так соединения
+            # потоков блокируют друг друга, как соединения разных процессов
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
         }
     }
 
+# Соседство столов для правил рассадки и бронирования:
+# 'number' - столы с номерами N-1 и N+1, 'geometry' - столы в радиусе
+# DESK_NEIGHBOR_RADIUS по coordinates_x/coordinates_y (пространственный индекс)
+DESK_ADJACENCY = 'number'
+DESK_NEIGHBOR_RADIUS = 1.5
+
+# Миниатюры фото сотрудников: размеры (px по короткой стороне) в WebP и JPEG,
+# строятся пулом из THUMBNAIL_WORKERS потоков после загрузки
+THUMBNAIL_SIZES = (50, 100, 300)
+THUMBNAIL_WORKERS = 2
+
+# Загрузка фото: файл всегда пишется на диск кусками по 64 КБ (без буфера в памяти),
+# изображение проверяется по заголовку без декодирования растра
+FILE_UPLOAD_HANDLERS = ['employee.uploads.ChunkedImageUploadHandler']
+IMAGE_UPLOAD_MAX_SIZE = 20 * 2 ** 20
+IMAGE_UPLOAD_MAX_PIXELS = 40_000_000
+
+# Кэш по умолчанию - в памяти процесса. Для нескольких воркеров без общего
+# Redis/Memcached подойдёт django.core.cache.backends.filebased.FileBasedCache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'office',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+# Время жизни закэшированных страниц и карточек сотрудников (секунды);
+# инвалидация - по версиям в employee/caching.py
+PAGE_CACHE_TIMEOUT = 10 * 60
+# Время жизни закэшированных ролей пользователя (смотритель); изменения групп
+# и прав сбрасывают кэш сразу - по версии в employee/caching.py. Роли кэшируются
+# между запросами только с общим кэшем (Redis, Memcached, файлы, БД): с LocMemCache
+# отзыв прав в одном воркере не виден остальным, и роли читаются из БД в каждом запросе
+ROLE_CACHE_TIMEOUT = 5 * 60
+
+# Keyset-пагинация (курсор по (hire_date, id)) вместо номеров страниц:
+# без COUNT(*) и OFFSET, глубокие страницы стоят столько же, сколько первая
+KEYSET_PAGINATION = False
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
@@ -156,7 +210,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': (
+        'employee.pagination.KeysetPagination' if KEYSET_PAGINATION
+        else 'employee.pagination.EmployeePagination'
+    ),
     'PAGE_SIZE': 10,
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
 }